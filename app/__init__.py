@@ -7,6 +7,9 @@ import logging
 from flask import Flask
 from app.config import get_config
 from app.extensions import db, migrate, login_manager, csrf, socketio, limiter
+from app.utils.socketio_queue import message_queue_options
+from app.utils.compression import init_compression
+from app.utils.json_provider import get_json_provider_class, SocketIOJSON
 
 
 def create_app(config_name=None):
@@ -20,6 +23,8 @@ def create_app(config_name=None):
         Flask app instance
     """
     app = Flask(__name__)
+    # JSON con orjson; serializa Decimal y datetime de los to_dict
+    app.json = get_json_provider_class()(app)
     
     # Cargar configuración
     if config_name:
@@ -52,17 +57,24 @@ def initialize_extensions(app):
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
-    socketio.init_app(app)
+    # Mismas reglas JSON que jsonify, sin depender del contexto (hilo de la cola)
+    socketio.init_app(app, json=SocketIOJSON, **message_queue_options(
+        app.config['SOCKETIO_MESSAGE_QUEUE'],
+        app.config['SOCKETIO_CHANNEL']
+    ))
     
     if app.config['RATELIMIT_ENABLED']:
         limiter.init_app(app)
     
-    # Configurar user_loader para Flask-Login
-    from app.models.user import User
+    # Compresión gzip/brotli de respuestas y estáticos precomprimidos
+    init_compression(app)
+    
+    # Configurar user_loader para Flask-Login (usuario cacheado, ver AuthService.load_user)
+    from app.services.auth_service import AuthService
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return AuthService.load_user(int(user_id))
 
 
 def register_blueprints(app):
@@ -72,12 +84,19 @@ def register_blueprints(app):
     from app.routes.users import users_bp
     from app.routes.clients import clients_bp
     from app.routes.operations import operations_bp
+    from app.routes.exports import exports_bp
+    from app.routes.audit import audit_bp
+    from app.routes.files import files_bp
+    from app.routes import sockets  # noqa: F401 (registra los eventos de SocketIO)
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(users_bp, url_prefix='/users')
     app.register_blueprint(clients_bp, url_prefix='/clients')
     app.register_blueprint(operations_bp, url_prefix='/operations')
+    app.register_blueprint(exports_bp, url_prefix='/exports')
+    app.register_blueprint(audit_bp, url_prefix='/audit')
+    app.register_blueprint(files_bp, url_prefix=app.config['LOCAL_STORAGE_URL_PREFIX'])
 
 
 def configure_logging(app):
@@ -26,16 +26,41 @@ class Config:
         seconds=int(os.environ.get('PERMANENT_SESSION_LIFETIME', 43200))  # 12 hours
     )
     
-    # File Upload (Cloudinary)
+    # File Upload: backend de almacenamiento (ver app/utils/storage.py)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'auto')  # auto, cloudinary, local, s3
+    LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'uploads'
+    )
+    LOCAL_STORAGE_URL_PREFIX = '/files'  # Ruta que sirve app/routes/files.py
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # MinIO, R2, ... (vacío = AWS)
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # URL base de los objetos (CDN)
+    
+    # Comprobantes: normalización de imágenes y miniaturas (ver app/utils/images.py)
+    IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 1600))  # Píxeles por lado
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 82))  # Calidad JPEG
+    IMAGE_THUMBNAIL_SIZE = int(os.environ.get('IMAGE_THUMBNAIL_SIZE', 320))  # Píxeles por lado
+    
+    # Cloudinary
     CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
     CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
+    # Subidas en paralelo de documentos (ver FileService.upload_files_parallel)
+    FILE_UPLOAD_MAX_WORKERS = int(os.environ.get('FILE_UPLOAD_MAX_WORKERS', 8))  # Hilos por proceso
+    FILE_UPLOAD_TIMEOUT = int(os.environ.get('FILE_UPLOAD_TIMEOUT', 60))  # Segundos por archivo
     
     # Rate Limiting
     RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Storage compartido entre workers (ver app/utils/ratelimit.py): sqlite:///<ruta> o redis://
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or 'sqlite:///' + os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'ratelimit.db'
+    )
+    RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY', 'moving-window')  # Ventana deslizante
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -43,8 +68,56 @@ class Config:
     # Timezone
     TIMEZONE = os.environ.get('TIMEZONE', 'America/Lima')
     
-    # SocketIO
-    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    # Dashboard (segundos de vigencia de la caché de estadísticas)
+    DASHBOARD_STATS_CACHE_TTL = int(os.environ.get('DASHBOARD_STATS_CACHE_TTL', 30))
+    DASHBOARD_UPDATE_INTERVAL = float(os.environ.get('DASHBOARD_UPDATE_INTERVAL', 2))  # Máx. 1 dashboard_update por sala
+    
+    # Feed de cambios (deltas por SocketIO y catch-up por secuencia)
+    CHANGE_LOG_RETENTION_HOURS = int(os.environ.get('CHANGE_LOG_RETENTION_HOURS', 24))
+    
+    # Sesión: segundos de vigencia del usuario cacheado por proceso (user_loader).
+    # Es el tiempo máximo que otro worker tarda en ver un cambio de rol o estado.
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    
+    # Auditoría: buffer write-behind para acciones de alto volumen
+    AUDIT_BUFFER_ENABLED = os.environ.get('AUDIT_BUFFER_ENABLED', 'True') == 'True'
+    AUDIT_BUFFERED_ACTIONS = ('LOGIN', 'LOGOUT')
+    AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', 50))  # Registros por lote
+    AUDIT_BUFFER_FLUSH_INTERVAL = float(os.environ.get('AUDIT_BUFFER_FLUSH_INTERVAL', 5))  # Segundos
+    
+    # Auditoría: retención en tabla y archivo comprimido (JSONL.gz por día)
+    AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', 180))
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'audit_archive'
+    )
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.environ.get('AUDIT_ARCHIVE_BATCH_SIZE', 1000))
+    
+    # Exportaciones en segundo plano
+    EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'exports'
+    )
+    EXPORT_MAX_WORKERS = int(os.environ.get('EXPORT_MAX_WORKERS', 2))  # Hilos por proceso
+    EXPORT_MAX_JOBS_PER_USER = int(os.environ.get('EXPORT_MAX_JOBS_PER_USER', 1))  # Simultáneas
+    EXPORT_JOB_TIMEOUT = int(os.environ.get('EXPORT_JOB_TIMEOUT', 3600))  # Segundos
+    EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', 24))
+    
+    # SocketIO: cola para repartir eventos entre workers (ver app/utils/socketio_queue.py)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # redis://, amqp://, unix:///dir
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'qoricash')
+    
+    # Compresión de respuestas (ver app/utils/compression.py)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True') == 'True'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # Bytes; menos no compensa
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip 1-9
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))  # brotli 0-11 (respuestas dinámicas)
+    # Sin text/html: las páginas llevan el token CSRF y reflejan parámetros (BREACH)
+    COMPRESS_MIMETYPES = (
+        'application/json', 'application/javascript', 'text/css',
+        'text/plain', 'text/csv', 'image/svg+xml'
+    )
+    # Generar .br/.gz de app/static al iniciar (False si static es de solo lectura y
+    # se ejecuta scripts/precompress_static.py en el build)
+    COMPRESS_STATIC_ON_STARTUP = os.environ.get('COMPRESS_STATIC_ON_STARTUP', 'True') == 'True'
     
     # CSRF
     WTF_CSRF_TIME_LIMIT = None  # No expiration
@@ -72,6 +145,11 @@ class TestingConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    RATELIMIT_STORAGE_URI = 'memory://'  # Contadores locales al proceso en tests
+    SOCKETIO_MESSAGE_QUEUE = None  # SocketIO en proceso (el test client no admite cola)
+    AUDIT_BUFFER_ENABLED = False  # Auditoría síncrona y determinista en tests
+    COMPRESS_STATIC_ON_STARTUP = False  # No escribir en app/static al correr tests
+    STORAGE_BACKEND = 'local'  # Subidas reales sin red
 
 
 # Diccionario de configuraciones
@@ -9,7 +9,7 @@ from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask_socketio import SocketIO
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from app.utils.ratelimit import rate_limit_key  # Registra también el storage sqlite://
 
 # Database
 db = SQLAlchemy()
@@ -24,11 +24,10 @@ login_manager.login_message_category = 'warning'
 # Security
 csrf = CSRFProtect()
 
-# Rate Limiting
+# Rate Limiting (storage y estrategia: RATELIMIT_STORAGE_URI / RATELIMIT_STRATEGY)
 limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    key_func=rate_limit_key,
+    default_limits=["200 per day", "50 per hour"]
 )
 
 # WebSocket (Real-time)
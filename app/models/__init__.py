@@ -5,5 +5,9 @@ from app.models.user import User
 from app.models.client import Client
 from app.models.operation import Operation
 from app.models.audit_log import AuditLog
+from app.models.operation_daily_stat import OperationDailyStat, OperationDailyClientStat
+from app.models.id_counter import IdCounter
+from app.models.export_job import ExportJob
+from app.models.change_log import ChangeLog
 
-__all__ = ['User', 'Client', 'Operation', 'AuditLog']
+__all__ = ['User', 'Client', 'Operation', 'AuditLog', 'OperationDailyStat', 'OperationDailyClientStat', 'IdCounter', 'ExportJob', 'ChangeLog']
@@ -14,7 +14,7 @@ class AuditLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Key
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Acción realizada
     action = db.Column(db.String(100), nullable=False)  # CREATE_USER, UPDATE_OPERATION, etc.
@@ -32,19 +32,33 @@ class AuditLog(db.Model):
     user_agent = db.Column(db.String(200))
     
     # Timestamp
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
-    def to_dict(self):
+    # Índices compuestos para consultas por rango de fechas con paginación
+    # keyset sobre (created_at, id); reemplazan a los índices simples de
+    # user_id y created_at
+    __table_args__ = (
+        db.Index('ix_audit_logs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_entity_created_at', 'entity', 'entity_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_action_created_at', 'action', 'created_at', 'id'),
+        db.Index('ix_audit_logs_user_created_at', 'user_id', 'created_at', 'id'),
+    )
+    
+    def to_dict(self, include_user=True):
         """
         Convertir a diccionario
         
+        Args:
+            include_user: Incluir user_name (usa la relación user; cargarla
+                          con joinedload para listas)
+        
         Returns:
             dict: Representación del log
         """
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'user_name': self.user.username if self.user else None,
+            'user_name': (self.user.username if self.user else None) if include_user else None,
             'action': self.action,
             'entity': self.entity,
             'entity_id': self.entity_id,
@@ -52,13 +66,17 @@ class AuditLog(db.Model):
             'notes': self.notes,
             'ip_address': self.ip_address,
             'user_agent': self.user_agent,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     @staticmethod
     def log_action(user_id, action, entity, entity_id=None, details=None, notes=None, ip_address=None, user_agent=None):
         """
-        Crear un registro de auditoría
+        Crear un registro de auditoría dentro de la transacción actual
+        
+        No hace commit: el registro se confirma (o se descarta) junto con el
+        cambio que describe cuando el llamador hace db.session.commit().
+        Para entidades nuevas, hacer db.session.flush() antes para tener su id.
         
         Args:
             user_id: ID del usuario que realiza la acción
@@ -84,7 +102,6 @@ class AuditLog(db.Model):
             user_agent=user_agent
         )
         db.session.add(log)
-        db.session.commit()
         return log
     
     def __repr__(self):
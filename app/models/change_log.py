@@ -0,0 +1,37 @@
+"""
+Modelo de Registro de Cambios para QoriCash Trading V2
+
+Secuencia creciente de cambios en operaciones y clientes. Cada cambio se
+registra en la misma transacción que lo produce; los navegadores reciben
+los cambios por SocketIO ('delta') y, tras reconectarse, piden los que se
+perdieron por número de secuencia (ver ChangeFeedService).
+
+En PostgreSQL el número sale de la secuencia change_seq (sin bloqueos
+entre transacciones); puede tener huecos y las transacciones pueden
+confirmarse fuera de orden.
+"""
+from datetime import datetime
+from app.extensions import db
+
+# Secuencia nativa de PostgreSQL para ChangeLog.seq
+change_seq = db.Sequence('change_seq', metadata=db.metadata)
+
+
+class ChangeLog(db.Model):
+    """Modelo de cambio en el feed de deltas"""
+
+    __tablename__ = 'change_log'
+
+    # Número de secuencia (change_seq en PostgreSQL, IdCounter en otros motores)
+    seq = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+
+    # Fila cambiada
+    entity = db.Column(db.String(20), nullable=False)  # Operation, Client
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # create, update, delete
+
+    # Timestamp
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ChangeLog {self.seq} {self.action} {self.entity} {self.entity_id}>'
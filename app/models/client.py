@@ -6,6 +6,7 @@ Modelo de Cliente ACTUALIZADO para QoriCash Trading V2
 - get/set para bank_accounts (JSON) y compatibilidad con campos legacy
 """
 from datetime import datetime
+from sqlalchemy import func, case
 from app.extensions import db
 import json
 
@@ -85,6 +86,23 @@ class Client(db.Model):
     operations = db.relationship('Operation', backref='client', lazy='dynamic')
     creator = db.relationship('User', foreign_keys=[created_by])
 
+    @staticmethod
+    def search_document():
+        """
+        Expresión SQL con los campos buscables concatenados
+
+        IMPORTANTE: debe coincidir exactamente con la expresión del índice
+        trigram ix_clients_search_trgm (PostgreSQL) para que se use el índice.
+        """
+        return (
+            func.coalesce(Client.dni, '') + ' ' +
+            func.coalesce(Client.email, '') + ' ' +
+            func.coalesce(Client.apellido_paterno, '') + ' ' +
+            func.coalesce(Client.apellido_materno, '') + ' ' +
+            func.coalesce(Client.nombres, '') + ' ' +
+            func.coalesce(Client.razon_social, '')
+        )
+
     @property
     def full_name(self):
         """Obtener nombre completo según tipo de documento. Retorna None si no hay datos."""
@@ -222,11 +240,16 @@ class Client(db.Model):
 
         return True, 'Cuentas válidas'
 
-    def to_dict(self, include_stats=False):
+    def to_dict(self, include_stats=False, stats=None):
         """
         Convertir a diccionario
 
         ACTUALIZADO: Ahora incluye información del usuario que creó el cliente
+
+        Args:
+            include_stats: Calcular estadísticas de operaciones (1 consulta)
+            stats: Estadísticas ya calculadas (ClientService.get_bulk_client_stats);
+                   evita consultas por cliente al serializar listas
         """
         data = {
             'id': self.id,
@@ -236,8 +259,8 @@ class Client(db.Model):
             'email': self.email,
             'phone': self.phone,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'bank_accounts': self.bank_accounts,
             # NUEVO: Información del usuario que creó el cliente
             'created_by_id': self.created_by,
@@ -283,10 +306,16 @@ class Client(db.Model):
             'origen': self.origen,
         })
 
-        if include_stats and hasattr(self, 'operations'):
-            data['total_operations'] = self.operations.count()
-            completed_operations = self.operations.filter_by(status='Completada').all()
-            data['total_usd_traded'] = sum(getattr(op, 'amount_usd', 0) for op in completed_operations)
+        if stats is not None:
+            data.update(stats)
+        elif include_stats and hasattr(self, 'operations'):
+            from app.models.operation import Operation
+            total_operations, total_usd_traded = self.operations.with_entities(
+                func.count(Operation.id),
+                func.coalesce(func.sum(case((Operation.status == 'Completada', Operation.amount_usd), else_=0)), 0)
+            ).one()
+            data['total_operations'] = total_operations
+            data['total_usd_traded'] = total_usd_traded
 
         return data
 
@@ -0,0 +1,95 @@
+"""
+Modelo de Trabajo de Exportación para QoriCash Trading V2
+
+Cada exportación (clientes, operaciones, auditoría) se registra como un
+trabajo que se ejecuta en segundo plano; el usuario consulta su progreso
+y descarga el archivo cuando termina.
+"""
+from datetime import datetime
+from app.extensions import db
+
+
+class ExportJob(db.Model):
+    """Modelo de trabajo de exportación en segundo plano"""
+
+    __tablename__ = 'export_jobs'
+
+    # Primary Key
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Foreign Key
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    # Qué se exporta
+    export_type = db.Column(db.String(20), nullable=False)  # clients, operations, audit_logs
+    export_format = db.Column(db.String(10), nullable=False)  # xlsx, csv
+
+    # Estado
+    status = db.Column(
+        db.String(20),
+        nullable=False,
+        default='Pendiente'
+    )  # Pendiente, En proceso, Completado, Error
+
+    # Progreso
+    total_rows = db.Column(db.Integer)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+
+    # Resultado
+    file_path = db.Column(db.String(500))
+    file_name = db.Column(db.String(200))
+    error_message = db.Column(db.Text)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # Relaciones
+    user = db.relationship('User', foreign_keys=[user_id])
+
+    # Constraints
+    __table_args__ = (
+        db.CheckConstraint(
+            status.in_(['Pendiente', 'En proceso', 'Completado', 'Error']),
+            name='check_export_job_status'
+        ),
+        # Límite de trabajos activos por usuario y listado de "mis exportaciones"
+        db.Index('ix_export_jobs_user_status', 'user_id', 'status'),
+        db.Index('ix_export_jobs_user_created_at', 'user_id', 'created_at'),
+    )
+
+    @property
+    def progress(self):
+        """Porcentaje de avance (0-100)"""
+        if self.status == 'Completado':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
+
+    def to_dict(self):
+        """
+        Convertir a diccionario
+
+        Returns:
+            dict: Representación del trabajo
+        """
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'export_type': self.export_type,
+            'export_format': self.export_format,
+            'status': self.status,
+            'progress': self.progress,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'file_name': self.file_name,
+            'error_message': self.error_message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.export_type} {self.status}>'
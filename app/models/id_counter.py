@@ -0,0 +1,62 @@
+"""
+Modelo de contadores para QoriCash Trading V2
+
+Contador transaccional por nombre. Es el respaldo portable (SQLite en
+tests/desarrollo) de las secuencias nativas que se usan en PostgreSQL.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+
+
+class IdCounter(db.Model):
+    """Contador con nombre (último valor asignado)"""
+
+    __tablename__ = 'id_counters'
+
+    # Primary Key
+    name = db.Column(db.String(50), primary_key=True)
+
+    # Último valor entregado
+    last_value = db.Column(db.BigInteger, nullable=False)
+
+    @staticmethod
+    def next_value(name, seed):
+        """
+        Obtener el siguiente valor del contador (no hace commit)
+
+        El incremento forma parte de la transacción del llamador: si esta
+        hace rollback, el valor se libera junto con ella.
+
+        Args:
+            name: Nombre del contador
+            seed: Función que devuelve el último valor usado, para
+                  inicializar el contador la primera vez
+
+        Returns:
+            int: Siguiente valor
+        """
+        def increment():
+            # Incremento atómico en la base de datos (bloquea solo esta fila)
+            return db.session.execute(
+                update(IdCounter)
+                .where(IdCounter.name == name)
+                .values(last_value=IdCounter.last_value + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        if not increment():
+            try:
+                with db.session.begin_nested():
+                    db.session.add(IdCounter(name=name, last_value=seed()))
+            except IntegrityError:
+                # Otro proceso lo inicializó en paralelo
+                pass
+            increment()
+
+        return db.session.scalar(
+            select(IdCounter.last_value).where(IdCounter.name == name)
+        )
+
+    def __repr__(self):
+        return f'<IdCounter {self.name}={self.last_value}>'
@@ -3,6 +3,13 @@ Modelo de Operación para QoriCash Trading V2
 """
 from datetime import datetime
 from app.extensions import db
+from app.models.id_counter import IdCounter
+
+
+# Secuencia del número de operation_id (EXP-NNNN) en PostgreSQL.
+# nextval() no es transaccional ni bloquea: dos workers nunca obtienen el
+# mismo número ni se esperan entre sí (un rollback deja un hueco).
+operation_number_seq = db.Sequence('operation_number_seq', start=1001, metadata=db.metadata)
 
 
 class Operation(db.Model):
@@ -38,6 +45,9 @@ class Operation(db.Model):
     # Comprobantes de pago (URLs de Cloudinary)
     payment_proof_url = db.Column(db.String(500))
     operator_proof_url = db.Column(db.String(500))
+    # Miniaturas para listados (None si el comprobante es PDF)
+    payment_proof_thumbnail_url = db.Column(db.String(500))
+    operator_proof_thumbnail_url = db.Column(db.String(500))
     
     # Estado
     status = db.Column(
@@ -73,6 +83,10 @@ class Operation(db.Model):
             'exchange_rate > 0',
             name='check_exchange_rate_positive'
         ),
+        # Índices para paginación keyset ordenada por (created_at, id)
+        db.Index('ix_operations_created_at_id', 'created_at', 'id'),
+        db.Index('ix_operations_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_operations_client_created_at_id', 'client_id', 'created_at', 'id'),
     )
     
     def to_dict(self, include_relations=False):
@@ -91,18 +105,20 @@ class Operation(db.Model):
             'client_id': self.client_id,
             'user_id': self.user_id,
             'operation_type': self.operation_type,
-            'amount_usd': float(self.amount_usd),
-            'exchange_rate': float(self.exchange_rate),
-            'amount_pen': float(self.amount_pen),
+            'amount_usd': self.amount_usd,
+            'exchange_rate': self.exchange_rate,
+            'amount_pen': self.amount_pen,
             'source_account': self.source_account,
             'destination_account': self.destination_account,
             'payment_proof_url': self.payment_proof_url,
             'operator_proof_url': self.operator_proof_url,
+            'payment_proof_thumbnail_url': self.payment_proof_thumbnail_url,
+            'operator_proof_thumbnail_url': self.operator_proof_thumbnail_url,
             'status': self.status,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'completed_at': self.completed_at
         }
         
         if include_relations:
@@ -112,8 +128,10 @@ class Operation(db.Model):
                     data['client_name'] = self.client.razon_social
                 else:
                     data['client_name'] = self.client.full_name
+                data['client_dni'] = self.client.dni
             else:
                 data['client_name'] = None
+                data['client_dni'] = None
 
             data['user_name'] = self.user.username if self.user else None
         
@@ -148,21 +166,40 @@ class Operation(db.Model):
         """
         Generar ID de operación secuencial
         
+        En PostgreSQL usa la secuencia operation_number_seq; en otros
+        motores (SQLite) un contador transaccional en id_counters. Los IDs
+        son únicos aunque varios workers creen operaciones a la vez, pero
+        pueden quedar huecos.
+        
         Returns:
             str: ID de operación (EXP-1001, EXP-1002, etc.)
         """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            new_num = db.session.scalar(db.select(operation_number_seq.next_value()))
+        else:
+            new_num = IdCounter.next_value('operation_number', seed=Operation.get_last_operation_number)
+        
+        return f'EXP-{new_num:04d}'
+    
+    @staticmethod
+    def get_last_operation_number():
+        """
+        Obtener el último número de operación usado (EXP-NNNN)
+        
+        Solo se usa para inicializar el contador.
+        
+        Returns:
+            int: Último número (1000 si no hay operaciones)
+        """
         last_operation = Operation.query.order_by(Operation.id.desc()).first()
         
         if last_operation and last_operation.operation_id:
             try:
-                last_num = int(last_operation.operation_id.split('-')[1])
-                new_num = last_num + 1
+                return int(last_operation.operation_id.split('-')[1])
             except (IndexError, ValueError):
-                new_num = 1001
-        else:
-            new_num = 1001
+                pass
         
-        return f'EXP-{new_num:04d}'
+        return 1000
     
     def __repr__(self):
         return f'<Operation {self.operation_id} - {self.operation_type} ${self.amount_usd}>'
@@ -0,0 +1,283 @@
+"""
+Modelo de estadísticas diarias de operaciones para QoriCash Trading V2
+
+Tabla resumen (rollup) con una fila por día, estado y tipo de operación,
+y otra con las operaciones por cliente de cada bucket (para clientes
+únicos exactos de cualquier rango de días). Se mantienen de forma
+incremental en la misma transacción que crea o cambia de estado una
+operación, de modo que los dashboards mensuales y anuales leen como máximo
+unas pocas filas por día en lugar de todo el historial de operaciones.
+
+Los contadores se actualizan con UPDATE ... SET col = col + :delta (sin
+leer ni bloquear la fila antes): operaciones simultáneas del mismo día no
+se esperan entre sí más allá de la propia escritura.
+"""
+from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+
+
+def _to_amount(value):
+    """Normalizar un monto a Decimal con 2 decimales (como Numeric(15, 2))"""
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _to_day(value):
+    """Normalizar el resultado de func.date() (date en PostgreSQL, str en SQLite)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _increment(model, keys, deltas):
+    """
+    Sumar deltas a la fila de un bucket, creándola si no existe (no hace commit)
+
+    El UPDATE es atómico en la base de datos; si la fila no existe se
+    inserta dentro de un SAVEPOINT y, si otro worker la insertó en
+    paralelo, se repite el UPDATE en lugar de abortar la transacción.
+
+    Args:
+        model: OperationDailyStat u OperationDailyClientStat
+        keys: dict columna -> valor que identifica el bucket
+        deltas: dict columna -> cantidad a sumar
+    """
+    table = model.__table__
+    values = {column: table.c[column] + delta for column, delta in deltas.items()}
+    if 'updated_at' in table.c:
+        values['updated_at'] = datetime.utcnow()
+    update = table.update().where(*[table.c[column] == value for column, value in keys.items()]).values(**values)
+
+    if db.session.execute(update).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**keys, **deltas))
+    except IntegrityError:
+        db.session.execute(update)
+
+
+class OperationDailyStat(db.Model):
+    """Resumen diario de operaciones por estado y tipo"""
+
+    __tablename__ = 'operation_daily_stats'
+
+    # Primary Key
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Dimensiones
+    day = db.Column(db.Date, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    operation_type = db.Column(db.String(20), nullable=False)
+
+    # Métricas
+    operation_count = db.Column(db.Integer, nullable=False, default=0)
+    total_usd = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    total_pen = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+
+    # Timestamps
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        db.UniqueConstraint('day', 'status', 'operation_type', name='uq_operation_daily_stats_bucket'),
+    )
+
+    @staticmethod
+    def _apply(operation, status, sign):
+        """Sumar (sign=1) o restar (sign=-1) una operación a su bucket"""
+        keys = {'day': operation.created_at.date(), 'status': status, 'operation_type': operation.operation_type}
+        _increment(OperationDailyStat, keys, {
+            'operation_count': sign,
+            'total_usd': sign * _to_amount(operation.amount_usd),
+            'total_pen': sign * _to_amount(operation.amount_pen)
+        })
+        _increment(OperationDailyClientStat, {**keys, 'client_id': operation.client_id}, {
+            'operation_count': sign
+        })
+
+    @staticmethod
+    def record_created(operation):
+        """
+        Registrar una operación nueva (no hace commit)
+
+        Args:
+            operation: Operation recién creada
+        """
+        OperationDailyStat._apply(operation, operation.status, 1)
+
+    @staticmethod
+    def record_status_change(operation, old_status):
+        """
+        Mover una operación de bucket al cambiar de estado (no hace commit)
+
+        Args:
+            operation: Operation con el nuevo estado ya asignado
+            old_status: Estado anterior
+        """
+        if old_status == operation.status:
+            return
+        OperationDailyStat._apply(operation, old_status, -1)
+        OperationDailyStat._apply(operation, operation.status, 1)
+
+    @staticmethod
+    def get_period_stats(start_day, end_day):
+        """
+        Calcular KPIs de un rango de días a partir del rollup
+
+        Args:
+            start_day: Primer día (inclusive)
+            end_day: Último día (exclusivo)
+
+        Returns:
+            dict: Mismas claves que OperationService.get_period_stats
+        """
+        buckets = OperationDailyStat.query.filter(
+            OperationDailyStat.day >= start_day,
+            OperationDailyStat.day < end_day
+        ).all()
+
+        stats = {
+            'operations_count': 0,
+            'pending_count': 0,
+            'in_process_count': 0,
+            'completed_count': 0,
+            'canceled_count': 0,
+            'total_usd': Decimal('0'),
+            'total_pen': Decimal('0')
+        }
+        status_keys = {
+            'Pendiente': 'pending_count',
+            'En proceso': 'in_process_count',
+            'Completada': 'completed_count',
+            'Cancelado': 'canceled_count'
+        }
+        for bucket in buckets:
+            if bucket.operation_count <= 0:
+                continue
+
+            stats['operations_count'] += bucket.operation_count
+            stats[status_keys[bucket.status]] += bucket.operation_count
+
+            if bucket.status == 'Completada':
+                stats['total_usd'] += _to_amount(bucket.total_usd)
+                stats['total_pen'] += _to_amount(bucket.total_pen)
+
+        # Clientes con operaciones en el rango (todas / completadas)
+        client_rows = db.session.query(
+            OperationDailyClientStat.client_id,
+            OperationDailyClientStat.status
+        ).filter(
+            OperationDailyClientStat.day >= start_day,
+            OperationDailyClientStat.day < end_day,
+            OperationDailyClientStat.operation_count > 0
+        ).distinct().all()
+        unique_clients = {client_id for client_id, _ in client_rows}
+        active_clients = {client_id for client_id, status in client_rows if status == 'Completada'}
+
+        stats['unique_clients'] = len(unique_clients)
+        stats['active_clients'] = len(active_clients)
+
+        return stats
+
+    @staticmethod
+    def rebuild():
+        """
+        Reconstruir el rollup completo desde la tabla operations (backfill)
+
+        Hace commit al finalizar.
+
+        Returns:
+            int: Número de filas generadas
+        """
+        from app.models.operation import Operation
+
+        day_column = func.date(Operation.created_at)
+        rows = db.session.query(
+            day_column,
+            Operation.status,
+            Operation.operation_type,
+            Operation.client_id,
+            func.count(Operation.id),
+            func.coalesce(func.sum(Operation.amount_usd), 0),
+            func.coalesce(func.sum(Operation.amount_pen), 0)
+        ).group_by(
+            day_column,
+            Operation.status,
+            Operation.operation_type,
+            Operation.client_id
+        ).all()
+
+        buckets = {}
+        client_buckets = []
+        for day, status, operation_type, client_id, count, total_usd, total_pen in rows:
+            key = (_to_day(day), status, operation_type)
+            bucket = buckets.setdefault(key, {
+                'operation_count': 0,
+                'total_usd': Decimal('0'),
+                'total_pen': Decimal('0')
+            })
+            bucket['operation_count'] += count
+            bucket['total_usd'] += _to_amount(total_usd)
+            bucket['total_pen'] += _to_amount(total_pen)
+            client_buckets.append({
+                'day': key[0],
+                'status': status,
+                'operation_type': operation_type,
+                'client_id': client_id,
+                'operation_count': count
+            })
+
+        OperationDailyClientStat.query.delete()
+        OperationDailyStat.query.delete()
+        db.session.bulk_insert_mappings(OperationDailyStat, [
+            {
+                'day': day,
+                'status': status,
+                'operation_type': operation_type,
+                'operation_count': values['operation_count'],
+                'total_usd': values['total_usd'],
+                'total_pen': values['total_pen'],
+                'updated_at': datetime.utcnow()
+            }
+            for (day, status, operation_type), values in buckets.items()
+        ])
+        db.session.bulk_insert_mappings(OperationDailyClientStat, client_buckets)
+        db.session.commit()
+
+        return len(buckets)
+
+    def __repr__(self):
+        return f'<OperationDailyStat {self.day} {self.status} {self.operation_type}: {self.operation_count}>'
+
+
+class OperationDailyClientStat(db.Model):
+    """Operaciones de un cliente en un bucket diario (clientes únicos exactos)"""
+
+    __tablename__ = 'operation_daily_client_stats'
+
+    # Primary Key
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Dimensiones (las de OperationDailyStat + cliente)
+    day = db.Column(db.Date, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    operation_type = db.Column(db.String(20), nullable=False)
+    client_id = db.Column(db.Integer, nullable=False)
+
+    # Métricas
+    operation_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Constraints
+    __table_args__ = (
+        db.UniqueConstraint('day', 'status', 'operation_type', 'client_id',
+                            name='uq_operation_daily_client_stats_bucket'),
+    )
+
+    def __repr__(self):
+        return f'<OperationDailyClientStat {self.day} {self.status} {self.operation_type} {self.client_id}: {self.operation_count}>'
@@ -94,10 +94,10 @@ class User(UserMixin, db.Model):
             'dni': self.dni,
             'role': self.role,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
-            'last_logout': self.last_logout.isoformat() if self.last_logout else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'last_login': self.last_login,
+            'last_logout': self.last_logout
         }
         
         if include_relations:
@@ -123,3 +123,51 @@ class User(UserMixin, db.Model):
     
     def __repr__(self):
         return f'<User {self.username} ({self.role})>'
+
+
+class UserSnapshot(UserMixin):
+    """
+    Copia liviana de un usuario para la sesión (current_user)
+
+    No está ligada a la sesión de SQLAlchemy, por lo que se puede cachear
+    entre peticiones. Expone los mismos campos y helpers de rol que User;
+    para modificar el usuario hay que cargar el modelo con User.query.get(id).
+    """
+
+    __slots__ = ('id', 'username', 'email', 'dni', 'role', 'status')
+
+    def __init__(self, user):
+        """
+        Args:
+            user: Instancia de User
+        """
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.dni = user.dni
+        self.role = user.role
+        self.status = user.status
+
+    @property
+    def is_active(self):
+        """Flask-Login: solo los usuarios activos pueden iniciar sesión"""
+        return self.status == 'Activo'
+
+    def is_master(self):
+        """Verificar si es Master"""
+        return self.role == 'Master'
+
+    def is_trader(self):
+        """Verificar si es Trader"""
+        return self.role == 'Trader'
+
+    def is_operador(self):
+        """Verificar si es Operador"""
+        return self.role == 'Operador'
+
+    def is_active_user(self):
+        """Verificar si está activo"""
+        return self.status == 'Activo'
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username} ({self.role})>'
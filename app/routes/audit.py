@@ -0,0 +1,119 @@
+"""
+Rutas de Auditoría para QoriCash Trading V2
+"""
+from datetime import datetime, timedelta
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_login import login_required
+from app.services.audit_service import AuditService
+from app.utils.decorators import require_role
+
+audit_bp = Blueprint('audit', __name__)
+
+
+def _parse_date(value, end=False):
+    """
+    Interpretar una fecha 'YYYY-MM-DD' o un datetime ISO
+
+    Con end=True una fecha sin hora incluye el día completo (límite
+    exclusivo al inicio del día siguiente).
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+@audit_bp.route('/api/logs')
+@login_required
+@require_role('Master')
+def list_logs():
+    """
+    API: Consultar registros de auditoría (paginación por cursor)
+
+    Query params:
+        entity: Entidad ('User', 'Client', 'Operation')
+        entity_id: ID de la entidad
+        action: Acción (CREATE_OPERATION, LOGIN, ...)
+        user_id: Usuario que realizó la acción
+        from: Desde (YYYY-MM-DD o ISO datetime, UTC)
+        to: Hasta (YYYY-MM-DD inclusive o ISO datetime exclusivo, UTC)
+        limit: Tamaño de página (opcional)
+        after: Cursor devuelto en next_cursor (opcional)
+    """
+    entity = request.args.get('entity') or None
+    entity_id = request.args.get('entity_id', type=int)
+    if entity_id is not None and not entity:
+        return jsonify({'success': False, 'message': 'entity_id requiere entity'}), 400
+
+    try:
+        start_date = _parse_date(request.args.get('from'))
+        end_date = _parse_date(request.args.get('to'), end=True)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha inválida (use YYYY-MM-DD o ISO 8601)'}), 400
+
+    try:
+        logs, next_cursor = AuditService.get_logs_page(
+            limit=request.args.get('limit', type=int),
+            after=request.args.get('after'),
+            entity=entity,
+            entity_id=entity_id,
+            action=request.args.get('action') or None,
+            user_id=request.args.get('user_id', type=int),
+            start_date=start_date,
+            end_date=end_date
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return jsonify({
+        'success': True,
+        'logs': [log.to_dict() for log in logs],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+@audit_bp.route('/api/archive')
+@login_required
+@require_role('Master')
+def search_archive():
+    """
+    API: Buscar en la auditoría archivada (respuesta NDJSON en streaming)
+
+    Query params:
+        from: Primer día (YYYY-MM-DD, requerido)
+        to: Último día (YYYY-MM-DD, requerido)
+        entity, entity_id, action, user_id: Filtros opcionales
+        q: Texto a buscar en detalles o notas (opcional)
+        limit: Máximo de registros (opcional)
+    """
+    try:
+        start_date = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parámetros from y to requeridos (YYYY-MM-DD)'}), 400
+
+    if end_date < start_date:
+        return jsonify({'success': False, 'message': 'Rango de fechas inválido'}), 400
+
+    limit = request.args.get('limit', type=int)
+    records = AuditService.iter_archived_logs(
+        start_date,
+        end_date,
+        entity=request.args.get('entity') or None,
+        entity_id=request.args.get('entity_id', type=int),
+        action=request.args.get('action') or None,
+        user_id=request.args.get('user_id', type=int),
+        text=request.args.get('q') or None
+    )
+
+    def generate():
+        for count, record in enumerate(records, 1):
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+            if limit and count >= limit:
+                break
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -1,19 +1,40 @@
 """
 Rutas de Clientes para QoriCash Trading V2
 """
-from flask import Blueprint, render_template, request, jsonify, send_file
+from flask import Blueprint, render_template, request, jsonify, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.services.client_service import ClientService
+from app.services.client_service import ClientService, EXPORT_HEADERS
 from app.services.file_service import FileService
+from app.services.change_feed_service import ChangeFeedService
 from app.services.notification_service import NotificationService
-from app.utils.decorators import require_role
+from app.utils.decorators import require_role, conditional_get
+from app.utils.constants import CLIENT_SEARCH_LIMIT, CLIENT_STATS_MAX_IDS, EXPORT_BATCH_SIZE
 import io
 import csv
+import tempfile
 from datetime import datetime
 import json
 
 clients_bp = Blueprint('clients', __name__, url_prefix='/clients')
 
+# Documentos al crear: campo del formulario -> (campo del cliente, carpeta, sufijo del public_id)
+CREATE_DOCUMENT_FIELDS = {
+    'dni_front': ('dni_front_url', 'dni', 'front'),
+    'dni_back': ('dni_back_url', 'dni', 'back'),
+    'dni_representante_front': ('dni_representante_front_url', 'dni', 'rep_front'),
+    'dni_representante_back': ('dni_representante_back_url', 'dni', 'rep_back'),
+    'ficha_ruc': ('ficha_ruc_url', 'ruc', 'ruc'),
+}
+
+# Nombres para los mensajes de error de subida
+DOCUMENT_LABELS = {
+    'dni_front_url': 'documento frontal',
+    'dni_back_url': 'documento reverso',
+    'dni_representante_front_url': 'DNI representante frontal',
+    'dni_representante_back_url': 'DNI representante reverso',
+    'ficha_ruc_url': 'Ficha RUC',
+}
+
 
 @clients_bp.route('/')
 @clients_bp.route('/list')
@@ -26,22 +47,35 @@ def list_clients():
     Roles permitidos: Master, Trader, Operador
     """
     clients = ClientService.get_all_clients()
+    client_stats = ClientService.get_bulk_client_stats()
     return render_template('clients/list.html',
                            user=current_user,
-                           clients=clients)
+                           clients=clients,
+                           client_stats=client_stats)
 
 
 @clients_bp.route('/api/list')
 @login_required
 @require_role('Master', 'Trader', 'Operador')
+@conditional_get(ChangeFeedService.get_data_version)
 def api_list():
     """
     API: Listar clientes (JSON)
+
+    Query params:
+        include_stats: 'true' para incluir estadísticas de operaciones
     """
     clients = ClientService.get_all_clients()
+
+    if request.args.get('include_stats', '').lower() == 'true':
+        client_stats = ClientService.get_bulk_client_stats()
+        data = [client.to_dict(stats=client_stats.get(client.id)) for client in clients]
+    else:
+        data = [client.to_dict() for client in clients]
+
     return jsonify({
         'success': True,
-        'clients': [client.to_dict() for client in clients]
+        'clients': data
     })
 
 
@@ -66,45 +100,6 @@ def create_client():
         if isinstance(v, str):
             data[k] = v.strip()
 
-    file_service = FileService()
-    uploaded = {}
-
-    # Subida de archivos desde el modal (si vienen): mapear a nombres de campo esperados en el servicio
-    try:
-        # DNI/CE
-        if 'dni_front' in files:
-            ok, msg, url = file_service.upload_file(files['dni_front'], 'dni', f"{data.get('dni')}_front")
-            if not ok:
-                return jsonify({'success': False, 'message': msg}), 400
-            uploaded['dni_front_url'] = url
-        if 'dni_back' in files:
-            ok, msg, url = file_service.upload_file(files['dni_back'], 'dni', f"{data.get('dni')}_back")
-            if not ok:
-                return jsonify({'success': False, 'message': msg}), 400
-            uploaded['dni_back_url'] = url
-
-        # RUC / representante
-        if 'dni_representante_front' in files:
-            ok, msg, url = file_service.upload_file(files['dni_representante_front'], 'dni', f"{data.get('dni')}_rep_front")
-            if not ok:
-                return jsonify({'success': False, 'message': msg}), 400
-            uploaded['dni_representante_front_url'] = url
-        if 'dni_representante_back' in files:
-            ok, msg, url = file_service.upload_file(files['dni_representante_back'], 'dni', f"{data.get('dni')}_rep_back")
-            if not ok:
-                return jsonify({'success': False, 'message': msg}), 400
-            uploaded['dni_representante_back_url'] = url
-        if 'ficha_ruc' in files:
-            ok, msg, url = file_service.upload_file(files['ficha_ruc'], 'ruc', f"{data.get('dni')}_ruc")
-            if not ok:
-                return jsonify({'success': False, 'message': msg}), 400
-            uploaded['ficha_ruc_url'] = url
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error en subida de archivos: {str(e)}'}), 500
-
-    # Incorporar URLs subidas al payload
-    data.update(uploaded)
-
     # Bank accounts: primer preferencia campo 'bank_accounts' (ya implementado en JS),
     # si no viene, recoger legacy indexed fields: bank_name1, bank_account_number1, etc.
     bank_accounts_raw = data.get('bank_accounts')
@@ -116,6 +111,24 @@ def create_client():
                 return jsonify({'success': False, 'message': 'Formato inválido para bank_accounts'}), 400
     # Si request included legacy fields (bank_name1, bank_account_number1, etc.), el servicio los detectará
 
+    # Subida de archivos desde el modal (si vienen), en paralelo: campo del form -> campo del cliente
+    dni = data.get('dni')
+    uploads = {
+        url_field: (files[field], folder, f"{dni}_{suffix}")
+        for field, (url_field, folder, suffix) in CREATE_DOCUMENT_FIELDS.items()
+        if field in files
+    }
+    file_service = FileService()
+    try:
+        ok, msg, uploaded = file_service.upload_files_parallel(uploads, labels=DOCUMENT_LABELS)
+        if not ok:
+            return jsonify({'success': False, 'message': msg}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error en subida de archivos: {str(e)}'}), 500
+
+    # Incorporar URLs subidas al payload
+    data.update(uploaded)
+
     success, message, client = ClientService.create_client(current_user=current_user, data=data, files=files)
     if success:
         try:
@@ -125,6 +138,8 @@ def create_client():
             pass
         return jsonify({'success': True, 'message': message, 'client': client.to_dict()}), 201
     else:
+        # Los documentos ya subidos no se eliminan (claves por contenido): los
+        # huérfanos los limpia FileService.collect_garbage
         return jsonify({'success': False, 'message': message}), 400
 
 
@@ -188,53 +203,29 @@ def upload_documents(client_id):
     if not client:
         return jsonify({'success': False, 'message': 'Cliente no encontrado'}), 404
 
-    file_service = FileService()
-    document_urls = {}
+    if client.document_type == 'RUC':
+        fields = {
+            'dni_representante_front': ('dni_representante_front_url', 'dni', f"REP_{client.dni}_front"),
+            'dni_representante_back': ('dni_representante_back_url', 'dni', f"REP_{client.dni}_back"),
+            'ficha_ruc': ('ficha_ruc_url', 'ruc', f"RUC_{client.dni}"),
+        }
+    else:
+        fields = {
+            'dni_front': ('dni_front_url', 'dni', f"{client.dni}_front"),
+            'dni_back': ('dni_back_url', 'dni', f"{client.dni}_back"),
+        }
+    uploads = {
+        url_field: (request.files[field], folder, prefix)
+        for field, (url_field, folder, prefix) in fields.items()
+        if field in request.files
+    }
 
+    file_service = FileService()
     try:
-        if client.document_type == 'RUC':
-            # Subir documentos RUC
-            if 'dni_representante_front' in request.files:
-                file = request.files['dni_representante_front']
-                ok, msg, url = file_service.upload_file(file, 'dni', f"REP_{client.dni}")
-                if ok:
-                    document_urls['dni_representante_front_url'] = url
-                else:
-                    return jsonify({'success': False, 'message': f'Error DNI representante frontal: {msg}'}), 400
-
-            if 'dni_representante_back' in request.files:
-                file = request.files['dni_representante_back']
-                ok, msg, url = file_service.upload_file(file, 'dni', f"REP_{client.dni}")
-                if ok:
-                    document_urls['dni_representante_back_url'] = url
-                else:
-                    return jsonify({'success': False, 'message': f'Error DNI representante reverso: {msg}'}), 400
-
-            if 'ficha_ruc' in request.files:
-                file = request.files['ficha_ruc']
-                ok, msg, url = file_service.upload_file(file, 'ruc', f"RUC_{client.dni}")
-                if ok:
-                    document_urls['ficha_ruc_url'] = url
-                else:
-                    return jsonify({'success': False, 'message': f'Error Ficha RUC: {msg}'}), 400
-
-        else:
-            # Subir documentos DNI/CE
-            if 'dni_front' in request.files:
-                file = request.files['dni_front']
-                ok, msg, url = file_service.upload_dni_front(file, client.dni)
-                if ok:
-                    document_urls['dni_front_url'] = url
-                else:
-                    return jsonify({'success': False, 'message': f'Error documento frontal: {msg}'}), 400
-
-            if 'dni_back' in request.files:
-                file = request.files['dni_back']
-                ok, msg, url = file_service.upload_dni_back(file, client.dni)
-                if ok:
-                    document_urls['dni_back_url'] = url
-                else:
-                    return jsonify({'success': False, 'message': f'Error documento reverso: {msg}'}), 400
+        # Subidas en paralelo: el tiempo es el del archivo más lento
+        ok, msg, document_urls = file_service.upload_files_parallel(uploads, labels=DOCUMENT_LABELS)
+        if not ok:
+            return jsonify({'success': False, 'message': f'Error {msg}'}), 400
 
         # Actualizar cliente con URLs
         if document_urls:
@@ -250,6 +241,44 @@ def upload_documents(client_id):
         return jsonify({'success': False, 'message': f'Error al subir documentos: {str(e)}'}), 500
 
 
+@clients_bp.route('/api/stats')
+@login_required
+@require_role('Master', 'Trader', 'Operador')
+def get_bulk_stats():
+    """
+    API: Estadísticas de varios clientes (una sola consulta)
+
+    Query params:
+        ids: IDs separados por coma (ej: 1,2,3); máximo CLIENT_STATS_MAX_IDS
+        status: Filtrar por estado del cliente (opcional)
+        document_type: Filtrar por tipo de documento (opcional)
+
+    Sin 'ids' se devuelven las estadísticas de todos los clientes que
+    cumplan los filtros.
+    """
+    client_ids = None
+    raw_ids = request.args.get('ids', '').strip()
+    if raw_ids:
+        try:
+            client_ids = sorted({int(value) for value in raw_ids.split(',') if value.strip()})
+        except ValueError:
+            return jsonify({'success': False, 'message': 'IDs inválidos'}), 400
+
+        if len(client_ids) > CLIENT_STATS_MAX_IDS:
+            return jsonify({'success': False, 'message': f'Máximo {CLIENT_STATS_MAX_IDS} clientes por consulta'}), 400
+
+    stats = ClientService.get_bulk_client_stats(
+        client_ids=client_ids,
+        status=request.args.get('status') or None,
+        document_type=request.args.get('document_type') or None
+    )
+
+    return jsonify({
+        'success': True,
+        'stats': {str(client_id): values for client_id, values in stats.items()}
+    })
+
+
 @clients_bp.route('/api/<int:client_id>/stats')
 @login_required
 @require_role('Master', 'Trader', 'Operador')
@@ -270,14 +299,22 @@ def get_stats(client_id):
 @require_role('Master', 'Trader', 'Operador')
 def search():
     """
-    API: Buscar clientes
+    API: Buscar clientes (resultados ordenados por relevancia)
+
+    Query params:
+        q: Texto a buscar (mínimo 3 caracteres)
+        limit: Máximo de resultados (opcional, máx CLIENT_SEARCH_LIMIT)
     """
     query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', type=int)
 
     if not query or len(query) < 3:
         return jsonify({'success': False, 'message': 'La búsqueda debe tener al menos 3 caracteres'}), 400
 
-    clients = ClientService.search_clients(query)
+    if not limit or limit < 1 or limit > CLIENT_SEARCH_LIMIT:
+        limit = CLIENT_SEARCH_LIMIT
+
+    clients = ClientService.search_clients(query, limit=limit)
 
     return jsonify({'success': True, 'clients': [client.to_dict() for client in clients]})
 
@@ -287,133 +324,64 @@ def search():
 @require_role('Master')
 def export_csv():
     """
-    API: Exportar clientes a Excel con formato de tabla
+    API: Exportar clientes
+
+    Query params:
+        format: 'xlsx' (por defecto) o 'csv'
+
+    El CSV se envía en streaming (los bytes empiezan a llegar de inmediato).
+    El Excel se genera en modo write-only sobre un archivo temporal, sin
+    mantener el libro completo en memoria.
+
+    La interfaz usa exportaciones en segundo plano (/exports/api/jobs);
+    este endpoint se mantiene para descargas directas.
     """
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in ('xlsx', 'csv'):
+        return jsonify({'success': False, 'message': 'Formato inválido (use xlsx o csv)'}), 400
+
+    from app.models.client import Client
+    if Client.query.with_entities(Client.id).first() is None:
+        return jsonify({'success': False, 'message': 'No hay clientes para exportar'}), 404
+
+    filename = f"clientes_qoricash_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    if export_format == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+
+            # BOM para que Excel detecte UTF-8
+            buffer.write('\ufeff')
+            writer.writerow(EXPORT_HEADERS)
+
+            for count, row in enumerate(ClientService.iter_export_rows(), 1):
+                writer.writerow(row)
+                if count % EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+
+            yield buffer.getvalue()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from openpyxl.utils import get_column_letter
-
-        # Obtener todos los clientes con eager loading
-        from sqlalchemy.orm import joinedload
-        from app.models.client import Client
-        clients = Client.query.options(joinedload(Client.creator)).order_by(Client.created_at.desc()).all()
-
-        if not clients:
-            return jsonify({'success': False, 'message': 'No hay clientes para exportar'}), 404
-
-        # Crear workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Clientes"
-
-        # Definir columnas en orden específico (ahora con más detalle)
-        headers = [
-            'ID',
-            'Tipo Documento',
-            'Número Documento',
-            'Nombre Completo',
-            'Persona Contacto',  # Para RUC
-            'Email',
-            'Teléfono',
-            'Dirección',
-            'Distrito',
-            'Provincia',
-            'Departamento',
-            'Usuario Registro',
-            'Fecha Registro',
-            'Estado',
-            'Total Operaciones',
-            'Operaciones Completadas',
-            'Cuenta Bancaria 1',
-            'Cuenta Bancaria 2',
-            'Cuenta Bancaria 3',
-            'Cuenta Bancaria 4',
-            'Cuenta Bancaria 5',
-            'Cuenta Bancaria 6'
-        ]
-
-        # Escribir encabezados con formato
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Escribir datos
-        for row_num, client in enumerate(clients, 2):
-            col = 1
-            ws.cell(row=row_num, column=col, value=client.id); col += 1
-            ws.cell(row=row_num, column=col, value=client.document_type); col += 1
-            ws.cell(row=row_num, column=col, value=client.dni); col += 1
-            ws.cell(row=row_num, column=col, value=client.full_name or ''); col += 1
-
-            # Persona de contacto (solo para RUC)
-            ws.cell(row=row_num, column=col, value=client.persona_contacto if client.document_type == 'RUC' else ''); col += 1
-
-            ws.cell(row=row_num, column=col, value=client.email); col += 1
-            ws.cell(row=row_num, column=col, value=client.phone or ''); col += 1
-
-            # Dirección separada en columnas
-            ws.cell(row=row_num, column=col, value=client.direccion or ''); col += 1
-            ws.cell(row=row_num, column=col, value=client.distrito or ''); col += 1
-            ws.cell(row=row_num, column=col, value=client.provincia or ''); col += 1
-            ws.cell(row=row_num, column=col, value=client.departamento or ''); col += 1
-
-            ws.cell(row=row_num, column=col, value=client.creator.email if client.creator else 'N/A'); col += 1
-            ws.cell(row=row_num, column=col, value=client.created_at.strftime('%d/%m/%Y %H:%M') if client.created_at else ''); col += 1
-            ws.cell(row=row_num, column=col, value=client.status); col += 1
-            ws.cell(row=row_num, column=col, value=client.get_total_operations()); col += 1
-            ws.cell(row=row_num, column=col, value=client.get_completed_operations()); col += 1
-
-            # Cuentas bancarias (hasta 6)
-            bank_accounts = client.bank_accounts or []
-            for i in range(6):
-                if i < len(bank_accounts):
-                    account = bank_accounts[i]
-                    account_str = f"{account.get('bank_name', '')} | {account.get('account_type', '')} | {account.get('currency', '')} | {account.get('account_number', '')}"
-                    ws.cell(row=row_num, column=col, value=account_str)
-                else:
-                    ws.cell(row=row_num, column=col, value='')
-                col += 1
-
-        # Ajustar ancho de columnas
-        column_widths = {
-            'A': 8,   # ID
-            'B': 15,  # Tipo Documento
-            'C': 18,  # Número Documento
-            'D': 35,  # Nombre Completo
-            'E': 30,  # Persona Contacto
-            'F': 30,  # Email
-            'G': 15,  # Teléfono
-            'H': 30,  # Dirección
-            'I': 20,  # Distrito
-            'J': 20,  # Provincia
-            'K': 20,  # Departamento
-            'L': 30,  # Usuario Registro
-            'M': 18,  # Fecha Registro
-            'N': 12,  # Estado
-            'O': 18,  # Total Ops
-            'P': 20,  # Ops Completadas
-            'Q': 50,  # Cuenta 1
-            'R': 50,  # Cuenta 2
-            'S': 50,  # Cuenta 3
-            'T': 50,  # Cuenta 4
-            'U': 50,  # Cuenta 5
-            'V': 50   # Cuenta 6
-        }
+        from app.services.export_service import ExportService
 
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
+        spec = ExportService.get_export_types()['clients']
 
-        # Guardar en memoria
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
+        # El formato xlsx (zip) solo se puede emitir al terminar; se usa un
+        # archivo temporal para no retener el libro en memoria
+        excel_file = tempfile.TemporaryFile()
+        ExportService.write_xlsx(excel_file, EXPORT_HEADERS, ClientService.iter_export_rows(),
+                                 spec['column_widths'], spec['sheet_title'])
         excel_file.seek(0)
 
-        # Nombre del archivo con fecha
-        filename = f"clientes_qoricash_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
         return send_file(
             excel_file,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
@@ -475,7 +443,7 @@ def upload_validation_oc(client_id):
     try:
         file_service = FileService()
 
-        # Subir archivo a Cloudinary con folder específico para validación OC
+        # Subir archivo con folder específico para validación OC
         ok, msg, url = file_service.upload_file(file, 'validation_oc', f"OC_{client.dni}")
 
         if not ok:
@@ -484,7 +452,9 @@ def upload_validation_oc(client_id):
         # Actualizar cliente con URL de validación OC
         client.validation_oc_url = url
         from app.extensions import db
+        ChangeFeedService.record('Client', client.id, 'update')
         db.session.commit()
+        ChangeFeedService.publish()
 
         return jsonify({
             'success': True,
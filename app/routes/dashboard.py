@@ -4,10 +4,18 @@ Rutas de Dashboard para QoriCash Trading V2
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from app.services.operation_service import OperationService
+from app.services.change_feed_service import ChangeFeedService
+from app.utils.decorators import conditional_get
+from app.utils.formatters import now_peru
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 
+def _dashboard_data_version():
+    """Token de ETag de /api/dashboard_data (las cifras de 'hoy' cambian con la fecha)"""
+    return ChangeFeedService.get_data_version(), now_peru().date()
+
+
 @dashboard_bp.route('/')
 @dashboard_bp.route('/dashboard')
 @login_required
@@ -18,20 +26,41 @@ def index():
     Redirige al dashboard según el rol del usuario
     """
     # Verificar rol y mostrar dashboard correspondiente
+    change_seq = ChangeFeedService.get_current_seq()
     if current_user.role == 'Master':
-        return render_template('dashboard/master.html', user=current_user)
+        return render_template('dashboard/master.html', user=current_user, change_seq=change_seq)
     elif current_user.role == 'Trader':
-        return render_template('dashboard/trader.html', user=current_user)
+        return render_template('dashboard/trader.html', user=current_user, change_seq=change_seq)
     elif current_user.role == 'Operador':
         # Los operadores van directamente a operaciones
         from app.routes.operations import operations_list
         return operations_list()
     else:
-        return render_template('dashboard/trader.html', user=current_user)
+        return render_template('dashboard/trader.html', user=current_user, change_seq=change_seq)
+
+
+@dashboard_bp.route('/api/changes')
+@login_required
+def get_changes():
+    """
+    API: Cambios posteriores a una secuencia (catch-up del feed de deltas)
+    
+    Query params:
+        since: Última secuencia aplicada por el navegador (requerido)
+    
+    Returns:
+        JSON con 'seq', 'reset' (recargar la página) y 'changes'
+    """
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'success': False, 'message': 'Parámetro since inválido'}), 400
+    
+    return jsonify({'success': True, **ChangeFeedService.get_changes(since, current_user.role)})
 
 
 @dashboard_bp.route('/api/dashboard_data')
 @login_required
+@conditional_get(_dashboard_data_version)
 def get_dashboard_data():
     """
     API: Obtener datos del dashboard
@@ -71,23 +100,16 @@ def get_today_stats():
     API: Obtener estadísticas de hoy
     """
     from datetime import date
-    from app.models.operation import Operation
-    from sqlalchemy import func
-    
-    today = date.today()
-    operations = Operation.query.filter(
-        func.date(Operation.created_at) == today
-    ).all()
     
-    completed = [op for op in operations if op.status == 'Completada']
+    stats = OperationService.get_period_stats(*OperationService.get_day_range(date.today()))
     
     return jsonify({
-        'operations_count': len(operations),
-        'completed_count': len(completed),
-        'pending_count': sum(1 for op in operations if op.status == 'Pendiente'),
-        'in_process_count': sum(1 for op in operations if op.status == 'En proceso'),
-        'total_usd': float(sum(op.amount_usd for op in completed)),
-        'total_pen': float(sum(op.amount_pen for op in completed))
+        'operations_count': stats['operations_count'],
+        'completed_count': stats['completed_count'],
+        'pending_count': stats['pending_count'],
+        'in_process_count': stats['in_process_count'],
+        'total_usd': stats['total_usd'],
+        'total_pen': stats['total_pen']
     })
 
 
@@ -98,32 +120,45 @@ def get_month_stats():
     API: Obtener estadísticas del mes actual
     """
     from datetime import datetime
-    from app.models.operation import Operation
-    from sqlalchemy import and_
     
     now = datetime.now()
-    start_date = datetime(now.year, now.month, 1)
-    if now.month == 12:
-        end_date = datetime(now.year + 1, 1, 1)
-    else:
-        end_date = datetime(now.year, now.month + 1, 1)
+    stats = OperationService.get_period_stats(*OperationService.get_month_range(now.month, now.year))
+    
+    return jsonify({
+        'operations_count': stats['operations_count'],
+        'completed_count': stats['completed_count'],
+        'pending_count': stats['pending_count'],
+        'in_process_count': stats['in_process_count'],
+        'canceled_count': stats['canceled_count'],
+        'total_usd': stats['total_usd'],
+        'total_pen': stats['total_pen'],
+        'unique_clients': stats['unique_clients']
+    })
+
+
+@dashboard_bp.route('/api/stats/year')
+@login_required
+def get_year_stats():
+    """
+    API: Obtener estadísticas de un año (por defecto el actual)
     
-    operations = Operation.query.filter(
-        and_(
-            Operation.created_at >= start_date,
-            Operation.created_at < end_date
-        )
-    ).all()
+    Query params:
+        year: Año opcional
+    """
+    from datetime import datetime
     
-    completed = [op for op in operations if op.status == 'Completada']
+    year = request.args.get('year', type=int) or datetime.now().year
+    stats = OperationService.get_year_stats(year)
     
     return jsonify({
-        'operations_count': len(operations),
-        'completed_count': len(completed),
-        'pending_count': sum(1 for op in operations if op.status == 'Pendiente'),
-        'in_process_count': sum(1 for op in operations if op.status == 'En proceso'),
-        'canceled_count': sum(1 for op in operations if op.status == 'Cancelado'),
-        'total_usd': float(sum(op.amount_usd for op in completed)),
-        'total_pen': float(sum(op.amount_pen for op in completed)),
-        'unique_clients': len(set(op.client_id for op in operations))
+        'year': year,
+        'operations_count': stats['operations_count'],
+        'completed_count': stats['completed_count'],
+        'pending_count': stats['pending_count'],
+        'in_process_count': stats['in_process_count'],
+        'canceled_count': stats['canceled_count'],
+        'total_usd': stats['total_usd'],
+        'total_pen': stats['total_pen'],
+        'unique_clients': stats['unique_clients'],
+        'active_clients': stats['active_clients']
     })
@@ -0,0 +1,96 @@
+"""
+Rutas de Exportaciones para QoriCash Trading V2
+
+Las exportaciones se encolan como trabajos en segundo plano: el cliente
+recibe el ID del trabajo, consulta su progreso (o escucha los eventos
+SocketIO 'export_progress' / 'export_completed' / 'export_failed') y
+descarga el archivo cuando está listo.
+"""
+import os
+from flask import Blueprint, request, jsonify, send_file
+from flask_login import login_required, current_user
+from app.services.export_service import ExportService, EXPORT_FORMATS
+from app.utils.decorators import require_role
+
+exports_bp = Blueprint('exports', __name__)
+
+
+@exports_bp.route('/api/jobs', methods=['POST'])
+@login_required
+@require_role('Master', 'Trader')
+def create_job():
+    """
+    API: Encolar una exportación
+
+    Body JSON:
+        type: 'clients', 'operations' o 'audit_logs'
+        format: 'xlsx' (por defecto) o 'csv'
+
+    Returns:
+        202 con el trabajo creado, 403 si su rol no puede pedir ese tipo,
+        429 si el usuario ya tiene el máximo de exportaciones en curso
+    """
+    data = request.get_json() or {}
+    export_type = data.get('type')
+    export_format = (data.get('format') or 'xlsx').lower()
+
+    if export_type in ExportService.get_export_types() and not ExportService.can_export(current_user, export_type):
+        return jsonify({'success': False, 'message': 'No tienes permiso para esta exportación'}), 403
+
+    success, message, job = ExportService.create_job(current_user, export_type, export_format)
+
+    if success:
+        return jsonify({'success': True, 'message': message, 'job': job.to_dict()}), 202
+
+    status_code = 429 if ExportService.is_at_job_limit(current_user.id) else 400
+    return jsonify({'success': False, 'message': message}), status_code
+
+
+@exports_bp.route('/api/jobs')
+@login_required
+@require_role('Master', 'Trader')
+def list_jobs():
+    """
+    API: Listar las últimas exportaciones del usuario
+    """
+    jobs = ExportService.get_user_jobs(current_user.id)
+    return jsonify({'success': True, 'jobs': [job.to_dict() for job in jobs]})
+
+
+@exports_bp.route('/api/jobs/<int:job_id>')
+@login_required
+@require_role('Master', 'Trader')
+def get_job(job_id):
+    """
+    API: Consultar estado y progreso de una exportación
+    """
+    job = ExportService.get_job(job_id, current_user.id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Exportación no encontrada'}), 404
+
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@exports_bp.route('/api/jobs/<int:job_id>/download')
+@login_required
+@require_role('Master', 'Trader')
+def download_job(job_id):
+    """
+    Descargar el archivo de una exportación terminada
+    """
+    job = ExportService.get_job(job_id, current_user.id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Exportación no encontrada'}), 404
+
+    if job.status != 'Completado':
+        return jsonify({'success': False, 'message': 'La exportación aún no está lista'}), 409
+
+    if not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'success': False, 'message': 'El archivo ya no está disponible'}), 410
+
+    return send_file(
+        job.file_path,
+        mimetype=EXPORT_FORMATS[job.export_format],
+        as_attachment=True,
+        download_name=job.file_name
+    )
@@ -0,0 +1,28 @@
+"""
+Rutas de Archivos para QoriCash Trading V2
+
+Sirve los archivos del backend de almacenamiento local
+(STORAGE_BACKEND=local, ver app/utils/storage.py). Son documentos de
+clientes y comprobantes: solo para usuarios autenticados.
+"""
+from flask import Blueprint, current_app, send_from_directory, abort
+from flask_login import login_required
+
+files_bp = Blueprint('files', __name__)
+
+
+@files_bp.route('/<path:key>')
+@login_required
+def serve(key):
+    """
+    Descargar un archivo por su clave (<carpeta>/<sha256>.<ext>)
+
+    El contenido de una clave nunca cambia: se cachea en el navegador
+    sin revalidar.
+    """
+    if current_app.config['STORAGE_BACKEND'] not in ('local', 'auto'):
+        abort(404)
+
+    response = send_from_directory(current_app.config['LOCAL_STORAGE_DIR'], key)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
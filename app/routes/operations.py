@@ -4,9 +4,10 @@ Rutas de Operaciones para QoriCash Trading V2
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from app.services.operation_service import OperationService
+from app.services.change_feed_service import ChangeFeedService
 from app.services.file_service import FileService
 from app.services.notification_service import NotificationService
-from app.utils.decorators import require_role
+from app.utils.decorators import require_role, conditional_get
 
 operations_bp = Blueprint('operations', __name__)
 
@@ -23,15 +24,20 @@ def operations_list():
     - Operador: Solo operaciones en proceso
     """
     if current_user.role == 'Operador':
+        # Secuencia antes de los datos: lo que cambie después llega como delta
+        change_seq = ChangeFeedService.get_current_seq()
         operations = OperationService.get_operations_for_operator()
         return render_template('operations/operator_list.html', 
                              user=current_user, 
-                             operations=operations)
+                             operations=operations,
+                             change_seq=change_seq)
     else:
-        operations = OperationService.get_all_operations(include_relations=False)
+        # Solo la primera página; el resto se carga por cursor desde operations.js
+        operations, next_cursor = OperationService.get_operations_page()
         return render_template('operations/list.html', 
                              user=current_user, 
-                             operations=operations)
+                             operations=operations,
+                             next_cursor=next_cursor)
 
 
 @operations_bp.route('/create')
@@ -50,29 +56,40 @@ def create_page():
 
 @operations_bp.route('/api/list')
 @login_required
+@conditional_get(ChangeFeedService.get_data_version)
 def api_list():
     """
-    API: Listar operaciones
+    API: Listar operaciones (paginación por cursor)
     
     Query params:
         status: Filtrar por estado (opcional)
         client_id: Filtrar por cliente (opcional)
+        limit: Tamaño de página (opcional, máx MAX_PAGE_SIZE)
+        after: Cursor 'next_cursor' de la respuesta anterior (opcional)
+    
+    Returns:
+        JSON con 'operations', 'next_cursor' (None en la última página) y 'has_more'
     """
     status = request.args.get('status')
     client_id = request.args.get('client_id', type=int)
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after')
     
-    if status:
-        operations = OperationService.get_operations_by_status(status)
-    elif client_id:
-        operations = OperationService.get_operations_by_client(client_id)
-    else:
-        operations = OperationService.get_all_operations(include_relations=True)
-        # Ya viene como diccionarios
-        return jsonify({'success': True, 'operations': operations})
+    try:
+        operations, next_cursor = OperationService.get_operations_page(
+            limit=limit,
+            after=after,
+            status=status,
+            client_id=client_id
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     return jsonify({
         'success': True,
-        'operations': [op.to_dict(include_relations=True) for op in operations]
+        'operations': [op.to_dict(include_relations=True) for op in operations],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
     })
 
 
@@ -192,24 +209,24 @@ def upload_proof(operation_id):
     
     file_service = FileService()
     
-    payment_proof_url = None
-    operator_proof_url = None
+    payment_proof_url = payment_proof_thumbnail_url = None
+    operator_proof_url = operator_proof_thumbnail_url = None
     
-    # Subir comprobante de pago (cliente)
+    # Subir comprobante de pago (cliente); las imágenes se normalizan y generan miniatura
     if 'payment_proof' in request.files:
         file = request.files['payment_proof']
-        success, message, url = file_service.upload_payment_proof(file, operation.operation_id)
+        success, message, url, thumbnail_url = file_service.upload_payment_proof(file, operation.operation_id)
         if success:
-            payment_proof_url = url
+            payment_proof_url, payment_proof_thumbnail_url = url, thumbnail_url
         else:
             return jsonify({'success': False, 'message': f'Error comprobante de pago: {message}'}), 400
     
     # Subir comprobante del operador
     if 'operator_proof' in request.files:
         file = request.files['operator_proof']
-        success, message, url = file_service.upload_operator_proof(file, operation.operation_id)
+        success, message, url, thumbnail_url = file_service.upload_operator_proof(file, operation.operation_id)
         if success:
-            operator_proof_url = url
+            operator_proof_url, operator_proof_thumbnail_url = url, thumbnail_url
         else:
             return jsonify({'success': False, 'message': f'Error comprobante del operador: {message}'}), 400
     
@@ -219,7 +236,9 @@ def upload_proof(operation_id):
             current_user=current_user,
             operation_id=operation_id,
             payment_proof_url=payment_proof_url,
-            operator_proof_url=operator_proof_url
+            operator_proof_url=operator_proof_url,
+            payment_proof_thumbnail_url=payment_proof_thumbnail_url,
+            operator_proof_thumbnail_url=operator_proof_thumbnail_url
         )
         
         if success:
@@ -253,6 +272,10 @@ def cancel_operation(operation_id):
             'message': 'La razón de cancelación es requerida'
         }), 400
     
+    # Obtener operación para guardar estado anterior
+    operation = OperationService.get_operation_by_id(operation_id)
+    old_status = operation.status if operation else None
+    
     # Cancelar operación
     success, message, operation = OperationService.cancel_operation(
         current_user=current_user,
@@ -262,7 +285,7 @@ def cancel_operation(operation_id):
     
     if success:
         # Notificar cancelación
-        NotificationService.notify_operation_canceled(operation, reason)
+        NotificationService.notify_operation_canceled(operation, reason, old_status)
         NotificationService.notify_dashboard_update()
         
         return jsonify({
@@ -0,0 +1,20 @@
+"""
+Eventos de conexión SocketIO para QoriCash Trading V2
+
+Solo se aceptan sockets de usuarios autenticados (misma cookie de sesión
+que las rutas HTTP). Al conectar, el socket entra a la sala de su rol y a
+la de su usuario, que usa NotificationService para dirigir los eventos.
+"""
+from flask_login import current_user
+from flask_socketio import join_room
+from app.extensions import socketio
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Autenticar el socket y unirlo a las salas de rol y usuario"""
+    if not current_user.is_authenticated:
+        return False  # Rechazar la conexión
+
+    join_room(current_user.role)
+    join_room(f'user_{current_user.id}')
@@ -5,7 +5,8 @@ from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from app.services.user_service import UserService
 from app.services.notification_service import NotificationService
-from app.utils.decorators import require_role
+from app.services.change_feed_service import ChangeFeedService
+from app.utils.decorators import require_role, conditional_get
 
 users_bp = Blueprint('users', __name__)
 
@@ -25,6 +26,7 @@ def manage():
 @users_bp.route('/api/list')
 @login_required
 @require_role('Master')
+@conditional_get(ChangeFeedService.get_data_version)
 def list_users():
     """
     API: Listar todos los usuarios
@@ -198,6 +200,60 @@ def get_user(user_id):
     })
 
 
+@users_bp.route('/api/leaderboard')
+@login_required
+@require_role('Master')
+def leaderboard():
+    """
+    API: Ranking de traders por volumen en un periodo
+    
+    Query params:
+        period: 'today', 'month' (por defecto), 'year' o 'all'
+        month: Mes (1-12) para period=month (opcional, por defecto el actual)
+        year: Año para period=month/year (opcional, por defecto el actual)
+        role: Rol a rankear (por defecto 'Trader'; 'all' = todos)
+    """
+    from datetime import date, datetime
+    from app.services.operation_service import OperationService
+    
+    period = request.args.get('period', 'month')
+    today = date.today()
+    month = request.args.get('month', type=int) or today.month
+    year = request.args.get('year', type=int) or today.year
+    
+    # El rango termina en el año siguiente: year + 1 debe ser un año válido
+    if period in ('month', 'year') and not 1 <= year <= 9998:
+        return jsonify({'success': False, 'message': 'Año inválido'}), 400
+    
+    if period == 'today':
+        start_date, end_date = OperationService.get_day_range(today)
+    elif period == 'month':
+        if not 1 <= month <= 12:
+            return jsonify({'success': False, 'message': 'Mes inválido'}), 400
+        start_date, end_date = OperationService.get_month_range(month, year)
+    elif period == 'year':
+        start_date, end_date = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    elif period == 'all':
+        start_date, end_date = None, None
+    else:
+        return jsonify({'success': False, 'message': 'Periodo inválido (today, month, year, all)'}), 400
+    
+    role = request.args.get('role', 'Trader')
+    leaderboard = UserService.get_trader_leaderboard(
+        start_date=start_date,
+        end_date=end_date,
+        role=None if role == 'all' else role
+    )
+    
+    return jsonify({
+        'success': True,
+        'period': period,
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'leaderboard': leaderboard
+    })
+
+
 @users_bp.route('/api/by_role/<role>')
 @login_required
 def get_users_by_role(role):
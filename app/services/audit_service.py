@@ -0,0 +1,352 @@
+"""
+Servicio de Auditoría para QoriCash Trading V2
+
+Los registros de auditoría normalmente se escriben en la misma transacción
+que el cambio que describen (AuditLog.log_action). Para acciones de alto
+volumen que no acompañan a ningún cambio de negocio (LOGIN, LOGOUT) se
+puede usar un buffer write-behind: los registros se acumulan en memoria y
+se insertan por lotes cada AUDIT_BUFFER_SIZE registros o cada
+AUDIT_BUFFER_FLUSH_INTERVAL segundos.
+
+Retención: los registros más antiguos que AUDIT_RETENTION_DAYS se mueven a
+archivos JSONL comprimidos por día (AUDIT_ARCHIVE_DIR/YYYY/MM/) y se
+borran de la tabla por lotes; iter_archived_logs permite buscar en ellos.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.audit_log import AuditLog
+from app.models.user import User
+from app.utils.pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriteBuffer:
+    """Buffer write-behind de registros de auditoría (por proceso)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._timer = None
+        self._app = None
+        atexit.register(self.flush)
+
+    def add(self, app, row, max_size, interval):
+        """
+        Agregar un registro al buffer
+
+        Args:
+            app: Aplicación Flask (para escribir desde el hilo del timer)
+            row: Diccionario con las columnas de audit_logs
+            max_size: Tamaño que dispara la escritura inmediata
+            interval: Segundos máximos que un registro espera en el buffer
+        """
+        with self._lock:
+            self._app = app
+            self._rows.append(row)
+            full = len(self._rows) >= max_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribir los registros pendientes en un solo INSERT
+
+        Returns:
+            int: Número de registros escritos
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            app = self._app
+
+        if not rows or app is None:
+            return 0
+
+        try:
+            with app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(AuditLog.__table__.insert(), rows)
+        except Exception:
+            logger.exception(f"Error al escribir {len(rows)} registros de auditoría")
+            # Reintentar en el siguiente flush sin crecer indefinidamente
+            with self._lock:
+                limit = app.config['AUDIT_BUFFER_SIZE'] * 10
+                self._rows = (rows + self._rows)[-limit:]
+            return 0
+
+        return len(rows)
+
+    def pending(self):
+        """Número de registros en espera"""
+        with self._lock:
+            return len(self._rows)
+
+
+_audit_buffer = AuditWriteBuffer()
+
+
+class AuditService:
+    """Servicio de auditoría"""
+
+    @staticmethod
+    def log(user_id, action, entity, entity_id=None, details=None, notes=None, ip_address=None, user_agent=None):
+        """
+        Registrar una acción de auditoría
+
+        Las acciones de AUDIT_BUFFERED_ACTIONS van al buffer write-behind
+        (si AUDIT_BUFFER_ENABLED); el resto se agregan a la transacción
+        actual como AuditLog.log_action y se confirman con el commit del
+        llamador.
+
+        Args:
+            user_id: ID del usuario que realiza la acción
+            action: Acción realizada (LOGIN, LOGOUT, ...)
+            entity: Entidad afectada (User, Client, Operation)
+            entity_id: ID de la entidad afectada
+            details: Detalles adicionales
+            notes: Notas adicionales
+            ip_address: IP del usuario
+            user_agent: User agent del navegador
+        """
+        config = current_app.config
+
+        if not config['AUDIT_BUFFER_ENABLED'] or action not in config['AUDIT_BUFFERED_ACTIONS']:
+            AuditLog.log_action(
+                user_id=user_id,
+                action=action,
+                entity=entity,
+                entity_id=entity_id,
+                details=details,
+                notes=notes,
+                ip_address=ip_address,
+                user_agent=user_agent
+            )
+            return
+
+        _audit_buffer.add(
+            current_app._get_current_object(),
+            {
+                'user_id': user_id,
+                'action': action,
+                'entity': entity,
+                'entity_id': entity_id,
+                'details': details,
+                'notes': notes,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'created_at': datetime.utcnow()
+            },
+            max_size=config['AUDIT_BUFFER_SIZE'],
+            interval=config['AUDIT_BUFFER_FLUSH_INTERVAL']
+        )
+
+    @staticmethod
+    def flush():
+        """
+        Forzar la escritura del buffer write-behind
+
+        Returns:
+            int: Número de registros escritos
+        """
+        return _audit_buffer.flush()
+
+    @staticmethod
+    def get_logs_page(limit=None, after=None, entity=None, entity_id=None, action=None,
+                      user_id=None, start_date=None, end_date=None):
+        """
+        Obtener una página de registros de auditoría (paginación keyset)
+
+        Cada combinación de filtros usa uno de los índices compuestos de
+        audit_logs, terminados en (created_at, id), por lo que el costo de
+        una página no depende del tamaño de la tabla. El usuario se carga
+        en la misma consulta (JOIN).
+
+        Args:
+            limit: Tamaño de página (opcional)
+            after: Cursor de la página anterior (opcional)
+            entity: Entidad ('User', 'Client', 'Operation')
+            entity_id: ID de la entidad (requiere entity)
+            action: Acción (CREATE_OPERATION, LOGIN, ...)
+            user_id: ID del usuario que realizó la acción
+            start_date: Desde (inclusive, UTC como created_at)
+            end_date: Hasta (exclusivo, UTC como created_at)
+
+        Returns:
+            tuple: (logs: list, next_cursor: str|None)
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        query = AuditLog.query.options(
+            joinedload(AuditLog.user).load_only(User.username)
+        )
+
+        if entity:
+            query = query.filter(AuditLog.entity == entity)
+        if entity_id is not None:
+            query = query.filter(AuditLog.entity_id == entity_id)
+        if action:
+            query = query.filter(AuditLog.action == action)
+        if user_id:
+            query = query.filter(AuditLog.user_id == user_id)
+        if start_date:
+            query = query.filter(AuditLog.created_at >= start_date)
+        if end_date:
+            query = query.filter(AuditLog.created_at < end_date)
+
+        return keyset_page(query, AuditLog.created_at, AuditLog.id, limit, after)
+
+    @staticmethod
+    def get_archive_path(day):
+        """
+        Ruta del archivo de un día: AUDIT_ARCHIVE_DIR/YYYY/MM/audit_logs_YYYY-MM-DD.jsonl.gz
+
+        Args:
+            day: date
+
+        Returns:
+            str: Ruta absoluta del archivo
+        """
+        return os.path.join(
+            current_app.config['AUDIT_ARCHIVE_DIR'],
+            f'{day.year:04d}',
+            f'{day.month:02d}',
+            f'audit_logs_{day.isoformat()}.jsonl.gz'
+        )
+
+    @staticmethod
+    def archive_old_logs(retention_days=None, batch_size=None):
+        """
+        Mover a archivo los registros más antiguos que el horizonte de retención
+
+        Procesa lotes de batch_size filas (las más antiguas primero): cada
+        lote se agrega a los archivos de su día (gzip en modo append), se
+        sincroniza a disco y recién entonces se borra de la tabla en su
+        propia transacción. Si el proceso se interrumpe entre la escritura
+        y el borrado, el lote se vuelve a archivar en la siguiente ejecución;
+        iter_archived_logs descarta los duplicados por id.
+
+        Args:
+            retention_days: Días a conservar en la tabla (por defecto AUDIT_RETENTION_DAYS)
+            batch_size: Filas por lote (por defecto AUDIT_ARCHIVE_BATCH_SIZE)
+
+        Returns:
+            int: Número de registros archivados
+        """
+        config = current_app.config
+        retention_days = config['AUDIT_RETENTION_DAYS'] if retention_days is None else retention_days
+        batch_size = batch_size or config['AUDIT_ARCHIVE_BATCH_SIZE']
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+        archived = 0
+        while True:
+            rows = db.session.query(AuditLog, User.username).outerjoin(
+                User, User.id == AuditLog.user_id
+            ).filter(
+                AuditLog.created_at < cutoff
+            ).order_by(
+                AuditLog.created_at, AuditLog.id
+            ).limit(batch_size).all()
+
+            if not rows:
+                break
+
+            by_day = {}
+            for log, username in rows:
+                record = log.to_dict(include_user=False)
+                record['user_name'] = username
+                by_day.setdefault(log.created_at.date(), []).append(record)
+
+            for day, records in by_day.items():
+                path = AuditService.get_archive_path(day)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Cada append agrega un miembro gzip; gzip los lee como uno solo
+                with open(path, 'ab') as raw:
+                    with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+                        for record in records:
+                            gz.write((current_app.json.dumps(record) + '\n').encode('utf-8'))
+                    raw.flush()
+                    os.fsync(raw.fileno())
+
+            ids = [log.id for log, _ in rows]
+            last_created_at = rows[-1][0].created_at
+            AuditLog.query.filter(AuditLog.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+            archived += len(ids)
+            logger.info(f"Auditoría archivada: {archived} registros (hasta {last_created_at})")
+
+            if len(rows) < batch_size:
+                break
+
+        return archived
+
+    @staticmethod
+    def iter_archived_logs(start_date, end_date, entity=None, entity_id=None, action=None,
+                           user_id=None, text=None):
+        """
+        Recorrer (en streaming) los registros archivados de un rango de días
+
+        Lee un archivo diario a la vez, sin cargar el rango completo en memoria.
+
+        Args:
+            start_date: Primer día (date, inclusive)
+            end_date: Último día (date, inclusive)
+            entity: Filtrar por entidad
+            entity_id: Filtrar por ID de entidad
+            action: Filtrar por acción
+            user_id: Filtrar por usuario
+            text: Texto a buscar en details/notes (sin distinguir mayúsculas)
+
+        Yields:
+            dict: Registro archivado (mismas claves que AuditLog.to_dict)
+        """
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
+        needle = text.lower() if text else None
+
+        day = start_date
+        while day <= end_date:
+            path = AuditService.get_archive_path(day)
+            day += timedelta(days=1)
+            if not os.path.exists(path):
+                continue
+
+            seen = set()
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['id'] in seen:
+                        continue
+                    seen.add(record['id'])
+
+                    if entity and record['entity'] != entity:
+                        continue
+                    if entity_id is not None and record['entity_id'] != entity_id:
+                        continue
+                    if action and record['action'] != action:
+                        continue
+                    if user_id and record['user_id'] != user_id:
+                        continue
+                    if needle and needle not in f"{record.get('details') or ''} {record.get('notes') or ''}".lower():
+                        continue
+
+                    yield record
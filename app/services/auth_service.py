@@ -2,17 +2,62 @@
 Servicio de Autenticación para QoriCash Trading V2
 
 Maneja login, logout, verificación de credenciales y sesiones.
+
+El usuario de cada petición (current_user) es un UserSnapshot cacheado por
+proceso durante USER_CACHE_TTL segundos: el user_loader no consulta la base
+de datos en cada petición. Los cambios de rol, estado o contraseña invalidan
+la caché del proceso que los hace; los demás workers los ven al expirar el TTL.
 """
+from flask import current_app
 from flask_login import login_user, logout_user
 from app.extensions import db
-from app.models.user import User
+from app.models.user import User, UserSnapshot
 from app.models.audit_log import AuditLog
+from app.services.audit_service import AuditService
 from app.utils.formatters import now_peru
+from app.utils.cache import TTLCache
+
+_user_cache = TTLCache(maxsize=1024)
 
 
 class AuthService:
     """Servicio de autenticación"""
     
+    @staticmethod
+    def load_user(user_id):
+        """
+        Cargar el usuario de la sesión (user_loader de Flask-Login)
+        
+        Args:
+            user_id: ID del usuario
+        
+        Returns:
+            UserSnapshot|None: None si no existe o está inactivo (cierra la sesión)
+        """
+        return _user_cache.get_or_compute(
+            user_id,
+            lambda: AuthService._build_user_snapshot(user_id),
+            ttl=current_app.config['USER_CACHE_TTL']
+        )
+    
+    @staticmethod
+    def invalidate_user_cache(user_id=None):
+        """
+        Invalidar el usuario cacheado
+        
+        Args:
+            user_id: ID del usuario (None = todos)
+        """
+        _user_cache.invalidate(user_id)
+    
+    @staticmethod
+    def _build_user_snapshot(user_id):
+        """Leer el usuario de la base de datos sin caché"""
+        user = User.query.get(user_id)
+        if not user or not user.is_active_user():
+            return None
+        return UserSnapshot(user)
+    
     @staticmethod
     def authenticate_user(username, password, remember=False):
         """
@@ -48,10 +93,9 @@ class AuthService:
         
         # Actualizar last_login
         user.last_login = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
-        AuditLog.log_action(
+        # Registrar en auditoría (write-behind por lotes, ver AuditService)
+        AuditService.log(
             user_id=user.id,
             action='LOGIN',
             entity='User',
@@ -59,6 +103,8 @@ class AuthService:
             details=f'Login exitoso de {user.username}'
         )
         
+        db.session.commit()
+        
         return True, 'Login exitoso', user
     
     @staticmethod
@@ -75,12 +121,17 @@ class AuthService:
         if not user or not user.is_authenticated:
             return False, 'No hay sesión activa'
         
+        # current_user es un UserSnapshot; modificar el modelo
+        user = User.query.get(user.id)
+        if not user:
+            logout_user()
+            return False, 'Usuario no encontrado'
+        
         # Actualizar last_logout
         user.last_logout = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
-        AuditLog.log_action(
+        # Registrar en auditoría (write-behind por lotes, ver AuditService)
+        AuditService.log(
             user_id=user.id,
             action='LOGOUT',
             entity='User',
@@ -88,6 +139,8 @@ class AuthService:
             details=f'Logout de {user.username}'
         )
         
+        db.session.commit()
+        
         # Logout
         logout_user()
         
@@ -125,6 +178,11 @@ class AuthService:
         Returns:
             tuple: (success: bool, message: str)
         """
+        # current_user es un UserSnapshot; modificar el modelo
+        user = User.query.get(user.id)
+        if not user:
+            return False, 'Usuario no encontrado'
+        
         # Validar contraseña actual
         if not user.check_password(old_password):
             return False, 'Contraseña actual incorrecta'
@@ -138,9 +196,8 @@ class AuthService:
         
         # Cambiar contraseña
         user.set_password(new_password)
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=user.id,
             action='CHANGE_PASSWORD',
@@ -149,6 +206,8 @@ class AuthService:
             details='Contraseña cambiada exitosamente'
         )
         
+        db.session.commit()
+        
         return True, 'Contraseña actualizada exitosamente'
     
     @staticmethod
@@ -177,9 +236,8 @@ class AuthService:
         
         # Cambiar contraseña
         target_user.set_password(new_password)
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=admin_user.id,
             action='RESET_PASSWORD',
@@ -188,4 +246,7 @@ class AuthService:
             details=f'Contraseña restablecida para {target_user.username}'
         )
         
+        db.session.commit()
+        AuthService.invalidate_user_cache(target_user.id)
+        
         return True, f'Contraseña de {target_user.username} restablecida exitosamente'
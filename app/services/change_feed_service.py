@@ -0,0 +1,302 @@
+"""
+Servicio de Feed de Cambios para QoriCash Trading V2
+
+Reemplaza el polling de las páginas en vivo por deltas:
+
+1. Los servicios llaman a record() antes del commit: el cambio recibe un
+   número de la secuencia change_seq (PostgreSQL) sin bloquear a las demás
+   transacciones. Por eso puede haber huecos (rollbacks) y una secuencia
+   menor puede confirmarse después de una mayor.
+2. Después del commit llaman a publish(): se emite 'delta' por SocketIO con
+   las filas cambiadas ya serializadas, solo a las salas de rol que las
+   ven (for_role): Master y Trader reciben todo; el Operador solo las
+   operaciones Pendiente/En proceso (de las demás solo id y estado, para
+   que las quite de su listado) y ningún cliente.
+3. El navegador aplica cada delta que recibe y guarda la mayor secuencia
+   vista; al conectarse o reconectarse pide GET /api/changes?since=<seq>.
+   Además de lo posterior a 'since', la respuesta repite los cambios de los
+   últimos CHANGE_FEED_GRACE_SECONDS: así llegan también los que se
+   confirmaron tarde con una secuencia menor. Los datos son el estado
+   actual de cada fila, así que repetir un cambio no tiene efecto.
+
+Los cambios más antiguos que CHANGE_LOG_RETENTION_HOURS se eliminan; un
+navegador tan atrasado recibe reset=True y recarga la página.
+"""
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import joinedload
+from app.extensions import db, socketio
+from app.models.change_log import ChangeLog, change_seq
+from app.models.id_counter import IdCounter
+from app.models.operation import Operation
+from app.models.client import Client
+from app.models.user import User
+from app.services.notification_service import OPERATION_ROOMS
+from app.utils.constants import (
+    CHANGE_FEED_MAX_CHANGES, CHANGE_FEED_GRACE_SECONDS, ROLE_OPERADOR, OPERATOR_OPERATION_STATUSES
+)
+
+# Segundos entre purgas del feed (por proceso)
+PURGE_INTERVAL = 600
+
+_last_purge = 0.0
+
+
+class ChangeFeedService:
+    """Servicio del feed de cambios (deltas)"""
+
+    @staticmethod
+    def record(entity, entity_id, action):
+        """
+        Registrar un cambio en la transacción actual (no hace commit)
+
+        Args:
+            entity: 'Operation' o 'Client'
+            entity_id: ID de la fila
+            action: 'create', 'update' o 'delete'
+
+        Returns:
+            int: Número de secuencia asignado
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            seq = db.session.scalar(select(change_seq.next_value()))
+        else:
+            # SQLite serializa las escrituras: el contador no agrega esperas
+            seq = IdCounter.next_value('change_seq', seed=ChangeFeedService._get_last_logged_seq)
+        db.session.add(ChangeLog(seq=seq, entity=entity, entity_id=entity_id, action=action))
+        db.session.info.setdefault('change_feed', []).append(seq)
+        return seq
+
+    @staticmethod
+    def publish():
+        """
+        Emitir por SocketIO los cambios registrados en la transacción confirmada
+
+        Llamar después del commit. Los cambios de una transacción revertida
+        no existen en la tabla y se descartan.
+        """
+        seqs = db.session.info.pop('change_feed', [])
+        if not seqs:
+            return
+
+        try:
+            changes = ChangeLog.query.filter(ChangeLog.seq.in_(seqs)).order_by(ChangeLog.seq).all()
+            if changes:
+                seq = changes[-1].seq
+                serialized = ChangeFeedService.serialize(changes)
+                socketio.emit('delta', {'seq': seq, 'changes': serialized}, namespace='/', to=OPERATION_ROOMS)
+
+                operator_changes = ChangeFeedService.for_role(serialized, ROLE_OPERADOR)
+                if operator_changes:
+                    socketio.emit('delta', {'seq': seq, 'changes': operator_changes},
+                                  namespace='/', to=ROLE_OPERADOR)
+
+            ChangeFeedService._purge_if_due()
+        except Exception as e:
+            current_app.logger.warning(f'Error publicando cambios {seqs}: {e}')
+
+    @staticmethod
+    def get_current_seq():
+        """
+        Mayor secuencia confirmada
+
+        Las páginas la leen ANTES de consultar sus datos: lo que cambie
+        después llega como delta (o en la ventana de gracia del catch-up).
+
+        Returns:
+            int: Secuencia (0 si aún no hay cambios)
+        """
+        return ChangeFeedService._get_last_logged_seq()
+
+    @staticmethod
+    def _change_version_columns():
+        """
+        Columnas que cambian con cada commit que registra cambios
+
+        MAX(seq) no basta: una transacción con secuencia menor puede
+        confirmarse después de una mayor sin cambiar el máximo. La cantidad
+        de filas sí cambia con cada commit (la purga solo quita filas de
+        más de CHANGE_LOG_RETENTION_HOURS).
+        """
+        return (
+            select(func.count()).select_from(ChangeLog).scalar_subquery(),
+            select(func.max(ChangeLog.seq)).scalar_subquery(),
+            select(func.max(ChangeLog.created_at)).scalar_subquery()
+        )
+
+    @staticmethod
+    def get_change_version():
+        """
+        Versión del feed de cambios (clave de cachés de operaciones y clientes)
+
+        Returns:
+            tuple: (número de cambios, mayor secuencia, último created_at)
+        """
+        return tuple(db.session.execute(select(*ChangeFeedService._change_version_columns())).one())
+
+    @staticmethod
+    def get_data_version():
+        """
+        Versión de los datos de operaciones, clientes y usuarios (una consulta)
+
+        Sirve como token de ETag de las APIs de listas y estadísticas: la
+        versión del feed (get_change_version) cambia con cada commit de
+        operaciones y clientes; los usuarios no pasan por el feed y se
+        versionan con su último updated_at y su cantidad (también cambian
+        los nombres que muestran las listas).
+
+        Returns:
+            tuple: (versión del feed..., último updated_at de users, número de users)
+        """
+        return tuple(db.session.execute(select(
+            *ChangeFeedService._change_version_columns(),
+            select(func.max(User.updated_at)).scalar_subquery(),
+            select(func.count(User.id)).scalar_subquery()
+        )).one())
+
+    @staticmethod
+    def get_changes(since, role):
+        """
+        Cambios posteriores a una secuencia (catch-up tras reconectar)
+
+        Si una fila cambió varias veces solo se devuelve su último estado.
+        Incluye los cambios de los últimos CHANGE_FEED_GRACE_SECONDS aunque
+        su secuencia sea menor o igual a 'since' (confirmados fuera de orden).
+
+        Args:
+            since: Mayor secuencia vista por el navegador
+            role: Rol del usuario (ver for_role)
+
+        Returns:
+            dict: {'seq': int, 'reset': bool, 'changes': list}
+                  reset=True si el feed ya no cubre 'since' (recargar la página)
+        """
+        current = ChangeFeedService.get_current_seq()
+        if since > current:
+            return {'seq': current, 'reset': True, 'changes': []}
+
+        oldest = db.session.scalar(select(func.min(ChangeLog.seq)))
+        if oldest is not None and since < oldest - 1:
+            return {'seq': current, 'reset': True, 'changes': []}
+
+        # Último cambio de cada fila
+        grace_start = datetime.utcnow() - timedelta(seconds=CHANGE_FEED_GRACE_SECONDS)
+        latest = db.session.query(
+            func.max(ChangeLog.seq)
+        ).filter(
+            or_(ChangeLog.seq > since, ChangeLog.created_at >= grace_start),
+            ChangeLog.seq <= current
+        ).group_by(
+            ChangeLog.entity, ChangeLog.entity_id
+        ).limit(CHANGE_FEED_MAX_CHANGES + 1).all()
+
+        if len(latest) > CHANGE_FEED_MAX_CHANGES:
+            return {'seq': current, 'reset': True, 'changes': []}
+
+        changes = ChangeLog.query.filter(
+            ChangeLog.seq.in_([row[0] for row in latest])
+        ).order_by(ChangeLog.seq).all()
+
+        return {
+            'seq': current,
+            'reset': False,
+            'changes': ChangeFeedService.for_role(ChangeFeedService.serialize(changes), role)
+        }
+
+    @staticmethod
+    def for_role(changes, role):
+        """
+        Cambios serializados que puede recibir un rol
+
+        Master y Trader ven todo. El Operador solo ve operaciones en
+        OPERATOR_OPERATION_STATUSES; de las demás operaciones solo recibe
+        id y estado (las quita de su listado) y los clientes no le llegan.
+
+        Args:
+            changes: Lista de serialize()
+            role: Rol del usuario
+
+        Returns:
+            list: Cambios visibles para el rol
+        """
+        if role in OPERATION_ROOMS:
+            return changes
+        if role != ROLE_OPERADOR:
+            return []
+
+        visible = []
+        for change in changes:
+            if change['entity'] != 'Operation':
+                continue
+            data = change['data']
+            if data is not None and data['status'] not in OPERATOR_OPERATION_STATUSES:
+                change = {**change, 'data': {'id': data['id'], 'status': data['status']}}
+            visible.append(change)
+        return visible
+
+    @staticmethod
+    def serialize(changes):
+        """
+        Serializar cambios con el estado actual de cada fila (una consulta por entidad)
+
+        Args:
+            changes: Lista de ChangeLog
+
+        Returns:
+            list: [{'seq', 'entity', 'entity_id', 'action', 'data'}]; data es
+                  None si la fila ya no existe
+        """
+        operation_ids = {c.entity_id for c in changes if c.entity == 'Operation'}
+        client_ids = {c.entity_id for c in changes if c.entity == 'Client'}
+
+        rows = {}
+        if operation_ids:
+            operations = Operation.query.options(
+                joinedload(Operation.client),
+                joinedload(Operation.user)
+            ).filter(Operation.id.in_(operation_ids)).all()
+            rows.update({('Operation', op.id): op.to_dict(include_relations=True) for op in operations})
+        if client_ids:
+            clients = Client.query.filter(Client.id.in_(client_ids)).all()
+            rows.update({('Client', client.id): client.to_dict() for client in clients})
+
+        return [{
+            'seq': change.seq,
+            'entity': change.entity,
+            'entity_id': change.entity_id,
+            'action': change.action,
+            'data': rows.get((change.entity, change.entity_id))
+        } for change in changes]
+
+    @staticmethod
+    def purge_old_changes():
+        """
+        Eliminar cambios más antiguos que CHANGE_LOG_RETENTION_HOURS
+
+        Siempre se conserva el último: es la secuencia actual del feed.
+
+        Returns:
+            int: Número de cambios eliminados
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config['CHANGE_LOG_RETENTION_HOURS'])
+        deleted = ChangeLog.query.filter(
+            ChangeLog.created_at < cutoff,
+            ChangeLog.seq < select(func.max(ChangeLog.seq)).scalar_subquery()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @staticmethod
+    def _purge_if_due():
+        global _last_purge
+        now = time.monotonic()
+        if now - _last_purge >= PURGE_INTERVAL:
+            _last_purge = now
+            ChangeFeedService.purge_old_changes()
+
+    @staticmethod
+    def _get_last_logged_seq():
+        """Mayor secuencia en change_log"""
+        return db.session.scalar(select(func.max(ChangeLog.seq))) or 0
@@ -4,17 +4,45 @@ Servicio de Cliente para QoriCash Trading V2
 Maneja toda la lógica de negocio relacionada con clientes.
 """
 from flask import current_app
-from sqlalchemy import or_
+from sqlalchemy import or_, case, func, literal
 from app.extensions import db, socketio
 from app.models.client import Client
 from app.models.audit_log import AuditLog
+from app.services.change_feed_service import ChangeFeedService
 from app.utils.validators import validate_dni, validate_email, validate_phone
+from app.utils.constants import CLIENT_SEARCH_LIMIT, EXPORT_BATCH_SIZE
 from datetime import datetime
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columnas de la exportación de clientes (orden de iter_export_rows)
+EXPORT_HEADERS = [
+    'ID',
+    'Tipo Documento',
+    'Número Documento',
+    'Nombre Completo',
+    'Persona Contacto',  # Para RUC
+    'Email',
+    'Teléfono',
+    'Dirección',
+    'Distrito',
+    'Provincia',
+    'Departamento',
+    'Usuario Registro',
+    'Fecha Registro',
+    'Estado',
+    'Total Operaciones',
+    'Operaciones Completadas',
+    'Cuenta Bancaria 1',
+    'Cuenta Bancaria 2',
+    'Cuenta Bancaria 3',
+    'Cuenta Bancaria 4',
+    'Cuenta Bancaria 5',
+    'Cuenta Bancaria 6'
+]
+
 
 class ClientService:
     """Servicio de gestión de clientes"""
@@ -244,19 +272,13 @@ class ClientService:
             client.created_by = getattr(current_user, 'id', None)
             client.created_at = datetime.utcnow()
 
-            # --- Persistir en DB ---
+            # --- Persistir en DB (cliente y auditoría en la misma transacción) ---
             try:
                 db.session.add(client)
                 # set_bank_accounts actualiza bank_accounts_json y campos legacy a partir de la primera cuenta
                 client.set_bank_accounts(bank_accounts)
-                db.session.commit()
-            except Exception as db_exc:
-                db.session.rollback()
-                logger.exception("Error al persistir cliente")
-                return False, f'Error al guardar cliente en la base de datos: {str(db_exc)}', None
+                db.session.flush()  # Obtener client.id para la auditoría
 
-            # Auditoría: intentar registrar sin romper el flujo principal
-            try:
                 AuditLog.log_action(
                     user_id=getattr(current_user, 'id', None),
                     action='CREATE_CLIENT',
@@ -264,8 +286,14 @@ class ClientService:
                     entity_id=client.id,
                     details=f'Cliente creado: {client.full_name or client.razon_social or client.dni} ({client.document_type}: {client.dni})'
                 )
-            except Exception:
-                logger.exception("Fallo al registrar auditoría de creación de cliente")
+                ChangeFeedService.record('Client', client.id, 'create')
+
+                db.session.commit()
+                ChangeFeedService.publish()
+            except Exception as db_exc:
+                db.session.rollback()
+                logger.exception("Error al persistir cliente")
+                return False, f'Error al guardar cliente en la base de datos: {str(db_exc)}', None
 
             # Emitir evento WebSocket para actualización en tiempo real
             try:
@@ -273,7 +301,7 @@ class ClientService:
                     'client_id': client.id,
                     'client': client.to_dict(include_stats=True),
                     'created_by': getattr(current_user, 'username', 'Unknown')
-                }, broadcast=True)
+                }, namespace='/')
                 logger.info(f'WebSocket event emitted: client_created for ID {client.id}')
             except Exception as ws_exc:
                 logger.warning(f'Failed to emit WebSocket event for client creation: {ws_exc}')
@@ -415,19 +443,18 @@ class ClientService:
             if 'bank_account_number' in data:
                 client.bank_account_number = (data.get('bank_account_number') or '').strip() or None
 
-            db.session.commit()
+            # Auditoría (misma transacción)
+            AuditLog.log_action(
+                user_id=getattr(current_user, 'id', None),
+                action='UPDATE_CLIENT',
+                entity='Client',
+                entity_id=client.id,
+                details=f'Cliente actualizado: {client.full_name or client.razon_social or client.dni}'
+            )
+            ChangeFeedService.record('Client', client.id, 'update')
 
-            # Auditoría
-            try:
-                AuditLog.log_action(
-                    user_id=getattr(current_user, 'id', None),
-                    action='UPDATE_CLIENT',
-                    entity='Client',
-                    entity_id=client.id,
-                    details=f'Cliente actualizado: {client.full_name or client.razon_social or client.dni}'
-                )
-            except Exception:
-                logger.exception("Fallo al registrar auditoría de actualización")
+            db.session.commit()
+            ChangeFeedService.publish()
 
             # Emitir evento WebSocket para actualización en tiempo real
             try:
@@ -435,7 +462,7 @@ class ClientService:
                     'client_id': client.id,
                     'client': client.to_dict(include_stats=True),
                     'updated_by': getattr(current_user, 'username', 'Unknown')
-                }, broadcast=True)
+                }, namespace='/')
                 logger.info(f'WebSocket event emitted: client_updated for ID {client.id}')
             except Exception as ws_exc:
                 logger.warning(f'Failed to emit WebSocket event for client update: {ws_exc}')
@@ -463,19 +490,18 @@ class ClientService:
             old_status = client.status
             client.status = new_status
 
-            db.session.commit()
+            # Auditoría (misma transacción)
+            AuditLog.log_action(
+                user_id=getattr(current_user, 'id', None),
+                action='UPDATE_CLIENT',
+                entity='Client',
+                entity_id=client.id,
+                details=f'Estado cambiado de {old_status} a {new_status} para cliente {client.full_name or client.razon_social or client.dni}'
+            )
+            ChangeFeedService.record('Client', client.id, 'update')
 
-            # Auditoría
-            try:
-                AuditLog.log_action(
-                    user_id=getattr(current_user, 'id', None),
-                    action='UPDATE_CLIENT',
-                    entity='Client',
-                    entity_id=client.id,
-                    details=f'Estado cambiado de {old_status} a {new_status} para cliente {client.full_name or client.razon_social or client.dni}'
-                )
-            except Exception:
-                logger.exception("Fallo al registrar auditoría de cambio de estado")
+            db.session.commit()
+            ChangeFeedService.publish()
 
             # Emitir evento WebSocket para actualización de estado
             try:
@@ -485,7 +511,7 @@ class ClientService:
                     'old_status': old_status,
                     'new_status': new_status,
                     'changed_by': getattr(current_user, 'username', 'Unknown')
-                }, broadcast=True)
+                }, namespace='/')
                 logger.info(f'WebSocket event emitted: client_status_changed for ID {client.id}')
             except Exception as ws_exc:
                 logger.warning(f'Failed to emit WebSocket event for status change: {ws_exc}')
@@ -513,23 +539,22 @@ class ClientService:
 
             client_name = client.full_name or client.razon_social or client.dni
 
-            # Auditoría antes de eliminar
-            try:
-                AuditLog.log_action(
-                    user_id=getattr(current_user, 'id', None),
-                    action='DELETE_CLIENT',
-                    entity='Client',
-                    entity_id=client.id,
-                    details=f'Cliente eliminado: {client_name}'
-                )
-            except Exception:
-                logger.exception("Fallo al registrar auditoría de eliminación")
+            # Auditoría (misma transacción que la eliminación)
+            AuditLog.log_action(
+                user_id=getattr(current_user, 'id', None),
+                action='DELETE_CLIENT',
+                entity='Client',
+                entity_id=client.id,
+                details=f'Cliente eliminado: {client_name}'
+            )
 
             # Guardar ID antes de eliminar para el evento WebSocket
             deleted_client_id = client.id
+            ChangeFeedService.record('Client', deleted_client_id, 'delete')
 
             db.session.delete(client)
             db.session.commit()
+            ChangeFeedService.publish()
 
             # Emitir evento WebSocket para eliminación
             try:
@@ -537,7 +562,7 @@ class ClientService:
                     'client_id': deleted_client_id,
                     'client_name': client_name,
                     'deleted_by': getattr(current_user, 'username', 'Unknown')
-                }, broadcast=True)
+                }, namespace='/')
                 logger.info(f'WebSocket event emitted: client_deleted for ID {deleted_client_id}')
             except Exception as ws_exc:
                 logger.warning(f'Failed to emit WebSocket event for client deletion: {ws_exc}')
@@ -573,19 +598,18 @@ class ClientService:
                 if 'dni_back_url' in document_urls:
                     client.dni_back_url = document_urls['dni_back_url']
 
-            db.session.commit()
+            # Auditoría (misma transacción)
+            AuditLog.log_action(
+                user_id=getattr(current_user, 'id', None),
+                action='UPDATE_CLIENT',
+                entity='Client',
+                entity_id=client.id,
+                details=f'Documentos actualizados para cliente {client.full_name or client.dni}'
+            )
+            ChangeFeedService.record('Client', client.id, 'update')
 
-            # Auditoría
-            try:
-                AuditLog.log_action(
-                    user_id=getattr(current_user, 'id', None),
-                    action='UPDATE_CLIENT',
-                    entity='Client',
-                    entity_id=client.id,
-                    details=f'Documentos actualizados para cliente {client.full_name or client.dni}'
-                )
-            except Exception:
-                logger.exception("Fallo al registrar auditoría de actualización documentos")
+            db.session.commit()
+            ChangeFeedService.publish()
 
             return True, 'Documentos actualizados exitosamente', client
 
@@ -598,43 +622,220 @@ class ClientService:
     def get_client_stats(client_id):
         """
         Obtener estadísticas de un cliente
+
+        Args:
+            client_id: ID del cliente
+
+        Returns:
+            dict: Estadísticas (ver get_bulk_client_stats) o None si no existe
         """
-        client = ClientService.get_client_by_id(client_id)
-        if not client:
-            return None
+        return ClientService.get_bulk_client_stats(client_ids=[client_id]).get(client_id)
 
-        operations = client.operations.all() if hasattr(client, 'operations') else []
-        completed_operations = [op for op in operations if op.status == 'Completada']
+    @staticmethod
+    def get_bulk_client_stats(client_ids=None, status=None, document_type=None):
+        """
+        Obtener estadísticas de varios clientes con una sola consulta (GROUP BY)
 
-        total_usd = sum(getattr(op, 'amount_usd', 0) for op in completed_operations)
-        total_pen = sum(getattr(op, 'amount_pen', 0) for op in completed_operations)
+        Args:
+            client_ids: Lista de IDs de clientes (None = todos)
+            status: Filtrar clientes por estado ('Activo', 'Inactivo')
+            document_type: Filtrar clientes por tipo de documento ('DNI', 'CE', 'RUC')
+
+        Returns:
+            dict: client_id -> {
+                total_operations, pending_operations, in_process_operations,
+                completed_operations, canceled_operations,
+                total_usd_traded, total_pen_traded, last_operation
+            }
+            Los montos suman solo operaciones completadas. Los clientes sin
+            operaciones aparecen con conteos en cero.
+        """
+        from app.models.operation import Operation
+
+        if client_ids is not None and not client_ids:
+            return {}
+
+        def count_status(value):
+            return func.coalesce(func.sum(case((Operation.status == value, 1), else_=0)), 0)
+
+        def sum_completed(column):
+            return func.coalesce(func.sum(case((Operation.status == 'Completada', column), else_=0)), 0)
+
+        query = db.session.query(
+            Client.id,
+            func.count(Operation.id),
+            count_status('Pendiente'),
+            count_status('En proceso'),
+            count_status('Completada'),
+            count_status('Cancelado'),
+            sum_completed(Operation.amount_usd),
+            sum_completed(Operation.amount_pen),
+            func.max(Operation.created_at)
+        ).outerjoin(
+            Operation, Operation.client_id == Client.id
+        ).group_by(Client.id)
+
+        if client_ids is not None:
+            query = query.filter(Client.id.in_(client_ids))
+        if status:
+            query = query.filter(Client.status == status)
+        if document_type:
+            query = query.filter(Client.document_type == document_type)
 
         return {
-            'total_operations': len(operations),
-            'completed_operations': len(completed_operations),
-            'pending_operations': len([op for op in operations if op.status == 'Pendiente']),
-            'in_process_operations': len([op for op in operations if op.status == 'En proceso']),
-            'total_usd_traded': float(total_usd),
-            'total_pen_traded': float(total_pen),
-            'last_operation': operations[0].created_at if operations else None
+            client_id: {
+                'total_operations': int(total),
+                'pending_operations': int(pending),
+                'in_process_operations': int(in_process),
+                'completed_operations': int(completed),
+                'canceled_operations': int(canceled),
+                'total_usd_traded': total_usd,
+                'total_pen_traded': total_pen,
+                'last_operation': last_operation
+            }
+            for client_id, total, pending, in_process, completed, canceled,
+                total_usd, total_pen, last_operation in query.all()
         }
 
     @staticmethod
-    def search_clients(query):
-        """
-        Buscar clientes por nombre, DNI o email
-        """
-        search = f"%{query}%"
-        return Client.query.filter(
-            or_(
-                Client.dni.ilike(search),
-                Client.email.ilike(search),
-                Client.apellido_paterno.ilike(search),
-                Client.apellido_materno.ilike(search),
-                Client.nombres.ilike(search),
-                Client.razon_social.ilike(search)
-            )
-        ).all()
+    def search_clients(query, limit=CLIENT_SEARCH_LIMIT):
+        """
+        Buscar clientes por nombre, documento o email (resultados ordenados)
+
+        Orden de relevancia:
+            0. Documento (DNI/CE/RUC) exacto
+            1. Prefijo de documento, email, apellidos, nombres o razón social
+            2. Coincidencia parcial en cualquier campo
+            3. Coincidencia aproximada (solo PostgreSQL, pg_trgm)
+
+        En PostgreSQL la búsqueda usa el índice trigram ix_clients_search_trgm;
+        en SQLite (tests/desarrollo) se hace el mismo filtro sin índice.
+
+        Args:
+            query: Texto a buscar
+            limit: Máximo de resultados
+
+        Returns:
+            list: Lista de clientes (a lo sumo 'limit')
+        """
+        query = (query or '').strip()
+        if not query:
+            return []
+
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        contains = f"%{escaped}%"
+        prefix = f"{escaped}%"
+
+        document = Client.search_document()
+        is_postgres = db.session.get_bind().dialect.name == 'postgresql'
+
+        prefix_match = or_(
+            Client.dni.ilike(prefix, escape='\\'),
+            Client.email.ilike(prefix, escape='\\'),
+            Client.apellido_paterno.ilike(prefix, escape='\\'),
+            Client.apellido_materno.ilike(prefix, escape='\\'),
+            Client.nombres.ilike(prefix, escape='\\'),
+            Client.razon_social.ilike(prefix, escape='\\')
+        )
+        contains_match = document.ilike(contains, escape='\\')
+
+        if is_postgres:
+            # '<%' = word_similarity(query, documento) >= umbral (usa el índice trigram)
+            match = or_(contains_match, literal(query).op('<%')(document))
+        else:
+            match = contains_match
+
+        rank = case(
+            (Client.dni == query, 0),
+            (prefix_match, 1),
+            (contains_match, 2),
+            else_=3
+        )
+
+        order_by = [rank]
+        if is_postgres:
+            order_by.append(func.word_similarity(query, document).desc())
+        order_by.append(func.coalesce(Client.razon_social, Client.apellido_paterno, Client.nombres))
+
+        return Client.query.filter(match).order_by(*order_by).limit(limit).all()
+
+    @staticmethod
+    def get_operation_counts_subquery():
+        """
+        Subconsulta con el conteo de operaciones por cliente (un solo GROUP BY)
+
+        Returns:
+            Subquery con columnas: client_id, total_operations, completed_operations
+        """
+        from app.models.operation import Operation
+
+        return db.session.query(
+            Operation.client_id.label('client_id'),
+            func.count(Operation.id).label('total_operations'),
+            func.sum(case((Operation.status == 'Completada', 1), else_=0)).label('completed_operations')
+        ).group_by(Operation.client_id).subquery()
+
+    @staticmethod
+    def iter_export_rows(batch_size=EXPORT_BATCH_SIZE):
+        """
+        Generar las filas de la exportación de clientes (ver EXPORT_HEADERS)
+
+        Recorre los clientes con un cursor del servidor (yield_per) y obtiene
+        el usuario de registro y los conteos de operaciones en la misma
+        consulta, sin cargar toda la tabla en memoria.
+
+        Args:
+            batch_size: Filas leídas por lote desde la base de datos
+
+        Yields:
+            list: Valores de una fila en el orden de EXPORT_HEADERS
+        """
+        from app.models.user import User
+
+        counts = ClientService.get_operation_counts_subquery()
+        query = db.session.query(
+            Client,
+            User.email,
+            func.coalesce(counts.c.total_operations, 0),
+            func.coalesce(counts.c.completed_operations, 0)
+        ).outerjoin(
+            User, User.id == Client.created_by
+        ).outerjoin(
+            counts, counts.c.client_id == Client.id
+        ).order_by(
+            Client.created_at.desc(), Client.id.desc()
+        ).yield_per(batch_size)
+
+        for client, creator_email, total_operations, completed_operations in query:
+            row = [
+                client.id,
+                client.document_type,
+                client.dni,
+                client.full_name or '',
+                (client.persona_contacto or '') if client.document_type == 'RUC' else '',
+                client.email,
+                client.phone or '',
+                client.direccion or '',
+                client.distrito or '',
+                client.provincia or '',
+                client.departamento or '',
+                creator_email or 'N/A',
+                client.created_at.strftime('%d/%m/%Y %H:%M') if client.created_at else '',
+                client.status,
+                int(total_operations),
+                int(completed_operations)
+            ]
+
+            # Cuentas bancarias (hasta 6)
+            bank_accounts = client.bank_accounts or []
+            for i in range(6):
+                if i < len(bank_accounts):
+                    account = bank_accounts[i]
+                    row.append(f"{account.get('bank_name', '')} | {account.get('account_type', '')} | {account.get('currency', '')} | {account.get('account_number', '')}")
+                else:
+                    row.append('')
+
+            yield row
 
     @staticmethod
     def export_clients_to_dict():
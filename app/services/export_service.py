@@ -0,0 +1,449 @@
+"""
+Servicio de Exportaciones para QoriCash Trading V2
+
+Ejecuta las exportaciones grandes (clientes, operaciones, auditoría) en un
+pool de hilos en segundo plano, fuera del worker que atiende la petición.
+El progreso se guarda en ExportJob y se notifica por SocketIO al usuario;
+al terminar, el archivo queda disponible para descarga en EXPORT_DIR.
+"""
+import csv
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, update
+from app.extensions import db
+from app.models.user import User
+from app.models.client import Client
+from app.models.operation import Operation
+from app.models.audit_log import AuditLog
+from app.models.export_job import ExportJob
+from app.services.client_service import ClientService, EXPORT_HEADERS as CLIENT_EXPORT_HEADERS
+from app.services.operation_service import OperationService, EXPORT_HEADERS as OPERATION_EXPORT_HEADERS
+from app.services.notification_service import NotificationService
+from app.utils.constants import EXPORT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv'
+}
+
+ACTIVE_STATUSES = ('Pendiente', 'En proceso')
+
+# Columnas de la exportación de auditoría (orden de iter_audit_log_rows)
+AUDIT_LOG_EXPORT_HEADERS = [
+    'ID',
+    'Fecha',
+    'Usuario',
+    'Acción',
+    'Entidad',
+    'ID Entidad',
+    'Detalles',
+    'Notas',
+    'IP'
+]
+
+# Pool de hilos compartido por el proceso (se crea en el primer uso)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['EXPORT_MAX_WORKERS'],
+                thread_name_prefix='export'
+            )
+        return _executor
+
+
+class ExportService:
+    """Servicio de exportaciones en segundo plano"""
+
+    @staticmethod
+    def iter_audit_log_rows(batch_size=EXPORT_BATCH_SIZE):
+        """
+        Generar las filas de la exportación de auditoría
+
+        Args:
+            batch_size: Filas leídas por lote desde la base de datos
+
+        Yields:
+            list: Valores de una fila en el orden de AUDIT_LOG_EXPORT_HEADERS
+        """
+        query = db.session.query(AuditLog, User.username).outerjoin(
+            User, User.id == AuditLog.user_id
+        ).order_by(
+            AuditLog.created_at.desc(), AuditLog.id.desc()
+        ).yield_per(batch_size)
+
+        for log, username in query:
+            yield [
+                log.id,
+                log.created_at.strftime('%d/%m/%Y %H:%M:%S') if log.created_at else '',
+                username or '',
+                log.action,
+                log.entity,
+                log.entity_id,
+                log.details or '',
+                log.notes or '',
+                log.ip_address or ''
+            ]
+
+    @staticmethod
+    def get_export_types():
+        """
+        Tipos de exportación disponibles
+
+        Returns:
+            dict: export_type -> especificación (roles, columnas, filas, conteo)
+        """
+        return {
+            'clients': {
+                'roles': ('Master',),
+                'file_prefix': 'clientes_qoricash',
+                'sheet_title': 'Clientes',
+                'headers': CLIENT_EXPORT_HEADERS,
+                'column_widths': [8, 15, 18, 35, 30, 30, 15, 30, 20, 20, 20, 30, 18, 12, 18, 20, 50, 50, 50, 50, 50, 50],
+                'rows': ClientService.iter_export_rows,
+                'count': lambda: db.session.query(func.count(Client.id)).scalar()
+            },
+            'operations': {
+                'roles': ('Master', 'Trader'),
+                'file_prefix': 'operaciones_qoricash',
+                'sheet_title': 'Operaciones',
+                'headers': OPERATION_EXPORT_HEADERS,
+                'column_widths': [14, 35, 15, 10, 14, 14, 14, 14, 18, 18, 18],
+                'rows': OperationService.iter_export_rows,
+                'count': lambda: db.session.query(func.count(Operation.id)).scalar()
+            },
+            'audit_logs': {
+                'roles': ('Master',),
+                'file_prefix': 'auditoria_qoricash',
+                'sheet_title': 'Auditoría',
+                'headers': AUDIT_LOG_EXPORT_HEADERS,
+                'column_widths': [10, 20, 18, 22, 14, 12, 60, 40, 16],
+                'rows': ExportService.iter_audit_log_rows,
+                'count': lambda: db.session.query(func.count(AuditLog.id)).scalar()
+            }
+        }
+
+    @staticmethod
+    def write_xlsx(file, headers, rows, column_widths=None, title='Datos'):
+        """
+        Escribir un Excel en modo write-only (sin mantener el libro en memoria)
+
+        Args:
+            file: Ruta o archivo binario de destino
+            headers: Lista de encabezados
+            rows: Iterable de filas (listas)
+            column_widths: Anchos de columna (opcional)
+            title: Nombre de la hoja
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+
+        # Ancho de columnas (debe definirse antes de escribir filas)
+        for col_num, width in enumerate(column_widths or [], 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+
+        # Encabezados con formato
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_row.append(cell)
+        ws.append(header_row)
+
+        for row in rows:
+            ws.append(row)
+
+        wb.save(file)
+
+    @staticmethod
+    def write_csv(path, headers, rows):
+        """
+        Escribir un CSV (UTF-8 con BOM para que Excel detecte la codificación)
+
+        Args:
+            path: Ruta de destino
+            headers: Lista de encabezados
+            rows: Iterable de filas (listas)
+        """
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(rows)
+
+    @staticmethod
+    def count_active_jobs(user_id):
+        """
+        Contar trabajos en cola o en proceso de un usuario
+
+        Los trabajos más antiguos que EXPORT_JOB_TIMEOUT no cuentan (por
+        ejemplo, si el proceso que los ejecutaba se reinició).
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            int: Número de trabajos activos
+        """
+        since = datetime.utcnow() - timedelta(seconds=current_app.config['EXPORT_JOB_TIMEOUT'])
+        return ExportJob.query.filter(
+            ExportJob.user_id == user_id,
+            ExportJob.status.in_(ACTIVE_STATUSES),
+            ExportJob.created_at >= since
+        ).count()
+
+    @staticmethod
+    def is_at_job_limit(user_id):
+        """
+        Verificar si el usuario alcanzó el máximo de exportaciones simultáneas
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            bool: True si no puede encolar más trabajos
+        """
+        return ExportService.count_active_jobs(user_id) >= current_app.config['EXPORT_MAX_JOBS_PER_USER']
+
+    @staticmethod
+    def can_export(user, export_type):
+        """
+        Verificar si el rol del usuario puede pedir un tipo de exportación
+
+        Args:
+            user: Usuario
+            export_type: 'clients', 'operations' o 'audit_logs'
+
+        Returns:
+            bool: False si el tipo no existe o no está permitido para su rol
+        """
+        spec = ExportService.get_export_types().get(export_type)
+        return spec is not None and user.role in spec['roles']
+
+    @staticmethod
+    def create_job(current_user, export_type, export_format='xlsx'):
+        """
+        Encolar una exportación
+
+        Args:
+            current_user: Usuario que solicita la exportación
+            export_type: 'clients', 'operations' o 'audit_logs'
+            export_format: 'xlsx' o 'csv'
+
+        Returns:
+            tuple: (success: bool, message: str, job: ExportJob|None)
+        """
+        spec = ExportService.get_export_types().get(export_type)
+        if not spec:
+            return False, 'Tipo de exportación inválido', None
+
+        if not ExportService.can_export(current_user, export_type):
+            return False, 'No tienes permiso para esta exportación', None
+
+        if export_format not in EXPORT_FORMATS:
+            return False, 'Formato inválido (use xlsx o csv)', None
+
+        ExportService.purge_expired_jobs()
+
+        # Serializar las solicitudes del mismo usuario (bloquea su fila en
+        # PostgreSQL) para que dos peticiones simultáneas no superen el límite
+        User.query.filter_by(id=current_user.id).with_for_update().first()
+
+        if ExportService.is_at_job_limit(current_user.id):
+            db.session.rollback()
+            limit = current_app.config['EXPORT_MAX_JOBS_PER_USER']
+            return False, f'Ya tienes {limit} exportación(es) en curso. Espera a que termine(n).', None
+
+        job = ExportJob(
+            user_id=current_user.id,
+            export_type=export_type,
+            export_format=export_format,
+            status='Pendiente',
+            processed_rows=0
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        _get_executor().submit(ExportService.run_job, current_app._get_current_object(), job.id)
+
+        return True, 'Exportación en cola', job
+
+    @staticmethod
+    def get_job(job_id, user_id):
+        """
+        Obtener un trabajo del usuario
+
+        Args:
+            job_id: ID del trabajo
+            user_id: ID del usuario dueño
+
+        Returns:
+            ExportJob: Trabajo o None si no existe o es de otro usuario
+        """
+        return ExportJob.query.filter_by(id=job_id, user_id=user_id).first()
+
+    @staticmethod
+    def get_user_jobs(user_id, limit=20):
+        """
+        Obtener los últimos trabajos del usuario
+
+        Args:
+            user_id: ID del usuario
+            limit: Máximo de trabajos
+
+        Returns:
+            list: Lista de ExportJob (más recientes primero)
+        """
+        return ExportJob.query.filter_by(user_id=user_id).order_by(
+            ExportJob.created_at.desc(), ExportJob.id.desc()
+        ).limit(limit).all()
+
+    @staticmethod
+    def purge_expired_jobs():
+        """
+        Eliminar trabajos (y sus archivos) más antiguos que EXPORT_RETENTION_HOURS
+
+        Returns:
+            int: Número de trabajos eliminados
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config['EXPORT_RETENTION_HOURS'])
+        expired = ExportJob.query.filter(ExportJob.created_at < cutoff).all()
+
+        for job in expired:
+            if job.file_path and os.path.exists(job.file_path):
+                try:
+                    os.remove(job.file_path)
+                except OSError as e:
+                    logger.warning(f"No se pudo eliminar {job.file_path}: {e}")
+            db.session.delete(job)
+
+        if expired:
+            db.session.commit()
+
+        return len(expired)
+
+    @staticmethod
+    def _update_job(job_id, **values):
+        """
+        Actualizar el trabajo en una transacción propia
+
+        Se usa una conexión aparte para no cerrar el cursor del servidor
+        con el que se están leyendo las filas.
+        """
+        with db.engine.begin() as conn:
+            conn.execute(update(ExportJob.__table__).where(ExportJob.__table__.c.id == job_id).values(**values))
+
+    @staticmethod
+    def run_job(app, job_id):
+        """
+        Ejecutar un trabajo de exportación (en un hilo del pool)
+
+        Args:
+            app: Aplicación Flask (para crear el contexto)
+            job_id: ID del trabajo
+        """
+        with app.app_context():
+            job = db.session.get(ExportJob, job_id)
+            if job is None:
+                return
+
+            user_id = job.user_id
+            export_format = job.export_format
+            spec = ExportService.get_export_types()[job.export_type]
+            file_path = None
+            processed = 0
+
+            try:
+                total = spec['count']()
+                ExportService._update_job(
+                    job_id,
+                    status='En proceso',
+                    total_rows=total,
+                    started_at=datetime.utcnow()
+                )
+                NotificationService.notify_to_user(user_id, 'export_progress', {
+                    'job_id': job_id, 'status': 'En proceso', 'progress': 0
+                })
+
+                export_dir = app.config['EXPORT_DIR']
+                os.makedirs(export_dir, exist_ok=True)
+                file_name = f"{spec['file_prefix']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+                file_path = os.path.join(export_dir, f'{job_id}_{file_name}')
+                tmp_path = f'{file_path}.part'
+
+                # En SQLite el cursor abierto bloquea escrituras desde otra
+                # conexión: el avance intermedio solo se notifica por SocketIO
+                save_progress = db.engine.dialect.name != 'sqlite'
+
+                def tracked_rows():
+                    nonlocal processed
+                    for row in spec['rows']():
+                        yield row
+                        processed += 1
+                        if processed % EXPORT_BATCH_SIZE == 0:
+                            if save_progress:
+                                ExportService._update_job(job_id, processed_rows=processed)
+                            NotificationService.notify_to_user(user_id, 'export_progress', {
+                                'job_id': job_id,
+                                'status': 'En proceso',
+                                'progress': min(99, int(processed * 100 / total)) if total else 0
+                            })
+
+                if export_format == 'csv':
+                    ExportService.write_csv(tmp_path, spec['headers'], tracked_rows())
+                else:
+                    ExportService.write_xlsx(tmp_path, spec['headers'], tracked_rows(),
+                                             spec['column_widths'], spec['sheet_title'])
+                os.replace(tmp_path, file_path)
+
+                ExportService._update_job(
+                    job_id,
+                    status='Completado',
+                    processed_rows=processed,
+                    total_rows=processed,
+                    file_path=file_path,
+                    file_name=file_name,
+                    finished_at=datetime.utcnow()
+                )
+                NotificationService.notify_to_user(user_id, 'export_completed', {
+                    'job_id': job_id, 'status': 'Completado', 'progress': 100, 'file_name': file_name
+                })
+
+            except Exception as e:
+                logger.exception(f"Error en exportación {job_id}")
+                db.session.rollback()
+                if file_path and os.path.exists(f'{file_path}.part'):
+                    os.remove(f'{file_path}.part')
+                ExportService._update_job(
+                    job_id,
+                    status='Error',
+                    processed_rows=processed,
+                    error_message=str(e),
+                    finished_at=datetime.utcnow()
+                )
+                NotificationService.notify_to_user(user_id, 'export_failed', {
+                    'job_id': job_id, 'status': 'Error', 'message': str(e)
+                })
+
+            finally:
+                db.session.remove()
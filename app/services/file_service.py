@@ -1,56 +1,85 @@
 """
 Servicio de Archivos para QoriCash Trading V2
 
-Maneja carga, validación y gestión de archivos en Cloudinary.
+Maneja carga, validación y gestión de archivos. El almacenamiento lo
+resuelve un backend (Cloudinary, carpeta local o S3; ver
+app/utils/storage.py) con claves direccionadas por contenido: un mismo
+archivo subido varias veces se guarda una sola vez.
+
+Los documentos de un mismo request se suben en paralelo
+(upload_files_parallel) en un pool de hilos acotado por proceso
+(FILE_UPLOAD_MAX_WORKERS), con timeout por archivo (FILE_UPLOAD_TIMEOUT):
+si alguno falla, el request falla y no se guarda ninguna URL (todo o nada).
+
+Los archivos nunca se eliminan al fallar un request: con claves por
+contenido, otro registro puede estar usando el mismo archivo. Los que no
+quedan referenciados los elimina el barrido collect_garbage
+(scripts/collect_storage_garbage.py).
+
+Los comprobantes que son imágenes se normalizan antes de guardarse (sin
+EXIF, reducidos y recomprimidos) y se guarda además una miniatura para los
+listados (upload_image, ver app/utils/images.py).
 """
+import logging
 import os
-import cloudinary
-import cloudinary.uploader
-from werkzeug.utils import secure_filename
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from flask import current_app
 from app.utils.constants import MAX_FILE_SIZE, ALLOWED_EXTENSIONS
+from app.utils.storage import create_storage_backend
+from app.utils.images import is_processable, normalize_image
+
+logger = logging.getLogger(__name__)
+
+# Segundos de espera extra sobre el timeout de red de cada archivo
+UPLOAD_TIMEOUT_MARGIN = 5
+
+# Carpetas de la app en el backend (las que revisa el barrido de huérfanos)
+STORAGE_FOLDERS = ('dni', 'ruc', 'validation_oc', 'operations')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['FILE_UPLOAD_MAX_WORKERS'],
+                thread_name_prefix='upload'
+            )
+        return _executor
+
+
+def get_storage_backend():
+    """
+    Backend de almacenamiento de la app (se construye una vez por app)
+
+    Returns:
+        StorageBackend
+    """
+    app = current_app._get_current_object()
+    backend = app.extensions.get('storage_backend')
+    if backend is None:
+        backend = create_storage_backend(app.config)
+        app.extensions['storage_backend'] = backend
+        logger.info(f"Almacenamiento de archivos: {backend.name}")
+    return backend
 
 
 class FileService:
     """Servicio de gestión de archivos"""
     
-    def __init__(self):
-        """Inicializar configuración de Cloudinary"""
-        self.configured = False
-        self._configure_cloudinary()
-    
-    def _configure_cloudinary(self):
-        """Configurar Cloudinary con variables de entorno"""
-        try:
-            cloud_name = os.environ.get('CLOUDINARY_CLOUD_NAME')
-            api_key = os.environ.get('CLOUDINARY_API_KEY')
-            api_secret = os.environ.get('CLOUDINARY_API_SECRET')
-
-            # Verificar que las credenciales no sean valores de ejemplo
-            if not cloud_name or cloud_name == 'your-cloud-name':
-                print("ERROR: CLOUDINARY_CLOUD_NAME no está configurado correctamente en .env")
-                self.configured = False
-                return
-
-            if not api_key or api_key == 'your-api-key':
-                print("ERROR: CLOUDINARY_API_KEY no está configurado correctamente en .env")
-                self.configured = False
-                return
-
-            if not api_secret or api_secret == 'your-api-secret':
-                print("ERROR: CLOUDINARY_API_SECRET no está configurado correctamente en .env")
-                self.configured = False
-                return
-
-            cloudinary.config(
-                cloud_name=cloud_name,
-                api_key=api_key,
-                api_secret=api_secret
-            )
-            self.configured = True
-            print(f"[OK] Cloudinary configurado correctamente: {cloud_name}")
-        except Exception as e:
-            print(f"[ERROR] Error configurando Cloudinary: {e}")
-            self.configured = False
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: StorageBackend (por defecto el de la app, STORAGE_BACKEND)
+        """
+        self.backend = backend or get_storage_backend()
+        self.configured = self.backend.configured
     
     @staticmethod
     def allowed_file(filename):
@@ -91,58 +120,162 @@ class FileService:
     
     def upload_file(self, file, folder, public_id_prefix=None):
         """
-        Subir archivo a Cloudinary
+        Subir archivo al backend de almacenamiento
 
         Args:
             file: FileStorage object
-            folder: Carpeta en Cloudinary (e.g., 'dni', 'operations')
+            folder: Carpeta lógica (e.g., 'dni', 'operations')
             public_id_prefix: Prefijo para el ID público (opcional)
 
         Returns:
             tuple: (success: bool, message: str, url: str|None)
         """
         if not self.configured:
-            return False, 'Cloudinary no está configurado. Por favor configure las credenciales en el archivo .env', None
+            return False, self._not_configured_message(), None
+        
+        is_valid, message = self.validate_upload(file)
+        if not is_valid:
+            return False, message, None
+        
+        return self._upload(file, folder, public_id_prefix)
+    
+    def validate_upload(self, file):
+        """
+        Validar archivo antes de subirlo (presencia, extensión y tamaño)
+        
+        Args:
+            file: FileStorage object
         
+        Returns:
+            tuple: (is_valid: bool, message: str)
+        """
         # Validar que hay archivo
         if not file or file.filename == '':
-            return False, 'No se seleccionó ningún archivo', None
+            return False, 'No se seleccionó ningún archivo'
         
         # Validar extensión
         if not self.allowed_file(file.filename):
-            return False, f'Tipo de archivo no permitido. Permitidos: {", ".join(ALLOWED_EXTENSIONS)}', None
+            return False, f'Tipo de archivo no permitido. Permitidos: {", ".join(ALLOWED_EXTENSIONS)}'
         
         # Validar tamaño
-        is_valid, message = self.validate_file_size(file)
-        if not is_valid:
-            return False, message, None
+        return self.validate_file_size(file)
+    
+    def _not_configured_message(self):
+        if self.backend.name == 'cloudinary':
+            return 'Cloudinary no está configurado. Por favor configure las credenciales en el archivo .env'
+        return f'El almacenamiento de archivos ({self.backend.name}) no está configurado'
+    
+    def _upload(self, file, folder, public_id_prefix=None, timeout=None):
+        """
+        Guardar un archivo ya validado en el backend
+        
+        La clave es <folder>/<sha256>.<ext>: public_id_prefix ya no forma
+        parte del nombre (se mantiene por compatibilidad de la API).
         
+        Returns:
+            tuple: (success: bool, message: str, url: str|None)
+        """
         try:
-            # Generar nombre seguro
-            filename = secure_filename(file.filename)
-            
-            # Generar public_id
-            if public_id_prefix:
-                public_id = f"{folder}/{public_id_prefix}_{filename}"
-            else:
-                public_id = f"{folder}/{filename}"
-            
-            # Subir a Cloudinary
-            result = cloudinary.uploader.upload(
+            url, created = self.backend.save(
                 file,
-                folder=folder,
-                public_id=public_id,
-                resource_type='auto'
+                folder,
+                file.filename,
+                content_type=file.mimetype or None,
+                timeout=timeout
             )
             
-            # Obtener URL segura
-            url = result.get('secure_url')
-            
-            return True, 'Archivo subido exitosamente', url
+            if created:
+                return True, 'Archivo subido exitosamente', url
+            return True, 'Archivo ya existente (reutilizado)', url
         
         except Exception as e:
             return False, f'Error al subir archivo: {str(e)}', None
     
+    def upload_files_parallel(self, uploads, labels=None, timeout=None):
+        """
+        Subir varios archivos en paralelo, todo o nada
+        
+        Todos se validan antes de subir ninguno. Las subidas corren en el
+        pool del proceso; el tiempo total es el de la subida más lenta, no
+        la suma. El timeout es por archivo y cuenta desde que su subida
+        empieza: el tiempo en la cola del pool (compartido entre requests)
+        no cuenta. Si una falla o supera el timeout, se cancelan las que aún
+        no empezaron; las ya subidas no se eliminan (ver collect_garbage).
+        
+        Args:
+            uploads: dict clave -> (file, folder, public_id_prefix)
+            labels: dict clave -> nombre para los mensajes de error (opcional)
+            timeout: Segundos máximos por archivo (por defecto FILE_UPLOAD_TIMEOUT)
+        
+        Returns:
+            tuple: (success: bool, message: str, urls: dict clave -> url)
+        """
+        labels = labels or {}
+        if not uploads:
+            return True, 'Sin archivos', {}
+        
+        if not self.configured:
+            return False, self._not_configured_message(), {}
+        
+        for key, (file, _, _) in uploads.items():
+            is_valid, message = self.validate_upload(file)
+            if not is_valid:
+                return False, f'{labels.get(key, key)}: {message}', {}
+        
+        timeout = timeout or current_app.config['FILE_UPLOAD_TIMEOUT']
+        executor = _get_executor()
+        started = {}  # clave -> inicio de la subida (monotonic), lo registra el hilo
+        
+        def run(key, file, folder, public_id_prefix):
+            started[key] = time.monotonic()
+            return self._upload(file, folder, public_id_prefix, timeout)
+        
+        futures = {
+            executor.submit(run, key, file, folder, public_id_prefix): key
+            for key, (file, folder, public_id_prefix) in uploads.items()
+        }
+        
+        urls = {}
+        error = None
+        pending = set(futures)
+        while pending and error is None:
+            # Esperar hasta el vencimiento más próximo entre las subidas ya iniciadas;
+            # si todas siguen en cola, revisar de nuevo tras un timeout
+            deadlines = [
+                started[futures[future]] + timeout + UPLOAD_TIMEOUT_MARGIN
+                for future in pending if futures[future] in started
+            ]
+            wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else timeout
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                key = futures[future]
+                ok, message, url = future.result()
+                if not ok:
+                    error = f'{labels.get(key, key)}: {message}'
+                    break
+                urls[key] = url
+            
+            if not done:
+                now = time.monotonic()
+                expired = [
+                    labels.get(futures[future], futures[future]) for future in pending
+                    if futures[future] in started
+                    and now >= started[futures[future]] + timeout + UPLOAD_TIMEOUT_MARGIN
+                ]
+                if expired:
+                    error = f'{", ".join(expired)}: tiempo de espera agotado ({timeout}s)'
+        
+        if error is None:
+            return True, 'Archivos subidos exitosamente', urls
+        
+        # Las que siguen en cola no empiezan; las subidas quedan para el barrido
+        for future in futures:
+            future.cancel()
+        
+        logger.warning(f"Subida de documentos fallida: {error}")
+        return False, error, {}
+    
     def upload_dni_front(self, file, client_dni):
         """
         Subir DNI frontal de cliente
@@ -169,57 +302,139 @@ class FileService:
         """
         return self.upload_file(file, 'dni', f'{client_dni}_back')
     
+    def upload_image(self, file, folder):
+        """
+        Subir una imagen normalizada y su miniatura (todo o nada)
+        
+        Las imágenes se guardan sin EXIF, con IMAGE_MAX_DIMENSION px por lado
+        como máximo y calidad IMAGE_QUALITY; la miniatura (IMAGE_THUMBNAIL_SIZE
+        px) va en <folder>/thumbnails. Los PDF se suben sin cambios y sin
+        miniatura.
+        
+        Args:
+            file: FileStorage object
+            folder: Carpeta lógica
+        
+        Returns:
+            tuple: (success: bool, message: str, url: str|None, thumbnail_url: str|None)
+        """
+        if not self.configured:
+            return False, self._not_configured_message(), None, None
+        
+        is_valid, message = self.validate_upload(file)
+        if not is_valid:
+            return False, message, None, None
+        
+        if not is_processable(file.filename):
+            success, message, url = self._upload(file, folder)
+            return success, message, url, None
+        
+        config = current_app.config
+        try:
+            image, thumbnail = normalize_image(
+                file,
+                max_dimension=config['IMAGE_MAX_DIMENSION'],
+                quality=config['IMAGE_QUALITY'],
+                thumbnail_size=config['IMAGE_THUMBNAIL_SIZE']
+            )
+        except ValueError as e:
+            return False, str(e), None, None
+        
+        success, message, urls = self.upload_files_parallel({
+            'url': (image, folder, None),
+            'thumbnail_url': (thumbnail, f'{folder}/thumbnails', None)
+        })
+        if not success:
+            return False, message, None, None
+        return True, 'Archivo subido exitosamente', urls['url'], urls['thumbnail_url']
+    
     def upload_payment_proof(self, file, operation_id):
         """
-        Subir comprobante de pago de operación
+        Subir comprobante de pago de operación (imagen normalizada + miniatura)
         
         Args:
             file: FileStorage object
             operation_id: ID de la operación (EXP-XXXX)
         
         Returns:
-            tuple: (success: bool, message: str, url: str|None)
+            tuple: (success: bool, message: str, url: str|None, thumbnail_url: str|None)
         """
-        return self.upload_file(file, 'operations/payment_proofs', operation_id)
+        return self.upload_image(file, 'operations/payment_proofs')
     
     def upload_operator_proof(self, file, operation_id):
         """
-        Subir comprobante del operador
+        Subir comprobante del operador (imagen normalizada + miniatura)
         
         Args:
             file: FileStorage object
             operation_id: ID de la operación (EXP-XXXX)
         
         Returns:
-            tuple: (success: bool, message: str, url: str|None)
+            tuple: (success: bool, message: str, url: str|None, thumbnail_url: str|None)
         """
-        return self.upload_file(file, 'operations/operator_proofs', operation_id)
+        return self.upload_image(file, 'operations/operator_proofs')
     
-    @staticmethod
-    def delete_file(url):
+    def delete_file(self, url):
         """
-        Eliminar archivo de Cloudinary (opcional)
+        Eliminar archivo del backend
+        
+        Con claves por contenido el archivo puede estar referenciado por
+        otros registros: solo lo usa el barrido (collect_garbage).
         
         Args:
-            url: URL del archivo en Cloudinary
+            url: URL del archivo
         
         Returns:
             tuple: (success: bool, message: str)
         """
         try:
-            # Extraer public_id de la URL
-            # URL format: https://res.cloudinary.com/{cloud_name}/image/upload/v{version}/{public_id}.{format}
-            parts = url.split('/')
-            public_id_with_ext = '/'.join(parts[-2:])  # folder/filename.ext
-            public_id = public_id_with_ext.rsplit('.', 1)[0]  # Remover extensión
-            
-            # Eliminar de Cloudinary
-            result = cloudinary.uploader.destroy(public_id)
-            
-            if result.get('result') == 'ok':
-                return True, 'Archivo eliminado exitosamente'
-            else:
-                return False, 'No se pudo eliminar el archivo'
-        
+            return self.backend.delete(url)
         except Exception as e:
             return False, f'Error al eliminar archivo: {str(e)}'
+    
+    def collect_garbage(self, min_age_hours=24, dry_run=False):
+        """
+        Eliminar archivos del backend que ningún registro referencia
+        
+        Solo revisa STORAGE_FOLDERS y solo archivos con más de min_age_hours:
+        uno más reciente puede ser de un request que aún no guarda su URL.
+        
+        Args:
+            min_age_hours: Antigüedad mínima para eliminar
+            dry_run: Solo listar, sin eliminar
+        
+        Returns:
+            tuple: (revisados: int, huérfanos: list de URLs)
+        """
+        from app.models.client import Client
+        from app.models.operation import Operation
+        
+        columns = [
+            Client.dni_front_url, Client.dni_back_url,
+            Client.dni_representante_front_url, Client.dni_representante_back_url,
+            Client.ficha_ruc_url, Client.validation_oc_url,
+            Operation.payment_proof_url, Operation.operator_proof_url,
+            Operation.payment_proof_thumbnail_url, Operation.operator_proof_thumbnail_url
+        ]
+        referenced = set()
+        for column in columns:
+            for (url,) in column.class_.query.with_entities(column).filter(column.isnot(None)).yield_per(1000):
+                key = self.backend.key_for(url)
+                if key:
+                    referenced.add(key)
+        
+        cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+        scanned = 0
+        orphans = []
+        for folder in STORAGE_FOLDERS:
+            for key, url, modified in self.backend.iter_files(folder):
+                scanned += 1
+                if key in referenced or modified > cutoff:
+                    continue
+                orphans.append(url)
+                if not dry_run:
+                    ok, message = self.delete_file(url)
+                    if not ok:
+                        logger.warning(f"No se pudo eliminar {url}: {message}")
+        
+        return scanned, orphans
@@ -2,9 +2,67 @@
 Servicio de Notificaciones para QoriCash Trading V2
 
 Maneja notificaciones en tiempo real usando SocketIO.
+
+Cada socket autenticado está en la sala de su rol ('Master', 'Trader',
+'Operador') y en la de su usuario ('user_<id>'), ver app/routes/sockets.py.
+Los eventos se envían solo a las salas que los usan y los dashboard_update
+se agrupan: como máximo uno por sala cada DASHBOARD_UPDATE_INTERVAL segundos.
 """
+import threading
+from flask import current_app
 from app.extensions import socketio
 
+# Salas que reciben eventos de operaciones y del dashboard
+OPERATION_ROOMS = ['Master', 'Trader']
+DASHBOARD_ROOMS = ['Master', 'Trader']
+
+# Estados de operación que le interesan al Operador
+OPERATOR_STATUSES = ('En proceso',)
+
+
+class EventCoalescer:
+    """
+    Agrupar ráfagas de un evento sin datos: como máximo uno por sala por intervalo
+
+    El primer aviso de un intervalo se emite de inmediato; los que llegan
+    durante el intervalo se resumen en un único evento al terminarlo.
+    """
+
+    def __init__(self, event):
+        self.event = event
+        self._lock = threading.Lock()
+        self._windows = {}  # room -> bool (hubo avisos durante el intervalo)
+
+    def notify(self, room, interval):
+        """
+        Registrar un aviso para una sala
+
+        Args:
+            room: Sala destino
+            interval: Segundos mínimos entre eventos de la sala
+        """
+        with self._lock:
+            if room in self._windows:
+                self._windows[room] = True
+                return
+            self._windows[room] = False
+            timer = threading.Timer(interval, self._close_window, args=(room, interval))
+            timer.daemon = True
+            timer.start()
+
+        socketio.emit(self.event, {}, namespace='/', to=room)
+
+    def _close_window(self, room, interval):
+        with self._lock:
+            pending = self._windows.pop(room, False)
+
+        if pending:
+            # Emitir el resumen abre un nuevo intervalo
+            self.notify(room, interval)
+
+
+_dashboard_coalescer = EventCoalescer('dashboard_update')
+
 
 class NotificationService:
     """Servicio de notificaciones en tiempo real"""
@@ -20,14 +78,14 @@ class NotificationService:
         try:
             data = {
                 'operation_id': operation.operation_id,
-                'client_name': operation.client.name if operation.client else 'N/A',
+                'client_name': operation.client.full_name if operation.client else 'N/A',
                 'operation_type': operation.operation_type,
                 'amount_usd': float(operation.amount_usd),
                 'status': operation.status,
                 'created_by': operation.user.username if operation.user else 'N/A'
             }
             
-            socketio.emit('nueva_operacion', data, namespace='/')
+            socketio.emit('nueva_operacion', data, namespace='/', to=OPERATION_ROOMS)
         except Exception as e:
             print(f"Error enviando notificación de nueva operación: {e}")
     
@@ -43,12 +101,16 @@ class NotificationService:
         try:
             data = {
                 'operation_id': operation.operation_id,
-                'client_name': operation.client.name if operation.client else 'N/A',
+                'client_name': operation.client.full_name if operation.client else 'N/A',
                 'status': operation.status,
                 'old_status': old_status
             }
             
-            socketio.emit('operacion_actualizada', data, namespace='/')
+            rooms = list(OPERATION_ROOMS)
+            if operation.status in OPERATOR_STATUSES or old_status in OPERATOR_STATUSES:
+                rooms.append('Operador')
+            
+            socketio.emit('operacion_actualizada', data, namespace='/', to=rooms)
         except Exception as e:
             print(f"Error enviando notificación de operación actualizada: {e}")
     
@@ -63,32 +125,37 @@ class NotificationService:
         try:
             data = {
                 'operation_id': operation.operation_id,
-                'client_name': operation.client.name if operation.client else 'N/A',
+                'client_name': operation.client.full_name if operation.client else 'N/A',
                 'amount_usd': float(operation.amount_usd),
                 'amount_pen': float(operation.amount_pen)
             }
             
-            socketio.emit('operacion_completada', data, namespace='/')
+            socketio.emit('operacion_completada', data, namespace='/', to=OPERATION_ROOMS)
         except Exception as e:
             print(f"Error enviando notificación de operación completada: {e}")
     
     @staticmethod
-    def notify_operation_canceled(operation, reason=None):
+    def notify_operation_canceled(operation, reason=None, old_status=None):
         """
         Notificar operación cancelada
         
         Args:
             operation: Objeto Operation
             reason: Razón de cancelación (opcional)
+            old_status: Estado anterior (opcional)
         """
         try:
             data = {
                 'operation_id': operation.operation_id,
-                'client_name': operation.client.name if operation.client else 'N/A',
+                'client_name': operation.client.full_name if operation.client else 'N/A',
                 'reason': reason
             }
             
-            socketio.emit('operacion_cancelada', data, namespace='/')
+            rooms = list(OPERATION_ROOMS)
+            if old_status in OPERATOR_STATUSES:
+                rooms.append('Operador')
+            
+            socketio.emit('operacion_cancelada', data, namespace='/', to=rooms)
         except Exception as e:
             print(f"Error enviando notificación de operación cancelada: {e}")
     
@@ -104,7 +171,7 @@ class NotificationService:
         """
         try:
             data['target_role'] = role
-            socketio.emit(message_type, data, namespace='/', room=role)
+            socketio.emit(message_type, data, namespace='/', to=role)
         except Exception as e:
             print(f"Error enviando notificación a rol {role}: {e}")
     
@@ -120,7 +187,7 @@ class NotificationService:
         """
         try:
             room = f'user_{user_id}'
-            socketio.emit(message_type, data, namespace='/', room=room)
+            socketio.emit(message_type, data, namespace='/', to=room)
         except Exception as e:
             print(f"Error enviando notificación a usuario {user_id}: {e}")
     
@@ -156,7 +223,7 @@ class NotificationService:
         """
         try:
             data = {
-                'client_name': client.name,
+                'client_name': client.full_name,
                 'client_dni': client.dni,
                 'created_by': created_by.username if created_by else 'N/A'
             }
@@ -189,9 +256,11 @@ class NotificationService:
     @staticmethod
     def notify_dashboard_update():
         """
-        Notificar actualización del dashboard
+        Notificar actualización del dashboard (agrupada por sala, ver EventCoalescer)
         """
         try:
-            socketio.emit('dashboard_update', {}, namespace='/')
+            interval = current_app.config['DASHBOARD_UPDATE_INTERVAL']
+            for room in DASHBOARD_ROOMS:
+                _dashboard_coalescer.notify(room, interval)
         except Exception as e:
             print(f"Error enviando notificación de actualización de dashboard: {e}")
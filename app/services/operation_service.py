@@ -3,19 +3,72 @@ Servicio de Operaciones para QoriCash Trading V2
 
 Core del negocio - Maneja todas las operaciones de cambio de divisas.
 """
-from datetime import datetime, date
-from sqlalchemy import func, and_
+from datetime import datetime, date, time, timedelta
+from flask import current_app
+from sqlalchemy import func, and_, case, distinct
+from sqlalchemy.orm import joinedload
 from app.extensions import db
 from app.models.operation import Operation
 from app.models.client import Client
+from app.models.user import User
 from app.models.audit_log import AuditLog
+from app.models.operation_daily_stat import OperationDailyStat
 from app.utils.validators import validate_amount, validate_exchange_rate
 from app.utils.formatters import now_peru
+from app.utils.pagination import keyset_page
+from app.utils.cache import TTLCache
+from app.services.change_feed_service import ChangeFeedService
+from app.utils.constants import EXPORT_BATCH_SIZE, OPERATOR_OPERATION_STATUSES
+
+# Caché de estadísticas de dashboard por periodo (por proceso)
+_dashboard_stats_cache = TTLCache()
+
+# Columnas de la exportación de operaciones (orden de iter_export_rows)
+EXPORT_HEADERS = [
+    'ID Operación',
+    'Cliente',
+    'Documento',
+    'Tipo',
+    'Monto USD',
+    'Tipo de Cambio',
+    'Monto PEN',
+    'Estado',
+    'Usuario',
+    'Fecha Registro',
+    'Fecha Completada'
+]
 
 
 class OperationService:
     """Servicio de gestión de operaciones"""
     
+    @staticmethod
+    def _with_relations(query):
+        """
+        Cargar cliente y usuario en la misma consulta (JOIN)
+        
+        Evita el patrón N+1 de Operation.to_dict(include_relations=True):
+        solo se proyectan las columnas necesarias para client_name,
+        user_name y las plantillas de listado.
+        
+        Args:
+            query: Query de Operation
+        
+        Returns:
+            Query: Query con eager loading
+        """
+        return query.options(
+            joinedload(Operation.client).load_only(
+                Client.document_type,
+                Client.dni,
+                Client.razon_social,
+                Client.apellido_paterno,
+                Client.apellido_materno,
+                Client.nombres
+            ),
+            joinedload(Operation.user).load_only(User.username)
+        )
+    
     @staticmethod
     def get_all_operations(include_relations=True):
         """
@@ -27,13 +80,78 @@ class OperationService:
         Returns:
             list: Lista de operaciones
         """
-        operations = Operation.query.order_by(Operation.created_at.desc()).all()
+        operations = OperationService._with_relations(Operation.query).order_by(
+            Operation.created_at.desc()
+        ).all()
         
         if include_relations:
             return [op.to_dict(include_relations=True) for op in operations]
         
         return operations
     
+    @staticmethod
+    def get_operations_page(limit=None, after=None, status=None, client_id=None):
+        """
+        Obtener una página de operaciones (paginación keyset)
+        
+        Ordena por (created_at, id) descendente y continúa desde el cursor
+        recibido, por lo que el costo no crece con el tamaño de la tabla.
+        
+        Args:
+            limit: Tamaño de página (por defecto DEFAULT_PAGE_SIZE)
+            after: Cursor devuelto por la página anterior (opcional)
+            status: Filtrar por estado (opcional)
+            client_id: Filtrar por cliente (opcional)
+        
+        Returns:
+            tuple: (operations: list[Operation], next_cursor: str|None)
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        query = OperationService._with_relations(Operation.query)
+        
+        if status:
+            query = query.filter(Operation.status == status)
+        
+        if client_id:
+            query = query.filter(Operation.client_id == client_id)
+        
+        return keyset_page(query, Operation.created_at, Operation.id, limit, after)
+    
+    @staticmethod
+    def iter_export_rows(batch_size=EXPORT_BATCH_SIZE):
+        """
+        Generar las filas de la exportación de operaciones (ver EXPORT_HEADERS)
+        
+        Recorre las operaciones con un cursor del servidor (yield_per),
+        cargando cliente y usuario en la misma consulta.
+        
+        Args:
+            batch_size: Filas leídas por lote desde la base de datos
+        
+        Yields:
+            list: Valores de una fila en el orden de EXPORT_HEADERS
+        """
+        query = OperationService._with_relations(Operation.query).order_by(
+            Operation.created_at.desc(), Operation.id.desc()
+        ).yield_per(batch_size)
+        
+        for op in query:
+            yield [
+                op.operation_id,
+                (op.client.full_name or '') if op.client else '',
+                op.client.dni if op.client else '',
+                op.operation_type,
+                float(op.amount_usd),
+                float(op.exchange_rate),
+                float(op.amount_pen),
+                op.status,
+                op.user.username if op.user else '',
+                op.created_at.strftime('%d/%m/%Y %H:%M') if op.created_at else '',
+                op.completed_at.strftime('%d/%m/%Y %H:%M') if op.completed_at else ''
+            ]
+    
     @staticmethod
     def get_operation_by_id(operation_id):
         """
@@ -71,7 +189,9 @@ class OperationService:
         Returns:
             list: Lista de operaciones
         """
-        return Operation.query.filter_by(status=status).order_by(Operation.created_at.desc()).all()
+        return OperationService._with_relations(Operation.query).filter_by(
+            status=status
+        ).order_by(Operation.created_at.desc()).all()
     
     @staticmethod
     def get_operations_by_client(client_id):
@@ -84,7 +204,9 @@ class OperationService:
         Returns:
             list: Lista de operaciones
         """
-        return Operation.query.filter_by(client_id=client_id).order_by(Operation.created_at.desc()).all()
+        return OperationService._with_relations(Operation.query).filter_by(
+            client_id=client_id
+        ).order_by(Operation.created_at.desc()).all()
     
     @staticmethod
     def get_today_operations():
@@ -95,7 +217,7 @@ class OperationService:
             list: Lista de operaciones de hoy
         """
         today = date.today()
-        return Operation.query.filter(
+        return OperationService._with_relations(Operation.query).filter(
             func.date(Operation.created_at) == today
         ).order_by(Operation.created_at.desc()).all()
     
@@ -166,16 +288,26 @@ class OperationService:
         )
         
         db.session.add(operation)
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Actualizar rollup diario en la misma transacción
+        OperationDailyStat.record_created(operation)
+        
+        # Obtener operation.id para la auditoría
+        db.session.flush()
+        
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='CREATE_OPERATION',
             entity='Operation',
             entity_id=operation.id,
-            details=f'Operación {operation_id} creada: {operation_type} ${amount_usd} para {client.name}'
+            details=f'Operación {operation_id} creada: {operation_type} ${amount_usd} para {client.full_name or client.dni}'
         )
+        ChangeFeedService.record('Operation', operation.id, 'create')
+        
+        db.session.commit()
+        ChangeFeedService.publish()
+        OperationService.invalidate_dashboard_stats()
         
         return True, f'Operación {operation_id} creada exitosamente', operation
     
@@ -231,9 +363,10 @@ class OperationService:
             else:
                 operation.notes = notes
         
-        db.session.commit()
+        # Mover la operación de bucket en el rollup diario (misma transacción)
+        OperationDailyStat.record_status_change(operation, old_status)
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='UPDATE_OPERATION_STATUS',
@@ -242,19 +375,30 @@ class OperationService:
             details=f'Operación {operation.operation_id}: {old_status} → {new_status}',
             notes=notes
         )
+        ChangeFeedService.record('Operation', operation.id, 'update')
+        
+        db.session.commit()
+        ChangeFeedService.publish()
+        OperationService.invalidate_dashboard_stats()
         
         return True, f'Estado actualizado a {new_status}', operation
     
     @staticmethod
-    def update_operation_proofs(current_user, operation_id, payment_proof_url=None, operator_proof_url=None):
+    def update_operation_proofs(current_user, operation_id, payment_proof_url=None, operator_proof_url=None,
+                                payment_proof_thumbnail_url=None, operator_proof_thumbnail_url=None):
         """
         Actualizar comprobantes de operación
         
+        La miniatura se reemplaza junto con su comprobante (queda en None si
+        el nuevo comprobante es un PDF).
+        
         Args:
             current_user: Usuario que actualiza
             operation_id: ID de la operación
             payment_proof_url: URL de comprobante de pago
             operator_proof_url: URL de comprobante del operador
+            payment_proof_thumbnail_url: URL de la miniatura del comprobante de pago
+            operator_proof_thumbnail_url: URL de la miniatura del comprobante del operador
         
         Returns:
             tuple: (success: bool, message: str, operation: Operation|None)
@@ -267,14 +411,15 @@ class OperationService:
         # Actualizar URLs
         if payment_proof_url:
             operation.payment_proof_url = payment_proof_url
+            operation.payment_proof_thumbnail_url = payment_proof_thumbnail_url
         
         if operator_proof_url:
             operation.operator_proof_url = operator_proof_url
+            operation.operator_proof_thumbnail_url = operator_proof_thumbnail_url
         
         operation.updated_at = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='UPDATE_OPERATION_PROOFS',
@@ -282,6 +427,10 @@ class OperationService:
             entity_id=operation.id,
             details=f'Comprobantes actualizados para operación {operation.operation_id}'
         )
+        ChangeFeedService.record('Operation', operation.id, 'update')
+        
+        db.session.commit()
+        ChangeFeedService.publish()
         
         return True, 'Comprobantes actualizados exitosamente', operation
     
@@ -318,9 +467,10 @@ class OperationService:
         else:
             operation.notes = f"[CANCELADO] {reason}"
         
-        db.session.commit()
+        # Mover la operación de bucket en el rollup diario (misma transacción)
+        OperationDailyStat.record_status_change(operation, old_status)
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='CANCEL_OPERATION',
@@ -329,84 +479,203 @@ class OperationService:
             details=f'Operación {operation.operation_id} cancelada',
             notes=reason
         )
+        ChangeFeedService.record('Operation', operation.id, 'update')
+        
+        db.session.commit()
+        ChangeFeedService.publish()
+        OperationService.invalidate_dashboard_stats()
         
         return True, 'Operación cancelada exitosamente', operation
     
     @staticmethod
-    def get_dashboard_stats(month=None, year=None):
+    def get_month_range(month, year):
         """
-        Obtener estadísticas para dashboard
+        Obtener rango [inicio, fin) de un mes
         
         Args:
-            month: Mes (1-12) opcional
-            year: Año opcional
+            month: Mes (1-12)
+            year: Año
         
         Returns:
-            dict: Estadísticas
+            tuple: (start_date: datetime, end_date: datetime)
         """
-        # Si no se especifica mes/año, usar actual
-        if not month or not year:
-            now = now_peru()
-            month = now.month
-            year = now.year
-        
-        # Rango de fechas del mes
         start_date = datetime(year, month, 1)
         if month == 12:
             end_date = datetime(year + 1, 1, 1)
         else:
             end_date = datetime(year, month + 1, 1)
+        return start_date, end_date
+    
+    @staticmethod
+    def get_day_range(day):
+        """
+        Obtener rango [inicio, fin) de un día
         
-        # Operaciones del mes
-        operations_month = Operation.query.filter(
+        Usar un rango sobre created_at (en lugar de func.date) permite
+        aprovechar el índice de la columna.
+        
+        Args:
+            day: date
+        
+        Returns:
+            tuple: (start_date: datetime, end_date: datetime)
+        """
+        start_date = datetime.combine(day, time.min)
+        return start_date, start_date + timedelta(days=1)
+    
+    @staticmethod
+    def get_period_stats(start_date, end_date):
+        """
+        Obtener KPIs de operaciones de un periodo desde el rollup diario
+        
+        Lee la tabla operation_daily_stats (a lo sumo unas pocas filas por
+        día) en lugar de recorrer la tabla operations. Los límites se
+        truncan a días completos.
+        
+        Args:
+            start_date: Inicio del periodo (inclusive)
+            end_date: Fin del periodo (exclusivo)
+        
+        Returns:
+            dict: Estadísticas del periodo
+        """
+        return OperationDailyStat.get_period_stats(start_date.date(), end_date.date())
+    
+    @staticmethod
+    def compute_period_stats(start_date, end_date):
+        """
+        Calcular KPIs de operaciones de un periodo directamente sobre operations
+        
+        Usa agregados condicionales (SUM/COUNT DISTINCT sobre CASE) en una
+        sola consulta. Sirve como referencia para verificar el rollup diario
+        y para rangos que no están alineados a días.
+        
+        Args:
+            start_date: Inicio del periodo (inclusive)
+            end_date: Fin del periodo (exclusivo)
+        
+        Returns:
+            dict: Estadísticas del periodo
+        """
+        completed = Operation.status == 'Completada'
+        
+        def count_status(status):
+            return func.coalesce(func.sum(case((Operation.status == status, 1), else_=0)), 0)
+        
+        row = db.session.query(
+            func.count(Operation.id),
+            count_status('Pendiente'),
+            count_status('En proceso'),
+            count_status('Completada'),
+            count_status('Cancelado'),
+            func.coalesce(func.sum(case((completed, Operation.amount_usd), else_=0)), 0),
+            func.coalesce(func.sum(case((completed, Operation.amount_pen), else_=0)), 0),
+            func.count(distinct(Operation.client_id)),
+            func.count(distinct(case((completed, Operation.client_id))))
+        ).filter(
             and_(
                 Operation.created_at >= start_date,
                 Operation.created_at < end_date
             )
-        ).all()
+        ).one()
         
-        # Operaciones de hoy
-        today = date.today()
-        operations_today = Operation.query.filter(
-            func.date(Operation.created_at) == today
-        ).all()
+        return {
+            'operations_count': int(row[0]),
+            'pending_count': int(row[1]),
+            'in_process_count': int(row[2]),
+            'completed_count': int(row[3]),
+            'canceled_count': int(row[4]),
+            'total_usd': row[5],
+            'total_pen': row[6],
+            'unique_clients': int(row[7]),
+            'active_clients': int(row[8])
+        }
+    
+    @staticmethod
+    def get_year_stats(year):
+        """
+        Obtener KPIs de un año completo (desde el rollup diario)
         
-        # Calcular estadísticas del mes
-        completed_month = [op for op in operations_month if op.status == 'Completada']
-        total_usd_month = sum(op.amount_usd for op in completed_month)
-        total_pen_month = sum(op.amount_pen for op in completed_month)
+        Args:
+            year: Año
+        
+        Returns:
+            dict: Estadísticas del año
+        """
+        return OperationService.get_period_stats(datetime(year, 1, 1), datetime(year + 1, 1, 1))
+    
+    @staticmethod
+    def get_dashboard_stats(month=None, year=None):
+        """
+        Obtener estadísticas para dashboard
         
-        # Clientes únicos del mes
-        unique_clients_month = len(set(op.client_id for op in operations_month))
+        El resultado se cachea por periodo (DASHBOARD_STATS_CACHE_TTL) y se
+        invalida cuando se crea, cambia de estado o cancela una operación.
+        La clave incluye la secuencia del feed de cambios: un cambio hecho
+        en otro worker también invalida la caché de este (el ETag de
+        /api/dashboard_data nunca queda asociado a estadísticas viejas).
+        Si muchos navegadores piden lo mismo a la vez, solo uno lo calcula.
         
-        # Clientes activos (con al menos una operación completada)
-        active_clients_month = len(set(op.client_id for op in completed_month))
+        Args:
+            month: Mes (1-12) opcional
+            year: Año opcional
         
-        # Calcular estadísticas de hoy
-        completed_today = [op for op in operations_today if op.status == 'Completada']
-        total_usd_today = sum(op.amount_usd for op in completed_today)
-        total_pen_today = sum(op.amount_pen for op in completed_today)
-        unique_clients_today = len(set(op.client_id for op in operations_today))
+        Returns:
+            dict: Estadísticas (copia, se puede modificar)
+        """
+        # Si no se especifica mes/año, usar actual
+        if not month or not year:
+            now = now_peru()
+            month = now.month
+            year = now.year
+        
+        today = date.today()
+        stats = _dashboard_stats_cache.get_or_compute(
+            (month, year, today, ChangeFeedService.get_change_version()),
+            lambda: OperationService._compute_dashboard_stats(month, year, today),
+            ttl=current_app.config['DASHBOARD_STATS_CACHE_TTL']
+        )
+        return dict(stats)
+    
+    @staticmethod
+    def invalidate_dashboard_stats():
+        """
+        Invalidar la caché de estadísticas de dashboard
+        
+        Se llama en los mismos eventos que NotificationService.notify_dashboard_update.
+        """
+        _dashboard_stats_cache.invalidate()
+    
+    @staticmethod
+    def _compute_dashboard_stats(month, year, today):
+        """Calcular estadísticas de dashboard sin caché"""
+        # Estadísticas del mes y de hoy (una consulta agregada cada una)
+        month_stats = OperationService.get_period_stats(
+            *OperationService.get_month_range(month, year)
+        )
+        today_stats = OperationService.get_period_stats(
+            *OperationService.get_day_range(today)
+        )
         
         return {
             # Estadísticas del día
-            'clients_today': unique_clients_today,
-            'operations_today': len(operations_today),
-            'usd_today': float(total_usd_today),
-            'pen_today': float(total_pen_today),
+            'clients_today': today_stats['unique_clients'],
+            'operations_today': today_stats['operations_count'],
+            'usd_today': today_stats['total_usd'],
+            'pen_today': today_stats['total_pen'],
             
             # Estadísticas del mes
-            'clients_month': unique_clients_month,
-            'active_clients_month': active_clients_month,
-            'operations_month': len(operations_month),
-            'usd_month': float(total_usd_month),
-            'pen_month': float(total_pen_month),
+            'clients_month': month_stats['unique_clients'],
+            'active_clients_month': month_stats['active_clients'],
+            'operations_month': month_stats['operations_count'],
+            'usd_month': month_stats['total_usd'],
+            'pen_month': month_stats['total_pen'],
             
             # Por estado
-            'pending_count': sum(1 for op in operations_month if op.status == 'Pendiente'),
-            'in_process_count': sum(1 for op in operations_month if op.status == 'En proceso'),
-            'completed_count': len(completed_month),
-            'canceled_count': sum(1 for op in operations_month if op.status == 'Cancelado')
+            'pending_count': month_stats['pending_count'],
+            'in_process_count': month_stats['in_process_count'],
+            'completed_count': month_stats['completed_count'],
+            'canceled_count': month_stats['canceled_count']
         }
     
     @staticmethod
@@ -418,6 +687,6 @@ class OperationService:
         Returns:
             list: Lista de operaciones
         """
-        return Operation.query.filter(
-            Operation.status.in_(['Pendiente', 'En proceso'])
+        return OperationService._with_relations(Operation.query).filter(
+            Operation.status.in_(OPERATOR_OPERATION_STATUSES)
         ).order_by(Operation.created_at.desc()).all()
@@ -3,11 +3,13 @@ Servicio de Usuarios para QoriCash Trading V2
 
 Maneja CRUD de usuarios, cambios de rol, activación/desactivación.
 """
+from sqlalchemy import func, case, and_
 from app.extensions import db
 from app.models.user import User
 from app.models.audit_log import AuditLog
 from app.utils.validators import validate_dni, validate_email, validate_password
 from app.utils.formatters import now_peru
+from app.services.auth_service import AuthService
 
 
 class UserService:
@@ -120,9 +122,9 @@ class UserService:
         user.set_password(password)
         
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()  # Obtener user.id para la auditoría
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='CREATE_USER',
@@ -131,6 +133,8 @@ class UserService:
             details=f'Usuario {username} creado con rol {role}'
         )
         
+        db.session.commit()
+        
         return True, 'Usuario creado exitosamente', user
     
     @staticmethod
@@ -195,9 +199,8 @@ class UserService:
             user.status = status
         
         user.updated_at = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='UPDATE_USER',
@@ -206,6 +209,9 @@ class UserService:
             details=f'Usuario {user.username} actualizado'
         )
         
+        db.session.commit()
+        AuthService.invalidate_user_cache(user.id)
+        
         return True, 'Usuario actualizado exitosamente', user
     
     @staticmethod
@@ -237,9 +243,8 @@ class UserService:
         new_status = 'Inactivo' if user.status == 'Activo' else 'Activo'
         user.status = new_status
         user.updated_at = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='TOGGLE_USER_STATUS',
@@ -248,6 +253,9 @@ class UserService:
             details=f'Usuario {user.username} {new_status.lower()}'
         )
         
+        db.session.commit()
+        AuthService.invalidate_user_cache(user.id)
+        
         return True, f'Usuario {new_status.lower()} exitosamente', user
     
     @staticmethod
@@ -278,9 +286,8 @@ class UserService:
         # Soft delete (marcar como inactivo)
         user.status = 'Inactivo'
         user.updated_at = now_peru()
-        db.session.commit()
         
-        # Registrar en auditoría
+        # Registrar en auditoría (misma transacción)
         AuditLog.log_action(
             user_id=current_user.id,
             action='DELETE_USER',
@@ -289,27 +296,122 @@ class UserService:
             details=f'Usuario {user.username} eliminado (soft delete)'
         )
         
+        db.session.commit()
+        AuthService.invalidate_user_cache(user.id)
+        
         return True, 'Usuario eliminado exitosamente'
     
     @staticmethod
     def get_user_stats(user_id):
         """
-        Obtener estadísticas de un usuario
+        Obtener estadísticas de un usuario (una sola consulta agrupada)
         
         Args:
             user_id: ID del usuario
         
         Returns:
-            dict: Estadísticas del usuario
+            dict: Estadísticas del usuario o None si no existe
         """
-        user = User.query.get(user_id)
-        if not user:
+        from app.models.operation import Operation
+        
+        row = db.session.query(
+            User.id,
+            func.count(Operation.id),
+            *UserService._status_counts(Operation)
+        ).outerjoin(
+            Operation, Operation.user_id == User.id
+        ).filter(
+            User.id == user_id
+        ).group_by(User.id).first()
+        
+        if not row:
             return None
         
+        _, total, completed, pending, in_process, canceled = row
         return {
-            'total_operations': user.operations.count(),
-            'completed_operations': user.operations.filter_by(status='Completada').count(),
-            'pending_operations': user.operations.filter_by(status='Pendiente').count(),
-            'in_process_operations': user.operations.filter_by(status='En proceso').count(),
-            'canceled_operations': user.operations.filter_by(status='Cancelado').count()
+            'total_operations': int(total),
+            'completed_operations': int(completed),
+            'pending_operations': int(pending),
+            'in_process_operations': int(in_process),
+            'canceled_operations': int(canceled)
         }
+    
+    @staticmethod
+    def _status_counts(Operation):
+        """Columnas de conteo condicional: Completada, Pendiente, En proceso, Cancelado"""
+        return [
+            func.coalesce(func.sum(case((Operation.status == status, 1), else_=0)), 0)
+            for status in ('Completada', 'Pendiente', 'En proceso', 'Cancelado')
+        ]
+    
+    @staticmethod
+    def get_trader_leaderboard(start_date=None, end_date=None, role='Trader'):
+        """
+        Ranking de usuarios por volumen operado en un periodo (una sola consulta)
+        
+        Las operaciones se filtran en la condición del JOIN para que los
+        usuarios sin operaciones en el periodo aparezcan con ceros.
+        
+        Args:
+            start_date: Inicio del periodo (inclusive, None = sin límite)
+            end_date: Fin del periodo (exclusivo, None = sin límite)
+            role: Rol de los usuarios a rankear (None = todos)
+        
+        Returns:
+            list: Diccionarios ordenados por USD completado (mayor primero) con
+                  rank, user_id, username, role, status, total_operations,
+                  completed/pending/in_process/canceled_operations,
+                  total_usd, total_pen (solo completadas) y completion_rate (%)
+        """
+        from app.models.operation import Operation
+        
+        join_condition = [Operation.user_id == User.id]
+        if start_date:
+            join_condition.append(Operation.created_at >= start_date)
+        if end_date:
+            join_condition.append(Operation.created_at < end_date)
+        
+        completed_usd = func.coalesce(func.sum(case((Operation.status == 'Completada', Operation.amount_usd), else_=0)), 0)
+        completed_pen = func.coalesce(func.sum(case((Operation.status == 'Completada', Operation.amount_pen), else_=0)), 0)
+        
+        query = db.session.query(
+            User.id,
+            User.username,
+            User.role,
+            User.status,
+            func.count(Operation.id),
+            *UserService._status_counts(Operation),
+            completed_usd,
+            completed_pen
+        ).outerjoin(
+            Operation, and_(*join_condition)
+        ).group_by(
+            User.id, User.username, User.role, User.status
+        ).order_by(
+            completed_usd.desc(), func.count(Operation.id).desc(), User.username
+        )
+        
+        if role:
+            query = query.filter(User.role == role)
+        
+        leaderboard = []
+        for rank, row in enumerate(query.all(), 1):
+            (user_id, username, user_role, user_status, total,
+             completed, pending, in_process, canceled, total_usd, total_pen) = row
+            leaderboard.append({
+                'rank': rank,
+                'user_id': user_id,
+                'username': username,
+                'role': user_role,
+                'status': user_status,
+                'total_operations': int(total),
+                'completed_operations': int(completed),
+                'pending_operations': int(pending),
+                'in_process_operations': int(in_process),
+                'canceled_operations': int(canceled),
+                'total_usd': total_usd,
+                'total_pen': total_pen,
+                'completion_rate': round(int(completed) * 100 / int(total), 2) if total else 0.0
+            })
+        
+        return leaderboard
@@ -1127,39 +1127,10 @@ function deleteClient(clientId) {
 }
 
 /**
- * Exportar clientes a CSV
+ * Exportar clientes (xlsx o csv) en segundo plano
  */
-function exportClients() {
-    showLoading();
-
-    fetch('/clients/api/export/csv')
-        .then(response => {
-            if (response.ok) {
-                return response.blob();
-            } else {
-                throw new Error('Error al exportar');
-            }
-        })
-        .then(blob => {
-            hideLoading();
-
-            // Crear link de descarga
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `clientes_qoricash_${new Date().toISOString().split('T')[0]}.csv`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-
-            showAlert('success', 'Clientes exportados exitosamente');
-        })
-        .catch(error => {
-            hideLoading();
-            console.error('Error:', error);
-            showAlert('error', 'Error al exportar los clientes');
-        });
+function exportClients(format) {
+    startExportJob('clients', format || 'xlsx');
 }
 
 /**
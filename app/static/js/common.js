@@ -5,6 +5,17 @@
 
 // Socket.IO connection
 let socket = null;
+let socketConnectedOnce = false;
+
+// Feed de cambios: última secuencia aplicada y manejador de la página
+let changeFeedSeq = null;
+let changeFeedHandler = null;
+
+// Dashboard en pantalla (lo activa la página con watchDashboard)
+let dashboardActive = false;
+let dashboardMonth = null;
+let dashboardYear = null;
+let dashboardReloadTimer = null;
 
 /**
  * Conectar a SocketIO para actualizaciones en tiempo real
@@ -16,6 +27,17 @@ function connectSocketIO() {
     
     socket.on('connect', function() {
         console.log('✅ SocketIO conectado');
+        
+        // Pedir lo confirmado desde que se generó la página o mientras estuvo desconectado
+        catchUpChanges();
+        if (socketConnectedOnce) {
+            scheduleDashboardReload();
+        }
+        socketConnectedOnce = true;
+    });
+    
+    socket.on('delta', function(payload) {
+        applyDelta(payload);
     });
     
     socket.on('disconnect', function() {
@@ -37,10 +59,69 @@ function connectSocketIO() {
         playNotificationSound();
     });
     
+    // Exportaciones en segundo plano: consultar el estado de inmediato
+    socket.on('export_completed', function(data) {
+        if (exportJobTimers[data.job_id]) {
+            pollExportJob(data.job_id, 0);
+        }
+    });
+    
+    socket.on('export_failed', function(data) {
+        if (exportJobTimers[data.job_id]) {
+            pollExportJob(data.job_id, 0);
+        }
+    });
+    
     socket.on('dashboard_update', function() {
         // Actualizar dashboard si estamos en esa página
-        if (typeof loadDashboardData === 'function') {
-            loadDashboardData();
+        scheduleDashboardReload();
+    });
+}
+
+/**
+ * Suscribir la página al feed de cambios
+ * 
+ * @param {number} seq - Secuencia con la que se generó la página
+ * @param {function} handler - Recibe la lista de cambios [{seq, entity, entity_id, action, data}]
+ */
+function subscribeChanges(seq, handler) {
+    changeFeedSeq = seq;
+    changeFeedHandler = handler;
+}
+
+/**
+ * Aplicar un delta recibido por SocketIO
+ * 
+ * Las secuencias pueden tener huecos y llegar fuera de orden (transacciones
+ * confirmadas en otro orden): se aplica todo delta recibido y se guarda la
+ * mayor secuencia vista. Cada cambio trae el estado actual de la fila, así
+ * que aplicarlo de nuevo no tiene efecto.
+ */
+function applyDelta(payload) {
+    if (!changeFeedHandler || changeFeedSeq === null) return;
+    
+    changeFeedSeq = Math.max(changeFeedSeq, payload.seq);
+    if (payload.changes.length) {
+        changeFeedHandler(payload.changes);
+    }
+}
+
+/**
+ * Pedir los cambios posteriores a la mayor secuencia vista
+ */
+function catchUpChanges() {
+    if (!changeFeedHandler || changeFeedSeq === null) return;
+    
+    ajaxRequest(`/api/changes?since=${changeFeedSeq}`, 'GET', null, function(response) {
+        if (response.reset) {
+            // El feed ya no cubre esta página: recargar completa
+            location.reload();
+            return;
+        }
+        // Incluye los cambios recientes con secuencia menor (confirmados tarde)
+        changeFeedSeq = Math.max(changeFeedSeq, response.seq);
+        if (response.changes.length) {
+            changeFeedHandler(response.changes);
         }
     });
 }
@@ -126,6 +207,13 @@ function formatCurrency(amount, currency = 'USD') {
     return currency === 'USD' ? `$ ${formatted}` : `S/ ${formatted}`;
 }
 
+/**
+ * Escapar texto para insertarlo en HTML
+ */
+function escapeHtml(value) {
+    return $('<div>').text(value == null ? '' : String(value)).html();
+}
+
 /**
  * Formatear fecha
  */
@@ -196,11 +284,53 @@ function copyToClipboard(text) {
 }
 
 /**
- * Exportar tabla a Excel
+ * Exportar tabla de operaciones a Excel
  */
 function exportToExcel() {
-    // Esta función requiere una librería adicional o backend
-    showAlert('Función de exportación en desarrollo', 'info');
+    startExportJob('operations', 'xlsx');
+}
+
+/**
+ * Encolar una exportación en segundo plano y descargarla al terminar
+ *
+ * El servidor responde con el ID del trabajo; se consulta su estado hasta
+ * que termine (los eventos SocketIO 'export_*' adelantan la consulta).
+ *
+ * @param {string} type - 'clients', 'operations' o 'audit_logs'
+ * @param {string} format - 'xlsx' o 'csv'
+ */
+function startExportJob(type, format = 'xlsx') {
+    ajaxRequest('/exports/api/jobs', 'POST', { type: type, format: format }, function(response) {
+        showAlert('Exportación en proceso. La descarga comenzará automáticamente.', 'info');
+        pollExportJob(response.job.id);
+    });
+}
+
+const exportJobTimers = {};
+
+function pollExportJob(jobId, delay = 1000) {
+    clearTimeout(exportJobTimers[jobId]);
+
+    exportJobTimers[jobId] = setTimeout(function() {
+        $.getJSON(`/exports/api/jobs/${jobId}`, function(response) {
+            const job = response.job;
+
+            if (job.status === 'Completado') {
+                delete exportJobTimers[jobId];
+                window.location = `/exports/api/jobs/${jobId}/download`;
+                showAlert('Exportación lista', 'success');
+            } else if (job.status === 'Error') {
+                delete exportJobTimers[jobId];
+                showAlert(`Error al exportar: ${job.error_message || ''}`, 'danger');
+            } else {
+                // Espaciar las consultas hasta un máximo de 5 segundos
+                pollExportJob(jobId, Math.min(delay * 1.5, 5000));
+            }
+        }).fail(function() {
+            delete exportJobTimers[jobId];
+            showAlert('No se pudo consultar el estado de la exportación', 'danger');
+        });
+    }, delay);
 }
 
 /**
@@ -242,6 +372,40 @@ $(document).ready(function() {
     });
 });
 
+/**
+ * Activar el dashboard en vivo: KPIs al cargar y cada vez que haya cambios
+ * 
+ * @param {number} seq - Secuencia del feed con la que se generó la página
+ */
+function watchDashboard(seq) {
+    dashboardActive = true;
+    loadDashboardData();
+    subscribeChanges(seq, function() {
+        scheduleDashboardReload();
+    });
+}
+
+/**
+ * Cambiar el periodo del dashboard (se conserva en las recargas por cambios)
+ */
+function setDashboardPeriod(month, year) {
+    dashboardMonth = month;
+    dashboardYear = year;
+    loadDashboardData(month, year);
+}
+
+/**
+ * Recargar los KPIs una sola vez por ráfaga de cambios
+ */
+function scheduleDashboardReload() {
+    if (!dashboardActive) return;
+    
+    clearTimeout(dashboardReloadTimer);
+    dashboardReloadTimer = setTimeout(function() {
+        loadDashboardData(dashboardMonth, dashboardYear);
+    }, 300);
+}
+
 /**
  * Cargar datos del dashboard
  */
@@ -2,6 +2,17 @@
  * QoriCash Trading V2 - Operations Management JavaScript
  */
 
+/**
+ * Enlace a un comprobante
+ * Las imágenes se muestran con su miniatura; el original solo se abre al hacer clic
+ */
+function renderProofLink(url, thumbnailUrl, label) {
+    if (thumbnailUrl) {
+        return `<p><a href="${url}" target="_blank" title="${label}"><img src="${thumbnailUrl}" alt="${label}" loading="lazy" class="img-thumbnail" style="max-width: 160px;"></a></p>`;
+    }
+    return `<p><a href="${url}" target="_blank" class="btn btn-sm btn-outline-primary"><i class="bi bi-file-earmark"></i> ${label}</a></p>`;
+}
+
 /**
  * Ver operación
  */
@@ -40,8 +51,8 @@ function viewOperation(operationId) {
             ${op.payment_proof_url || op.operator_proof_url ? `
                 <hr>
                 <h6>Comprobantes</h6>
-                ${op.payment_proof_url ? `<p><a href="${op.payment_proof_url}" target="_blank" class="btn btn-sm btn-outline-primary"><i class="bi bi-file-earmark"></i> Ver Comprobante Cliente</a></p>` : ''}
-                ${op.operator_proof_url ? `<p><a href="${op.operator_proof_url}" target="_blank" class="btn btn-sm btn-outline-primary"><i class="bi bi-file-earmark"></i> Ver Comprobante Operador</a></p>` : ''}
+                ${op.payment_proof_url ? renderProofLink(op.payment_proof_url, op.payment_proof_thumbnail_url, 'Ver Comprobante Cliente') : ''}
+                ${op.operator_proof_url ? renderProofLink(op.operator_proof_url, op.operator_proof_thumbnail_url, 'Ver Comprobante Operador') : ''}
             ` : ''}
         `;
         
@@ -171,3 +182,89 @@ function confirmCancelOperation() {
         setTimeout(() => location.reload(), 1000);
     });
 }
+
+/**
+ * Badge de estado (mismo formato que la plantilla de listado)
+ */
+function operationStatusBadge(status) {
+    const badges = {
+        'Pendiente': '<span class="badge bg-warning text-dark">Pendiente</span>',
+        'En proceso': '<span class="badge bg-info">En Proceso</span>',
+        'Completada': '<span class="badge bg-success">Completada</span>'
+    };
+    return badges[status] || '<span class="badge bg-danger">Cancelado</span>';
+}
+
+/**
+ * Construir fila de la tabla de operaciones a partir del JSON de la API
+ */
+function buildOperationRow(op, userRole) {
+    const typeBadge = op.operation_type === 'Compra'
+        ? '<span class="badge bg-success">Compra</span>'
+        : '<span class="badge bg-primary">Venta</span>';
+
+    let actions = `
+        <button class="btn btn-outline-info" onclick="viewOperation(${op.id})" title="Ver Detalles">
+            <i class="bi bi-eye"></i>
+        </button>`;
+
+    if (op.status === 'Pendiente' || op.status === 'En proceso') {
+        actions += `
+        <button class="btn btn-outline-primary" onclick="updateStatus(${op.id})" title="Actualizar Estado">
+            <i class="bi bi-arrow-repeat"></i>
+        </button>
+        <button class="btn btn-outline-secondary" onclick="uploadProof(${op.id})" title="Subir Comprobante">
+            <i class="bi bi-upload"></i>
+        </button>`;
+        if (userRole === 'Master' || userRole === 'Trader') {
+            actions += `
+        <button class="btn btn-outline-danger" onclick="cancelOperation(${op.id})" title="Cancelar">
+            <i class="bi bi-x-circle"></i>
+        </button>`;
+        }
+    }
+
+    return [
+        `<strong>${escapeHtml(op.operation_id)}</strong>`,
+        escapeHtml(op.client_name),
+        typeBadge,
+        `$ ${parseFloat(op.amount_usd).toFixed(2)}`,
+        parseFloat(op.exchange_rate).toFixed(4),
+        `S/ ${parseFloat(op.amount_pen).toFixed(2)}`,
+        operationStatusBadge(op.status),
+        escapeHtml(op.user_name),
+        formatDate(op.created_at),
+        `<div class="btn-group btn-group-sm">${actions}</div>`
+    ];
+}
+
+/**
+ * Cargar la siguiente página de operaciones (paginación por cursor)
+ *
+ * El cursor se guarda en el atributo data-next-cursor del botón
+ * "Cargar más" y se reemplaza por el next_cursor de cada respuesta.
+ */
+function loadMoreOperations() {
+    const button = $('#loadMoreOperations');
+    const cursor = button.data('next-cursor');
+    if (!cursor) return;
+
+    button.prop('disabled', true);
+
+    const params = $.param({ after: cursor });
+    ajaxRequest(`/operations/api/list?${params}`, 'GET', null, function(response) {
+        const userRole = button.data('user-role');
+        const rows = response.operations.map(op => buildOperationRow(op, userRole));
+        window.operationsDataTable.rows.add(rows).draw(false);
+
+        if (response.next_cursor) {
+            button.data('next-cursor', response.next_cursor);
+            button.prop('disabled', false);
+        } else {
+            button.data('next-cursor', '');
+            button.hide();
+        }
+    }, function() {
+        button.prop('disabled', false);
+    });
+}
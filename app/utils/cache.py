@@ -0,0 +1,137 @@
+"""
+Caché en memoria para QoriCash Trading V2
+
+Caché por proceso con expiración (TTL) y protección single-flight: si
+varias peticiones piden la misma clave mientras se calcula, solo una
+ejecuta el cálculo y las demás esperan su resultado.
+"""
+import threading
+import time
+
+
+class _Flight:
+    """Cálculo en curso para una clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Caché thread-safe con TTL, single-flight e invalidación explícita"""
+
+    def __init__(self, maxsize=256):
+        """
+        Args:
+            maxsize: Número máximo de claves almacenadas
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (expires_at, value)
+        self._flights = {}   # key -> _Flight
+        self._generation = 0
+
+    def get(self, key):
+        """
+        Obtener valor vigente o None
+
+        Args:
+            key: Clave (hashable)
+
+        Returns:
+            Valor almacenado o None si no existe o expiró
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            return None
+
+    def set(self, key, value, ttl):
+        """
+        Guardar valor
+
+        Args:
+            key: Clave (hashable)
+            value: Valor a guardar
+            ttl: Segundos de vigencia
+        """
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_or_compute(self, key, compute, ttl):
+        """
+        Obtener valor o calcularlo una sola vez aunque haya llamadas concurrentes
+
+        Args:
+            key: Clave (hashable)
+            compute: Función sin argumentos que calcula el valor
+            ttl: Segundos de vigencia del valor calculado
+
+        Returns:
+            Valor cacheado o recién calculado
+
+        Raises:
+            Exception: La excepción de compute (también para los que esperaban)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                # No guardar un valor calculado antes de una invalidación
+                if flight.error is None and generation == self._generation:
+                    self._store(key, flight.value, ttl)
+            flight.done.set()
+
+        return flight.value
+
+    def invalidate(self, key=None):
+        """
+        Invalidar una clave o toda la caché
+
+        Args:
+            key: Clave a invalidar (None = todas)
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                self._entries.pop(key, None)
+                if key in self._flights:
+                    self._generation += 1
+
+    def _store(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            # Descartar primero las entradas expiradas y, si no basta, la más antigua
+            now = time.monotonic()
+            for expired in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[expired]
+            if len(self._entries) >= self.maxsize:
+                del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+        self._entries[key] = (time.monotonic() + ttl, value)
@@ -0,0 +1,234 @@
+"""
+Compresión de respuestas para QoriCash Trading V2
+
+- Respuestas dinámicas (APIs JSON): se comprimen en after_request con
+  brotli o gzip según Accept-Encoding, si superan COMPRESS_MIN_SIZE bytes
+  y su tipo está en COMPRESS_MIMETYPES. Nivel: COMPRESS_LEVEL (gzip) y
+  COMPRESS_BR_LEVEL (brotli). Las páginas HTML no se comprimen: llevan el
+  token CSRF junto a parámetros reflejados (búsqueda, filtros) y el tamaño
+  comprimido permitiría deducir el token (BREACH).
+- Archivos estáticos: se precomprimen (archivo.js.br / archivo.js.gz, al
+  nivel máximo) al iniciar la app o con scripts/precompress_static.py en
+  el build, y la vista static sirve la variante aceptada por el navegador.
+
+Cada representación comprimida lleva su propio ETag fuerte (sufijo
+-br / -gzip) y Vary: Accept-Encoding, como exige HTTP para cachés
+intermedios. Brotli es opcional (paquete Brotli); sin él solo se usa gzip.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import tempfile
+from flask import request, current_app, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Extensión de los archivos precomprimidos por codificación
+STATIC_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Archivos estáticos que vale la pena precomprimir
+STATIC_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.html', '.txt', '.map')
+
+
+def available_encodings():
+    """Codificaciones soportadas en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding():
+    """
+    Elegir la codificación según Accept-Encoding de la petición
+
+    Returns:
+        str: 'br', 'gzip' o None (sin compresión)
+    """
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    """
+    Comprimir bytes
+
+    Args:
+        data: Contenido
+        encoding: 'br' o 'gzip'
+        level: Nivel de compresión (gzip 1-9, brotli 0-11)
+
+    Returns:
+        bytes: Contenido comprimido
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def encoded_etags(etag):
+    """
+    Variantes de un ETag fuerte, una por codificación
+
+    Args:
+        etag: ETag sin comillas de la representación sin comprimir
+
+    Returns:
+        list: [etag, etag-br, etag-gzip]
+    """
+    return [etag] + [f'{etag}-{encoding}' for encoding in STATIC_SUFFIXES]
+
+
+def compress_response(response):
+    """after_request: comprimir respuestas dinámicas grandes"""
+    config = current_app.config
+    if not config['COMPRESS_ENABLED'] or response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or request.method == 'HEAD'
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    level = config['COMPRESS_BR_LEVEL'] if encoding == 'br' else config['COMPRESS_LEVEL']
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+
+    return response
+
+
+def send_static_file(filename):
+    """
+    Vista static: servir la variante precomprimida si el navegador la acepta
+
+    El ETag y el 304 los resuelve send_from_directory con el archivo
+    comprimido (mtime, tamaño y nombre propios), así que cada codificación
+    tiene su ETag.
+    """
+    app = current_app
+    encoding = negotiate_encoding() if app.config['COMPRESS_ENABLED'] else None
+
+    if encoding:
+        compressed = filename + STATIC_SUFFIXES[encoding]
+        path = safe_join(app.static_folder, compressed)
+        source = safe_join(app.static_folder, filename)
+        if (
+            path and source and os.path.isfile(path) and os.path.isfile(source)
+            and os.path.getmtime(path) >= os.path.getmtime(source)
+        ):
+            response = send_from_directory(
+                app.static_folder,
+                compressed,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                max_age=app.get_send_file_max_age(filename)
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+
+    response = app.send_static_file(filename)
+    if filename.endswith(STATIC_EXTENSIONS):
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def precompress_static(static_folder, min_size=0, force=False):
+    """
+    Generar .br y .gz de los archivos estáticos (nivel máximo)
+
+    Solo regenera las variantes que faltan o son más antiguas que el
+    original. Escribe a un temporal y renombra: varios workers pueden
+    ejecutarlo a la vez.
+
+    Args:
+        static_folder: Carpeta static de la app
+        min_size: Tamaño mínimo del original en bytes
+        force: Regenerar aunque la variante esté al día
+
+    Returns:
+        int: Número de archivos comprimidos generados
+    """
+    generated = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+
+            source = os.path.join(root, name)
+            source_mtime = os.path.getmtime(source)
+            if os.path.getsize(source) < min_size:
+                continue
+
+            data = None
+            for encoding in available_encodings():
+                target = source + STATIC_SUFFIXES[encoding]
+                if not force and os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+                    continue
+
+                if data is None:
+                    with open(source, 'rb') as f:
+                        data = f.read()
+
+                fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f'.{name}.')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(compress(data, encoding, 11 if encoding == 'br' else 9))
+                    os.replace(tmp_path, target)
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                    raise
+                generated += 1
+
+    return generated
+
+
+def init_compression(app):
+    """
+    Registrar la compresión en la app
+
+    Args:
+        app: Aplicación Flask
+    """
+    app.after_request(compress_response)
+
+    if not app.config['COMPRESS_ENABLED'] or not app.static_folder:
+        return
+
+    app.view_functions['static'] = send_static_file
+
+    if app.config['COMPRESS_STATIC_ON_STARTUP']:
+        try:
+            generated = precompress_static(app.static_folder, app.config['COMPRESS_MIN_SIZE'])
+            if generated:
+                logger.info(f"Archivos estáticos precomprimidos: {generated}")
+        except OSError as e:
+            # Carpeta de solo lectura: usar scripts/precompress_static.py en el build
+            logger.warning(f"No se pudieron precomprimir los archivos estáticos: {e}")
@@ -40,6 +40,9 @@ OPERATION_STATUSES = [
     OPERATION_STATUS_CANCELED
 ]
 
+# Estados de operación que ve el Operador (su listado y su feed de cambios)
+OPERATOR_OPERATION_STATUSES = [OPERATION_STATUS_PENDING, OPERATION_STATUS_IN_PROCESS]
+
 # Acciones de auditoría
 AUDIT_CREATE_USER = 'CREATE_USER'
 AUDIT_UPDATE_USER = 'UPDATE_USER'
@@ -69,3 +72,18 @@ DATETIME_FORMAT_DISPLAY = '%d/%m/%Y %H:%M'
 # Paginación
 DEFAULT_PAGE_SIZE = 50
 MAX_PAGE_SIZE = 100
+
+# Búsqueda de clientes (máximo de resultados)
+CLIENT_SEARCH_LIMIT = 20
+
+# Estadísticas masivas de clientes (máximo de IDs por petición)
+CLIENT_STATS_MAX_IDS = 500
+
+# Exportaciones (filas leídas por lote con cursor del servidor)
+EXPORT_BATCH_SIZE = 500
+
+# Feed de cambios (máximo de filas en una petición de catch-up)
+CHANGE_FEED_MAX_CHANGES = 500
+
+# Feed de cambios: segundos que el catch-up repite hacia atrás (commits fuera de orden)
+CHANGE_FEED_GRACE_SECONDS = 30
@@ -1,9 +1,11 @@
 """
 Decoradores personalizados para QoriCash Trading V2
 """
+import hashlib
 from functools import wraps
-from flask import flash, redirect, url_for, jsonify, request
+from flask import flash, redirect, url_for, jsonify, request, current_app
 from flask_login import current_user
+from app.utils.compression import encoded_etags
 
 
 def require_role(*roles):
@@ -75,3 +77,48 @@ def ajax_required(f):
             return jsonify({'error': 'Se requiere petición AJAX'}), 400
         return f(*args, **kwargs)
     return decorated_function
+
+
+def conditional_get(version):
+    """
+    Decorador de GET condicional (ETag / If-None-Match)
+
+    El ETag se deriva de un token de versión barato (p.ej. la secuencia del
+    feed de cambios), del usuario y de la URL con sus parámetros. Si el
+    navegador envía If-None-Match con ese ETag se responde 304 sin ejecutar
+    la vista (ni la consulta ni la serialización).
+
+    El token se lee ANTES de la vista: si los datos cambian mientras se
+    consultan, el token de la siguiente petición ya es otro.
+
+    Args:
+        version: Función sin argumentos que devuelve el token (hashable/repr estable)
+
+    Usage:
+        @conditional_get(ChangeFeedService.get_data_version)
+        def api_list():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            token = repr((version(), current_user.get_id(), current_user.role, request.full_path))
+            etag = hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+            # La respuesta pudo llegar comprimida con ETag "<etag>-br" / "<etag>-gzip"
+            matched = next((tag for tag in encoded_etags(etag) if request.if_none_match.contains(tag)), None)
+            if matched:
+                response = current_app.response_class(status=304)
+                etag = matched
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            # Siempre revalidar: el navegador guarda la respuesta y reenvía el ETag
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,112 @@
+"""
+Normalización de imágenes para QoriCash Trading V2
+
+Los comprobantes llegan como fotos de celular (varios MB, miles de píxeles
+y con EXIF: ubicación, modelo del equipo). Antes de guardarlos:
+
+1. Se aplica la orientación EXIF y se descarta el resto de metadatos.
+2. Se reduce a IMAGE_MAX_DIMENSION px por lado y se recomprime en JPEG
+   (IMAGE_QUALITY, progresivo).
+3. Se genera una miniatura de IMAGE_THUMBNAIL_SIZE px para los listados.
+
+Los PDF y los archivos que no son imagen se guardan sin cambios. Requiere
+Pillow; sin él las imágenes también se guardan tal cual y sin miniatura.
+"""
+import io
+import logging
+import os
+from werkzeug.datastructures import FileStorage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Extensiones que se procesan (el resto se guarda sin cambios)
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png')
+
+# Límite de píxeles al decodificar (protege contra imágenes "bomba")
+MAX_IMAGE_PIXELS = 50_000_000
+
+
+def is_processable(filename):
+    """
+    Verificar si el archivo es una imagen que se puede normalizar
+
+    Args:
+        filename: Nombre del archivo
+
+    Returns:
+        bool: True si Pillow está disponible y la extensión es de imagen
+    """
+    return Image is not None and '.' in (filename or '') and \
+        filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _to_jpeg(image, quality):
+    """Codificar en JPEG sin metadatos"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    buffer.seek(0)
+    return buffer
+
+
+def normalize_image(file, max_dimension, quality, thumbnail_size=None, thumbnail_quality=75):
+    """
+    Normalizar una imagen y generar su miniatura
+
+    Args:
+        file: FileStorage con la imagen original
+        max_dimension: Máximo de píxeles por lado
+        quality: Calidad JPEG (1-95)
+        thumbnail_size: Píxeles por lado de la miniatura (None = sin miniatura)
+        thumbnail_quality: Calidad JPEG de la miniatura
+
+    Returns:
+        tuple: (imagen: FileStorage, miniatura: FileStorage|None), ambas JPEG
+
+    Raises:
+        ValueError: Si el archivo no es una imagen válida
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    base_name = os.path.splitext(file.filename or 'imagen')[0]
+
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        # JPEG: decodificar directamente a una escala reducida (más rápido, menos memoria)
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f'Imagen inválida: {e}')
+
+    # Transparencia sobre fondo blanco (JPEG no tiene canal alfa)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # Sin copiar image.info: el EXIF (y el resto de metadatos) no se escribe
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    normalized = FileStorage(
+        _to_jpeg(image, quality),
+        filename=f'{base_name}.jpg',
+        content_type='image/jpeg'
+    )
+
+    thumbnail = None
+    if thumbnail_size:
+        small = image.copy()
+        small.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumbnail = FileStorage(
+            _to_jpeg(small, thumbnail_quality),
+            filename=f'{base_name}_thumb.jpg',
+            content_type='image/jpeg'
+        )
+
+    return normalized, thumbnail
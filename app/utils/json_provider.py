@@ -0,0 +1,126 @@
+"""
+Proveedor JSON de Flask para QoriCash Trading V2
+
+Los to_dict de los modelos devuelven los valores nativos de las columnas
+(Decimal, datetime) y este proveedor los serializa al codificar la
+respuesta, en lugar de convertir campo por campo en Python:
+
+- Decimal: número JSON exacto (el texto del Decimal, sin pasar por float)
+- datetime/date: ISO 8601 (igual que isoformat())
+
+Con orjson (recomendado) la codificación se hace en C; sin él se usa el
+encoder estándar con las mismas reglas (Decimal como float). Lo usan
+jsonify y current_app.json; los eventos de SocketIO usan SocketIOJSON, que
+aplica las mismas reglas sin depender del contexto de la aplicación.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Tipos que el encoder estándar no serializa por sí mismo"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Objeto de tipo {type(obj).__name__} no serializable a JSON')
+
+
+# orjson >= 3.9 inserta texto JSON tal cual (Fragment): Decimal exacto
+_Fragment = getattr(orjson, 'Fragment', None)
+
+
+def _orjson_default(obj):
+    """Tipos que orjson no serializa nativamente"""
+    if isinstance(obj, decimal.Decimal):
+        if not obj.is_finite():
+            return None
+        return _Fragment(str(obj)) if _Fragment else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Objeto de tipo {type(obj).__name__} no serializable a JSON')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider con Decimal y fechas en ISO 8601 (encoder estándar)"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(JSONProvider):
+    """Proveedor JSON sobre orjson"""
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serializar a str
+
+        Los kwargs del módulo json (separators, indent, ...) se ignoran salvo
+        sort_keys; la salida es siempre compacta.
+        """
+        return self._dumps(obj, kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """jsonify: los bytes de orjson van directo al cuerpo de la respuesta"""
+        obj = self._prepare_response_obj(args, kwargs)
+        # Legible en desarrollo, como DefaultJSONProvider
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self._dumps(obj, self.sort_keys, indent)
+        return self._app.response_class(body + b'\n' if indent else body, mimetype=self.mimetype)
+
+    @staticmethod
+    def _dumps(obj, sort_keys, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_orjson_default, option=option)
+
+
+class SocketIOJSON:
+    """
+    Módulo json para SocketIO (json=SocketIOJSON)
+
+    Con SOCKETIO_MESSAGE_QUEUE los paquetes se codifican en el hilo que
+    escucha la cola, sin contexto de aplicación: flask.json caería al
+    encoder estándar (Decimal como texto, fechas HTTP). Esta clase codifica
+    directamente con las reglas del proveedor, en cualquier hilo.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        """Serializar a str compacto (los kwargs del módulo json se ignoran)"""
+        if orjson is not None:
+            return OrjsonProvider._dumps(obj, sort_keys=False).decode('utf-8')
+        return json.dumps(obj, default=_default, separators=(',', ':'))
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+def get_json_provider_class():
+    """Clase de proveedor disponible (orjson si está instalado)"""
+    return OrjsonProvider if orjson is not None else JSONProvider
@@ -0,0 +1,106 @@
+"""
+Paginación por cursor (keyset) para QoriCash Trading V2
+
+El cursor codifica la última fila entregada como (created_at, id). La
+siguiente página se obtiene filtrando las filas estrictamente "anteriores"
+a ese par, de modo que el costo de cada página no depende de su posición.
+"""
+import base64
+from datetime import datetime
+from sqlalchemy import or_, and_
+from app.utils.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+def encode_cursor(created_at, record_id):
+    """
+    Codificar cursor opaco a partir de la última fila de una página
+
+    Args:
+        created_at: Datetime de la fila
+        record_id: ID numérico de la fila
+
+    Returns:
+        str: Cursor url-safe (ej: 'MjAyNS0wMS0wMVQxMDowMDowMHw0Mg')
+    """
+    raw = f'{created_at.isoformat()}|{record_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodificar cursor generado por encode_cursor
+
+    Args:
+        cursor: Cursor recibido del cliente
+
+    Returns:
+        tuple: (created_at: datetime, record_id: int)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_at_str, record_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at_str), int(record_id)
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+
+
+def parse_limit(limit):
+    """
+    Normalizar tamaño de página
+
+    Args:
+        limit: Valor recibido (puede ser None)
+
+    Returns:
+        int: Tamaño entre 1 y MAX_PAGE_SIZE
+    """
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, created_at_column, id_column, limit, after=None):
+    """
+    Aplicar paginación keyset descendente sobre (created_at, id)
+
+    Args:
+        query: Query de SQLAlchemy ya filtrada
+        created_at_column: Columna de fecha de creación
+        id_column: Columna de ID (desempate)
+        limit: Tamaño de página
+        after: Cursor de la página anterior (opcional)
+
+    Returns:
+        tuple: (rows: list, next_cursor: str|None)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    limit = parse_limit(limit)
+
+    if after:
+        last_created_at, last_id = decode_cursor(after)
+        query = query.filter(
+            or_(
+                created_at_column < last_created_at,
+                and_(created_at_column == last_created_at, id_column < last_id)
+            )
+        )
+
+    # Pedir una fila extra para saber si hay más páginas
+    rows = query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, created_at_column.key),
+            getattr(last, id_column.key)
+        )
+
+    return rows, next_cursor
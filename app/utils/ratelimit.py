@@ -0,0 +1,188 @@
+"""
+Rate limiting compartido para QoriCash Trading V2
+
+Con storage "memory://" cada worker de gunicorn lleva sus propios contadores:
+el límite efectivo se multiplica por WEB_CONCURRENCY y se reinicia en cada
+reciclaje (max_requests). SQLiteStorage guarda los contadores en un archivo
+SQLite (modo WAL) compartido por todos los workers de la máquina, con soporte
+de ventana deslizante (moving-window) y ventana fija.
+
+Se registra en limits con el esquema "sqlite":
+    RATELIMIT_STORAGE_URI=sqlite:////dev/shm/qoricash_ratelimit.db
+
+Para varias máquinas usar un servidor con protocolo Redis (redis://...,
+requiere el paquete redis); en tests, memory://.
+"""
+import os
+import sqlite3
+import threading
+import time
+from flask_limiter.util import get_remote_address
+from flask_login import current_user
+from limits.storage import Storage, MovingWindowSupport
+
+
+def rate_limit_key():
+    """
+    Clave de rate limiting: el usuario si está autenticado, si no la IP
+
+    Así los usuarios detrás de la misma IP (oficina) no comparten cupo y un
+    usuario no lo multiplica cambiando de red.
+
+    Returns:
+        str: 'user:<id>' o la IP remota
+    """
+    if current_user and current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return get_remote_address()
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Storage de limits sobre un archivo SQLite compartido entre procesos"""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        """
+        Args:
+            uri: sqlite:////ruta/absoluta.db (o sqlite:///ruta/relativa.db)
+            wrap_exceptions: Envolver errores en limits.errors.StorageError
+            options: timeout (segundos de espera por el lock, por defecto 5)
+        """
+        self.path = uri[len('sqlite:///'):] if uri.startswith('sqlite:///') else uri[len('sqlite://'):]
+        self.timeout = float(options.get('timeout', 5))
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_counters '
+                '(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_hits (key TEXT NOT NULL, hit_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_rate_limit_hits_key_hit_at ON rate_limit_hits (key, hit_at)'
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self):
+        """Conexión por hilo y por proceso (no se comparte tras un fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Los contadores no necesitan sobrevivir a un corte de energía
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        """Transacción con lock de escritura desde el inicio (evita carreras entre workers)"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        return conn
+
+    # Ventana fija
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        conn = self._transaction()
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM rate_limit_counters WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                value, expires_at = amount, now + expiry
+            else:
+                value = row[0] + amount
+                expires_at = now + expiry if elastic_expiry else row[1]
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_counters (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, expires_at)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connect().execute(
+            'SELECT expires_at FROM rate_limit_counters WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    # Ventana deslizante
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+
+        now = time.time()
+        conn = self._transaction()
+        try:
+            conn.execute('DELETE FROM rate_limit_hits WHERE key = ? AND hit_at <= ?', (key, now - expiry))
+            count = conn.execute('SELECT COUNT(*) FROM rate_limit_hits WHERE key = ?', (key,)).fetchone()[0]
+            acquired = count + amount <= limit
+            if acquired:
+                conn.executemany(
+                    'INSERT INTO rate_limit_hits (key, hit_at) VALUES (?, ?)', [(key, now)] * amount
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return acquired
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        oldest, count = self._connect().execute(
+            'SELECT MIN(hit_at), COUNT(*) FROM rate_limit_hits WHERE key = ? AND hit_at > ?',
+            (key, now - expiry)
+        ).fetchone()
+        return (oldest if oldest is not None else now), count
+
+    # Mantenimiento
+
+    def check(self):
+        try:
+            self._connect().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self._transaction()
+        try:
+            cleared = conn.execute('DELETE FROM rate_limit_counters').rowcount
+            cleared += conn.execute('DELETE FROM rate_limit_hits').rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cleared
+
+    def clear(self, key):
+        conn = self._transaction()
+        try:
+            conn.execute('DELETE FROM rate_limit_counters WHERE key = ?', (key,))
+            conn.execute('DELETE FROM rate_limit_hits WHERE key = ?', (key,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
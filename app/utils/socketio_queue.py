@@ -0,0 +1,160 @@
+"""
+Cola de mensajes de SocketIO para QoriCash Trading V2
+
+Con varios workers cada proceso solo conoce a los navegadores conectados a
+él: un evento emitido en un worker no llega a los clientes de otro. La cola
+de mensajes (SOCKETIO_MESSAGE_QUEUE) reparte cada emit entre todos los
+procesos:
+
+    redis://host:6379/0      Servidor Redis (varias máquinas, paquete redis)
+    amqp://...               RabbitMQ vía kombu
+    unix:///dev/shm/qc_sio   Sockets unix de datagramas en un directorio
+                             (una sola máquina, sin servicios externos)
+
+UnixSocketManager es el respaldo local: cada proceso que atiende clientes
+abre un socket <directorio>/<canal>-<host_id>.sock y cada emit se envía a
+todos los sockets del directorio. Sirve también como stand-in en tests
+multi-proceso.
+
+El directorio debe ser del usuario del servidor y con modo 0700 (si no, el
+proceso no arranca): quien pueda crear sockets ahí recibiría todos los
+eventos. Los mensajes van en JSON (SocketIOJSON), nunca en pickle.
+"""
+import atexit
+import glob
+import logging
+import os
+import socket
+import stat
+from socketio import PubSubManager
+from app.utils.json_provider import SocketIOJSON
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo de un evento (los datagramas unix no se fragmentan)
+MAX_DATAGRAM_SIZE = 1024 * 1024
+
+
+class UnixSocketManager(PubSubManager):
+    """Client manager de SocketIO sobre sockets unix de datagramas"""
+
+    name = 'unix'
+
+    def __init__(self, url='unix:///tmp/qoricash_socketio', channel='socketio',
+                 write_only=False, logger=None, send_timeout=1.0):
+        """
+        Args:
+            url: unix://<directorio compartido por los procesos>
+            channel: Canal (prefijo de los sockets)
+            write_only: Solo emitir (procesos sin clientes conectados)
+            logger: Logger de python-socketio
+            send_timeout: Segundos máximos de espera si un receptor está saturado
+        """
+        if not url.startswith('unix://'):
+            raise ValueError(f'URL de cola inválida: {url}')
+        self.directory = url[len('unix://'):]
+        self.send_timeout = send_timeout
+        self._sender = None
+        self._receiver = None
+        self._path = None
+        self._ensure_private_directory()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _ensure_private_directory(self):
+        """
+        Crear el directorio y verificar que solo el usuario del servidor lo controla
+
+        /tmp y /dev/shm son de escritura para todos: otro usuario podría
+        crear el directorio antes y escuchar o inyectar eventos.
+
+        Raises:
+            RuntimeError: Si no es un directorio propio con modo 0700
+        """
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        info = os.lstat(self.directory)
+        if not stat.S_ISDIR(info.st_mode):
+            raise RuntimeError(f'La cola SocketIO {self.directory} no es un directorio')
+        if info.st_uid != os.getuid():
+            raise RuntimeError(f'La cola SocketIO {self.directory} pertenece a otro usuario (uid {info.st_uid})')
+        if stat.S_IMODE(info.st_mode) != 0o700:
+            raise RuntimeError(
+                f'La cola SocketIO {self.directory} tiene modo {oct(stat.S_IMODE(info.st_mode))} (se requiere 0o700)'
+            )
+
+    def _socket_path(self, host_id):
+        return os.path.join(self.directory, f'{self.channel}-{host_id}.sock')
+
+    def initialize(self):
+        if not self.write_only:
+            self._path = self._socket_path(self.host_id)
+            self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MAX_DATAGRAM_SIZE * 4)
+            self._receiver.bind(self._path)
+            atexit.register(self._cleanup)
+        super().initialize()
+
+    def _cleanup(self):
+        """Eliminar el socket propio al terminar el proceso"""
+        if self._path and os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def _publish(self, data):
+        try:
+            payload = SocketIOJSON.dumps(data).encode('utf-8')
+        except TypeError as e:
+            logger.error(f"Evento SocketIO no serializable a JSON descartado: {e}")
+            return
+        if len(payload) > MAX_DATAGRAM_SIZE:
+            logger.error(f"Evento SocketIO de {len(payload)} bytes descartado (máximo {MAX_DATAGRAM_SIZE})")
+            return
+
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, MAX_DATAGRAM_SIZE * 2)
+            self._sender.settimeout(self.send_timeout)
+
+        for path in glob.glob(self._socket_path('*')):
+            if path == self._path:
+                continue
+            try:
+                self._sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de un proceso que ya terminó
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except socket.timeout:
+                logger.warning(f"Receptor SocketIO saturado, evento no entregado: {path}")
+
+    def _listen(self):
+        # Se entregan dicts ya decodificados: PubSubManager no llega a aplicar pickle
+        while True:
+            data, _ = self._receiver.recvfrom(MAX_DATAGRAM_SIZE)
+            try:
+                message = SocketIOJSON.loads(data)
+            except (ValueError, UnicodeDecodeError):
+                logger.warning("Mensaje inválido en la cola SocketIO descartado")
+                continue
+            if isinstance(message, dict):
+                yield message
+
+
+def message_queue_options(url, channel, write_only=False):
+    """
+    Opciones de socketio.init_app para SOCKETIO_MESSAGE_QUEUE
+
+    Args:
+        url: URL de la cola (None = sin cola, un solo proceso)
+        channel: Canal compartido por los procesos
+        write_only: Solo emitir
+
+    Returns:
+        dict: kwargs para socketio.init_app (client_manager o message_queue)
+    """
+    if not url:
+        return {'client_manager': None}  # Manager en memoria del propio proceso
+    if url.startswith('unix://'):
+        return {'client_manager': UnixSocketManager(url, channel=channel, write_only=write_only)}
+    # redis://, kafka://, amqp:// los resuelve Flask-SocketIO
+    return {'message_queue': url, 'channel': channel}
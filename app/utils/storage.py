@@ -0,0 +1,429 @@
+"""
+Backends de almacenamiento de archivos para QoriCash Trading V2
+
+FileService guarda los archivos a través de un backend (STORAGE_BACKEND):
+
+    cloudinary   Cloudinary (CLOUDINARY_*)
+    local        Carpeta local (LOCAL_STORAGE_DIR), servida por /files/<clave>
+                 a usuarios autenticados; desarrollo y tests sin red
+    s3           Bucket S3 o compatible: MinIO, R2, ... (S3_*, paquete boto3)
+    auto         cloudinary si hay credenciales, si no local (por defecto)
+
+Los archivos se direccionan por contenido: la clave es
+<carpeta>/<sha256>.<ext>, así que un mismo documento subido varias veces se
+guarda una sola vez. save() indica si creó el archivo o reutilizó uno
+existente; solo los creados se pueden eliminar al revertir una subida.
+La creación es condicional en cada backend (enlace exclusivo, If-None-Match,
+overwrite=False): si dos subidas del mismo contenido coinciden, solo la que
+escribió el archivo recibe created=True.
+
+Como un archivo puede estar referenciado por varios registros, los
+requests nunca lo eliminan: iter_files() y key_for() permiten al barrido
+(FileService.collect_garbage) encontrar los que ya nadie referencia.
+
+Los backends se construyen con los valores de configuración y no usan
+current_app: se pueden usar desde los hilos del pool de subidas.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+import cloudinary.utils
+from werkzeug.utils import secure_filename
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de lectura para calcular el hash
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Valores de ejemplo de .env.example (credenciales no configuradas)
+PLACEHOLDER_VALUES = ('your-cloud-name', 'your-api-key', 'your-api-secret')
+
+
+def content_key(file, folder, filename):
+    """
+    Clave direccionada por contenido: <carpeta>/<sha256>.<ext>
+
+    Args:
+        file: FileStorage u objeto tipo archivo (queda al inicio)
+        folder: Carpeta lógica ('dni', 'ruc', 'operations/payment_proofs', ...)
+        filename: Nombre original (solo se usa la extensión)
+
+    Returns:
+        str: Clave del archivo
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+
+    filename = secure_filename(filename or '')
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    return f"{folder.strip('/')}/{digest.hexdigest()}" + (f'.{ext}' if ext else '')
+
+
+class StorageBackend:
+    """Interfaz de backend de almacenamiento"""
+
+    name = None
+    configured = True
+
+    def save(self, file, folder, filename, content_type=None, timeout=None):
+        """
+        Guardar un archivo (si el contenido ya existe, no se vuelve a subir)
+
+        Args:
+            file: FileStorage u objeto tipo archivo
+            folder: Carpeta lógica
+            filename: Nombre original (extensión)
+            content_type: Tipo MIME (opcional)
+            timeout: Segundos máximos de la operación de red (opcional)
+
+        Returns:
+            tuple: (url: str, created: bool)
+        """
+        key = content_key(file, folder, filename)
+        url = self.find(key, timeout=timeout)
+        if url:
+            return url, False
+        return self.put(file, key, content_type=content_type, timeout=timeout)
+
+    def find(self, key, timeout=None):
+        """URL del archivo si ya existe, o None"""
+        raise NotImplementedError
+
+    def put(self, file, key, content_type=None, timeout=None):
+        """
+        Escribir el archivo en la clave solo si no existe (atómico)
+
+        Returns:
+            tuple: (url: str, created: bool); created=False si otra subida
+                   lo escribió primero
+        """
+        raise NotImplementedError
+
+    def delete(self, url):
+        """
+        Eliminar el archivo de una URL de este backend
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        raise NotImplementedError
+
+    def key_for(self, url):
+        """Clave del archivo de una URL de este backend (None si no es de este backend)"""
+        raise NotImplementedError
+
+    def iter_files(self, folder):
+        """
+        Recorrer los archivos guardados bajo una carpeta
+
+        Yields:
+            tuple: (clave, url, modificado: datetime UTC sin tzinfo)
+        """
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    """Cloudinary: public_id = clave sin extensión (resource_type auto)"""
+
+    name = 'cloudinary'
+
+    # URL de Cloudinary: .../<resource_type>/upload/[v<versión>/]<public_id>.<ext>
+    URL_PATTERN = re.compile(r'/(image|video|raw)/upload/(?:v\d+/)?(.+)$')
+
+    def __init__(self, cloud_name, api_key, api_secret):
+        self.configured = all(
+            value and value not in PLACEHOLDER_VALUES for value in (cloud_name, api_key, api_secret)
+        )
+        if self.configured:
+            cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+
+    def find(self, key, timeout=None):
+        # HEAD a la URL pública (CDN): sin consumir cuota de la Admin API.
+        # jpg/png/pdf se suben como resource_type 'image'.
+        public_id, _, ext = key.rpartition('.')
+        url = cloudinary.utils.cloudinary_url(public_id, resource_type='image', format=ext, secure=True)[0]
+        try:
+            request = urllib.request.Request(url, method='HEAD')
+            with urllib.request.urlopen(request, timeout=timeout or 10) as response:
+                return url if response.status == 200 else None
+        except (urllib.error.URLError, OSError):
+            return None
+
+    def put(self, file, key, content_type=None, timeout=None):
+        options = {'timeout': timeout} if timeout else {}
+        result = cloudinary.uploader.upload(
+            file,
+            public_id=key.rsplit('.', 1)[0],
+            resource_type='auto',
+            overwrite=False,
+            **options
+        )
+        # Con overwrite=False, si el public_id ya existe Cloudinary no lo
+        # reemplaza y responde existing=True
+        return result.get('secure_url'), not result.get('existing', False)
+
+    def _parse_url(self, url):
+        """(resource_type, public_id) de una URL de Cloudinary, o None"""
+        match = self.URL_PATTERN.search(url or '')
+        if not match:
+            return None
+        resource_type, public_id = match.groups()
+        if resource_type != 'raw':
+            public_id = public_id.rsplit('.', 1)[0]  # Remover extensión (raw la conserva)
+        return resource_type, public_id
+
+    def delete(self, url):
+        parsed = self._parse_url(url)
+        if not parsed:
+            return False, 'URL de Cloudinary no reconocida'
+        resource_type, public_id = parsed
+
+        result = cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+        if result.get('result') == 'ok':
+            return True, 'Archivo eliminado exitosamente'
+        return False, 'No se pudo eliminar el archivo'
+
+    def key_for(self, url):
+        parsed = self._parse_url(url)
+        return parsed[1] if parsed else None
+
+    def iter_files(self, folder):
+        # Admin API (paginada); la clave es el public_id, como en key_for
+        for resource_type in ('image', 'raw'):
+            cursor = None
+            while True:
+                options = {'next_cursor': cursor} if cursor else {}
+                result = cloudinary.api.resources(
+                    type='upload', resource_type=resource_type, prefix=f'{folder}/', max_results=500, **options
+                )
+                for resource in result.get('resources', []):
+                    modified = datetime.fromisoformat(resource['created_at'].replace('Z', '+00:00'))
+                    yield (resource['public_id'], resource['secure_url'],
+                           modified.astimezone(timezone.utc).replace(tzinfo=None))
+                cursor = result.get('next_cursor')
+                if not cursor:
+                    break
+
+
+class LocalStorage(StorageBackend):
+    """Carpeta local; las URLs son <url_prefix>/<clave>"""
+
+    name = 'local'
+
+    def __init__(self, directory, url_prefix='/files'):
+        self.directory = os.path.abspath(directory)
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        """Ruta absoluta de una clave (None si sale de la carpeta)"""
+        path = os.path.abspath(os.path.join(self.directory, key))
+        return path if path.startswith(self.directory + os.sep) else None
+
+    def find(self, key, timeout=None):
+        path = self.path_for(key)
+        return f'{self.url_prefix}/{key}' if path and os.path.isfile(path) else None
+
+    def put(self, file, key, content_type=None, timeout=None):
+        path = self.path_for(key)
+        if path is None:
+            raise ValueError(f'Clave inválida: {key}')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Temporal + enlace exclusivo: nadie ve un archivo a medias y, si dos
+        # subidas del mismo contenido coinciden, solo una lo crea
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                file.seek(0)
+                for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                    f.write(chunk)
+            try:
+                os.link(tmp_path, path)
+                created = True
+            except FileExistsError:
+                created = False
+        finally:
+            os.unlink(tmp_path)
+        return f'{self.url_prefix}/{key}', created
+
+    def delete(self, url):
+        key = self.key_for(url)
+        path = self.path_for(key) if key else None
+        if path and os.path.isfile(path):
+            os.unlink(path)
+            return True, 'Archivo eliminado exitosamente'
+        return False, 'No se pudo eliminar el archivo'
+
+    def key_for(self, url):
+        if not url or not url.startswith(self.url_prefix + '/'):
+            return None
+        return url[len(self.url_prefix) + 1:]
+
+    def iter_files(self, folder):
+        root = self.path_for(folder)
+        if root is None:
+            return
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.startswith('.upload-'):
+                    continue  # Temporal de una subida en curso
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                modified = datetime.utcfromtimestamp(os.path.getmtime(path))
+                yield key, f'{self.url_prefix}/{key}', modified
+
+
+class S3Storage(StorageBackend):
+    """Bucket S3 o compatible; las URLs son <public_url>/<clave>"""
+
+    name = 's3'
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key_id=None,
+                 secret_access_key=None, public_url=None, client=None):
+        """
+        Args:
+            bucket: Nombre del bucket
+            endpoint_url: Endpoint de un servicio compatible (MinIO, R2, ...)
+            region: Región
+            access_key_id: Credencial (por defecto la cadena estándar de boto3)
+            secret_access_key: Credencial
+            public_url: URL base de los objetos (por defecto <endpoint>/<bucket>)
+            client: Cliente S3 ya construido (tests, stand-ins locales)
+        """
+        self.bucket = bucket
+        self.configured = bool(bucket) and (client is not None or boto3 is not None)
+        self.client = client
+        if self.client is None and self.configured:
+            self.client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url or None,
+                region_name=region or None,
+                aws_access_key_id=access_key_id or None,
+                aws_secret_access_key=secret_access_key or None
+            )
+        if not public_url:
+            if endpoint_url:
+                public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+            else:
+                public_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com"
+        self.public_url = public_url.rstrip('/')
+
+    @staticmethod
+    def _error_code(error):
+        response = getattr(error, 'response', None) or {}
+        return str(response.get('Error', {}).get('Code'))
+
+    @staticmethod
+    def _is_not_found(error):
+        return S3Storage._error_code(error) in ('404', 'NoSuchKey', 'NotFound')
+
+    def find(self, key, timeout=None):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return f'{self.public_url}/{key}'
+
+    def put(self, file, key, content_type=None, timeout=None):
+        file.seek(0)
+        extra = {'ContentType': content_type} if content_type else {}
+        try:
+            # Escritura condicional: falla si el objeto ya existe
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=file.read(), IfNoneMatch='*', **extra)
+        except Exception as e:
+            code = self._error_code(e)
+            if code == 'PreconditionFailed':
+                return f'{self.public_url}/{key}', False
+            # Escritura concurrente en curso: cuenta como existente solo si ya terminó
+            if code == 'ConditionalRequestConflict' and self.find(key, timeout=timeout):
+                return f'{self.public_url}/{key}', False
+            raise
+        return f'{self.public_url}/{key}', True
+
+    def delete(self, url):
+        key = self.key_for(url)
+        if not key:
+            return False, 'URL de S3 no reconocida'
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return True, 'Archivo eliminado exitosamente'
+
+    def key_for(self, url):
+        if not url or not url.startswith(self.public_url + '/'):
+            return None
+        return url[len(self.public_url) + 1:]
+
+    def iter_files(self, folder):
+        token = None
+        while True:
+            options = {'ContinuationToken': token} if token else {}
+            result = self.client.list_objects_v2(Bucket=self.bucket, Prefix=f'{folder}/', **options)
+            for obj in result.get('Contents', []):
+                modified = obj['LastModified']
+                if modified.tzinfo is not None:
+                    modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+                yield obj['Key'], f"{self.public_url}/{obj['Key']}", modified
+            if not result.get('IsTruncated'):
+                break
+            token = result.get('NextContinuationToken')
+
+
+def create_storage_backend(config):
+    """
+    Construir el backend según STORAGE_BACKEND
+
+    Args:
+        config: app.config
+
+    Returns:
+        StorageBackend
+
+    Raises:
+        ValueError: Si STORAGE_BACKEND no es válido
+    """
+    name = (config.get('STORAGE_BACKEND') or 'auto').lower()
+
+    if name in ('cloudinary', 'auto'):
+        backend = CloudinaryStorage(
+            config.get('CLOUDINARY_CLOUD_NAME'),
+            config.get('CLOUDINARY_API_KEY'),
+            config.get('CLOUDINARY_API_SECRET')
+        )
+        if backend.configured or name == 'cloudinary':
+            return backend
+        name = 'local'
+
+    if name == 'local':
+        return LocalStorage(config['LOCAL_STORAGE_DIR'], config.get('LOCAL_STORAGE_URL_PREFIX', '/files'))
+
+    if name == 's3':
+        if boto3 is None:
+            logger.error("STORAGE_BACKEND=s3 requiere el paquete boto3")
+        return S3Storage(
+            config.get('S3_BUCKET'),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            secret_access_key=config.get('S3_SECRET_ACCESS_KEY'),
+            public_url=config.get('S3_PUBLIC_URL')
+        )
+
+    raise ValueError(f'STORAGE_BACKEND inválido: {name}')
@@ -0,0 +1,27 @@
+# coding: utf-8
+"""Índices compuestos para paginación keyset de operaciones
+
+Revision ID: a3f1c2d4e5b6
+Revises: 5fde901bfcaa
+Create Date: 2026-10-17 09:12:41.218734
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c2d4e5b6'
+down_revision = '5fde901bfcaa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_operations_created_at_id', 'operations', ['created_at', 'id'], unique=False)
+    op.create_index('ix_operations_status_created_at_id', 'operations', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_operations_client_created_at_id', 'operations', ['client_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_operations_client_created_at_id', table_name='operations')
+    op.drop_index('ix_operations_status_created_at_id', table_name='operations')
+    op.drop_index('ix_operations_created_at_id', table_name='operations')
@@ -0,0 +1,38 @@
+# coding: utf-8
+"""Rollup diario de operaciones (operation_daily_stats)
+
+Revision ID: b7e2d9a1c4f3
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-17 11:03:27.559120
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d9a1c4f3'
+down_revision = 'a3f1c2d4e5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('operation_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('operation_type', sa.String(length=20), nullable=False),
+    sa.Column('operation_count', sa.Integer(), nullable=False),
+    sa.Column('total_usd', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('total_pen', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('client_counts_json', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'status', 'operation_type', name='uq_operation_daily_stats_bucket')
+    )
+    op.create_index(op.f('ix_operation_daily_stats_day'), 'operation_daily_stats', ['day'], unique=False)
+    # El backfill se hace con: python scripts/rebuild_operation_daily_stats.py
+
+
+def downgrade():
+    op.drop_index(op.f('ix_operation_daily_stats_day'), table_name='operation_daily_stats')
+    op.drop_table('operation_daily_stats')
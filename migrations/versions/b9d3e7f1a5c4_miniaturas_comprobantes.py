@@ -0,0 +1,27 @@
+# coding: utf-8
+"""Miniaturas de comprobantes de operación
+
+Revision ID: b9d3e7f1a5c4
+Revises: a8c2d6e0f4b3
+Create Date: 2026-10-18 18:05:31.482716
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b9d3e7f1a5c4'
+down_revision = 'a8c2d6e0f4b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payment_proof_thumbnail_url', sa.String(length=500), nullable=True))
+        batch_op.add_column(sa.Column('operator_proof_thumbnail_url', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_column('operator_proof_thumbnail_url')
+        batch_op.drop_column('payment_proof_thumbnail_url')
@@ -0,0 +1,34 @@
+# coding: utf-8
+"""Secuencia nativa para change_log.seq
+
+Revision ID: c1e5a9d3f7b6
+Revises: b9d3e7f1a5c4
+Create Date: 2026-10-18 19:12:47.630184
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c1e5a9d3f7b6'
+down_revision = 'b9d3e7f1a5c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('change_seq')))
+        # Continuar desde la mayor secuencia usada (feed o contador)
+        op.execute(
+            "SELECT setval('change_seq', GREATEST(1, COALESCE((SELECT MAX(seq) FROM change_log), 0), "
+            "COALESCE((SELECT last_value FROM id_counters WHERE name = 'change_seq'), 0)))"
+        )
+        # El contador ya no se usa en PostgreSQL
+        op.execute("DELETE FROM id_counters WHERE name = 'change_seq'")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.DropSequence(sa.Sequence('change_seq')))
+        # Sin fila, el contador se inicializa desde MAX(change_log.seq)
+        op.execute("DELETE FROM id_counters WHERE name = 'change_seq'")
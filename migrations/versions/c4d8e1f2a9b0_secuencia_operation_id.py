@@ -0,0 +1,39 @@
+# coding: utf-8
+"""Secuencia para operation_id y tabla id_counters
+
+Revision ID: c4d8e1f2a9b0
+Revises: b7e2d9a1c4f3
+Create Date: 2026-10-17 12:41:05.904117
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f2a9b0'
+down_revision = 'b7e2d9a1c4f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('id_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('operation_number_seq', start=1001)))
+        # Continuar desde el mayor EXP-NNNN existente
+        op.execute(
+            "SELECT setval('operation_number_seq', GREATEST(1000, COALESCE("
+            "(SELECT MAX(CAST(SUBSTRING(operation_id FROM 5) AS BIGINT)) FROM operations "
+            "WHERE operation_id ~ '^EXP-[0-9]+$'), 1000)))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.DropSequence(sa.Sequence('operation_number_seq')))
+
+    op.drop_table('id_counters')
@@ -0,0 +1,57 @@
+# coding: utf-8
+"""Operaciones diarias por cliente (operation_daily_client_stats)
+
+Reemplaza operation_daily_stats.client_counts_json, que solo se podía
+actualizar leyendo y bloqueando la fila del bucket.
+
+Revision ID: d2f6b0e4a8c7
+Revises: c1e5a9d3f7b6
+Create Date: 2026-10-18 20:26:09.318452
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b0e4a8c7'
+down_revision = 'c1e5a9d3f7b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    client_stats = op.create_table('operation_daily_client_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('operation_type', sa.String(length=20), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('operation_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'status', 'operation_type', 'client_id', name='uq_operation_daily_client_stats_bucket')
+    )
+    op.create_index(op.f('ix_operation_daily_client_stats_day'), 'operation_daily_client_stats', ['day'], unique=False)
+
+    # Pasar los conteos por cliente del JSON a la nueva tabla
+    rows = op.get_bind().execute(sa.text(
+        "SELECT day, status, operation_type, client_counts_json FROM operation_daily_stats"
+    )).fetchall()
+    op.bulk_insert(client_stats, [
+        {'day': day, 'status': status, 'operation_type': operation_type,
+         'client_id': int(client_id), 'operation_count': count}
+        for day, status, operation_type, counts_json in rows
+        for client_id, count in json.loads(counts_json or '{}').items()
+        if count > 0
+    ])
+
+    with op.batch_alter_table('operation_daily_stats', schema=None) as batch_op:
+        batch_op.drop_column('client_counts_json')
+
+
+def downgrade():
+    with op.batch_alter_table('operation_daily_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('client_counts_json', sa.Text(), nullable=False, server_default='{}'))
+    # Los conteos por cliente se regeneran con: python scripts/rebuild_operation_daily_stats.py
+
+    op.drop_index(op.f('ix_operation_daily_client_stats_day'), table_name='operation_daily_client_stats')
+    op.drop_table('operation_daily_client_stats')
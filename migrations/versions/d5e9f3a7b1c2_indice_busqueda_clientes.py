@@ -0,0 +1,42 @@
+# coding: utf-8
+"""Índice trigram para búsqueda de clientes
+
+Revision ID: d5e9f3a7b1c2
+Revises: c4d8e1f2a9b0
+Create Date: 2026-10-17 13:22:47.318502
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5e9f3a7b1c2'
+down_revision = 'c4d8e1f2a9b0'
+branch_labels = None
+depends_on = None
+
+
+# Debe coincidir con Client.search_document()
+SEARCH_DOCUMENT = (
+    "(coalesce(dni, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(apellido_paterno, '') || ' ' || coalesce(apellido_materno, '') || ' ' || "
+    "coalesce(nombres, '') || ' ' || coalesce(razon_social, ''))"
+)
+
+
+def upgrade():
+    # Solo PostgreSQL: en SQLite la búsqueda funciona sin índice
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        f"CREATE INDEX IF NOT EXISTS ix_clients_search_trgm ON clients "
+        f"USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_clients_search_trgm")
@@ -0,0 +1,44 @@
+# coding: utf-8
+"""Trabajos de exportación en segundo plano (export_jobs)
+
+Revision ID: e6a0b4c8d2f1
+Revises: d5e9f3a7b1c2
+Create Date: 2026-10-18 09:14:52.730461
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e6a0b4c8d2f1'
+down_revision = 'd5e9f3a7b1c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('export_type', sa.String(length=20), nullable=False),
+    sa.Column('export_format', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=True),
+    sa.Column('processed_rows', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=True),
+    sa.Column('file_name', sa.String(length=200), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.CheckConstraint("status IN ('Pendiente', 'En proceso', 'Completado', 'Error')", name='check_export_job_status'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_export_jobs_user_status', 'export_jobs', ['user_id', 'status'], unique=False)
+    op.create_index('ix_export_jobs_user_created_at', 'export_jobs', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_export_jobs_user_created_at', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_user_status', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -0,0 +1,34 @@
+# coding: utf-8
+"""Índices compuestos para consultas de auditoría
+
+Revision ID: f7b1c5d9e3a2
+Revises: e6a0b4c8d2f1
+Create Date: 2026-10-18 10:02:16.485903
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7b1c5d9e3a2'
+down_revision = 'e6a0b4c8d2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_audit_logs_created_at_id', 'audit_logs', ['created_at', 'id'], unique=False)
+    op.create_index('ix_audit_logs_entity_created_at', 'audit_logs', ['entity', 'entity_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_audit_logs_action_created_at', 'audit_logs', ['action', 'created_at', 'id'], unique=False)
+    op.create_index('ix_audit_logs_user_created_at', 'audit_logs', ['user_id', 'created_at', 'id'], unique=False)
+    # Cubiertos por los índices compuestos (mismo prefijo)
+    op.drop_index('ix_audit_logs_created_at', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_id', table_name='audit_logs')
+
+
+def downgrade():
+    op.create_index('ix_audit_logs_user_id', 'audit_logs', ['user_id'], unique=False)
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'], unique=False)
+    op.drop_index('ix_audit_logs_user_created_at', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_action_created_at', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_entity_created_at', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_created_at_id', table_name='audit_logs')
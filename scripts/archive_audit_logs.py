@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Retención de auditoría: archivar y buscar registros antiguos
+
+Mueve a AUDIT_ARCHIVE_DIR/YYYY/MM/audit_logs_YYYY-MM-DD.jsonl.gz los
+registros de audit_logs más antiguos que AUDIT_RETENTION_DAYS y los borra
+de la tabla por lotes. Pensado para ejecutarse a diario (cron).
+
+Uso:
+    python scripts/archive_audit_logs.py archive [--days 180] [--batch-size 1000]
+    python scripts/archive_audit_logs.py search --from 2025-01-01 --to 2025-01-31 [--action LOGIN] [--text EXP-1001]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+from app import create_app
+from app.services.audit_service import AuditService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Retención y archivo de auditoría')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    archive = subparsers.add_parser('archive', help='Archivar registros antiguos')
+    archive.add_argument('--days', type=int, help='Días a conservar en la tabla (por defecto AUDIT_RETENTION_DAYS)')
+    archive.add_argument('--batch-size', type=int, help='Filas por lote (por defecto AUDIT_ARCHIVE_BATCH_SIZE)')
+
+    search = subparsers.add_parser('search', help='Buscar en el archivo (imprime JSONL)')
+    search.add_argument('--from', dest='start', required=True, type=date.fromisoformat, help='Primer día (YYYY-MM-DD)')
+    search.add_argument('--to', dest='end', required=True, type=date.fromisoformat, help='Último día (YYYY-MM-DD)')
+    search.add_argument('--entity', help='Entidad (User, Client, Operation)')
+    search.add_argument('--entity-id', type=int, help='ID de la entidad')
+    search.add_argument('--action', help='Acción (LOGIN, CREATE_OPERATION, ...)')
+    search.add_argument('--user-id', type=int, help='ID del usuario')
+    search.add_argument('--text', help='Texto en detalles o notas')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+
+    with app.app_context():
+        if args.command == 'archive':
+            days = args.days if args.days is not None else app.config['AUDIT_RETENTION_DAYS']
+            print(f"Archivando auditoría anterior a {days} días en {app.config['AUDIT_ARCHIVE_DIR']} ...")
+            archived = AuditService.archive_old_logs(retention_days=days, batch_size=args.batch_size)
+            print(f"✅ {archived} registros archivados")
+            return 0
+
+        found = 0
+        for record in AuditService.iter_archived_logs(
+            args.start, args.end,
+            entity=args.entity,
+            entity_id=args.entity_id,
+            action=args.action,
+            user_id=args.user_id,
+            text=args.text
+        ):
+            print(json.dumps(record, ensure_ascii=False))
+            found += 1
+        print(f"{found} registros encontrados", file=sys.stderr)
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
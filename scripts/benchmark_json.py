@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de serialización JSON de operaciones
+
+Serializa N operaciones (con cliente y usuario, como /operations/api/list)
+de tres formas y reporta el tiempo de cada una:
+
+    legacy    to_dict convirtiendo cada campo (float, isoformat) + json estándar
+    estándar  to_dict nativo + JSONProvider (encoder estándar)
+    orjson    to_dict nativo + OrjsonProvider (si orjson está instalado)
+
+No usa la base de datos: las operaciones se construyen en memoria.
+
+Uso: python scripts/benchmark_json.py --operations 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask
+from app.models.operation import Operation
+from app.models.client import Client
+from app.models.user import User
+from app.utils.json_provider import JSONProvider, OrjsonProvider, orjson
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON')
+    parser.add_argument('--operations', type=int, default=10000, help='Operaciones a serializar')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones (se reporta la mejor)')
+    return parser.parse_args()
+
+
+def build_operations(count):
+    """Operaciones en memoria con cliente y usuario"""
+    user = User(id=1, username='trader1', role='Trader')
+    clients = [
+        Client(id=i, document_type='DNI', dni=f'{40000000 + i}', nombres='Ana', apellido_paterno='Pérez',
+               apellido_materno='Quispe')
+        for i in range(1, 51)
+    ]
+    now = datetime(2025, 1, 15, 10, 30, 0, 123456)
+    operations = []
+    for i in range(count):
+        amount = Decimal('1000.50') + i
+        rate = Decimal('3.7525')
+        operations.append(Operation(
+            id=i + 1, operation_id=f'EXP-{1001 + i}', client_id=clients[i % 50].id, user_id=user.id,
+            operation_type='Compra' if i % 2 else 'Venta', amount_usd=amount, exchange_rate=rate,
+            amount_pen=(amount * rate).quantize(Decimal('0.01')), source_account='191-1234567-0-11',
+            destination_account='0011-0123-45-0100012345', status='Completada', notes=None,
+            created_at=now - timedelta(minutes=i), updated_at=now, completed_at=now,
+            client=clients[i % 50], user=user
+        ))
+    return operations
+
+
+def legacy_to_dict(op):
+    """Operation.to_dict previo: conversión por campo en Python"""
+    data = op.to_dict(include_relations=True)
+    for key in ('amount_usd', 'exchange_rate', 'amount_pen'):
+        data[key] = float(data[key])
+    for key in ('created_at', 'updated_at', 'completed_at'):
+        data[key] = data[key].isoformat() if data[key] else None
+    return data
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), size
+
+
+def main():
+    args = parse_args()
+    operations = build_operations(args.operations)
+    app = Flask(__name__)
+
+    cases = [
+        ('legacy', lambda: len(json.dumps(
+            {'success': True, 'operations': [legacy_to_dict(op) for op in operations]}, sort_keys=True
+        ))),
+        ('estándar', lambda: len(JSONProvider(app).dumps(
+            {'success': True, 'operations': [op.to_dict(include_relations=True) for op in operations]}
+        ))),
+    ]
+    if orjson is not None:
+        provider = OrjsonProvider(app)
+        cases.append(('orjson', lambda: len(provider.dumps(
+            {'success': True, 'operations': [op.to_dict(include_relations=True) for op in operations]}
+        ))))
+    else:
+        print("orjson no instalado: se omite OrjsonProvider")
+
+    # Solo el encoder (dicts ya construidos)
+    dicts = {'success': True, 'operations': [op.to_dict(include_relations=True) for op in operations]}
+    encoders = [('estándar', lambda: len(JSONProvider(app).dumps(dicts)))]
+    if orjson is not None:
+        encoders.append(('orjson', lambda: len(provider.dumps(dicts))))
+
+    print(f"{args.operations} operaciones, mejor de {args.repeat}\n")
+    print("to_dict + encode:")
+    baseline = None
+    for name, fn in cases:
+        elapsed, size = best_of(args.repeat, fn)
+        baseline = baseline or elapsed
+        print(f"   {name:<10} {elapsed * 1000:8.1f} ms  {size / 1024:8.0f} KB  x{baseline / elapsed:.1f}")
+
+    print("solo encode:")
+    baseline = None
+    for name, fn in encoders:
+        elapsed, size = best_of(args.repeat, fn)
+        baseline = baseline or elapsed
+        print(f"   {name:<10} {elapsed * 1000:8.1f} ms  {size / 1024:8.0f} KB  x{baseline / elapsed:.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
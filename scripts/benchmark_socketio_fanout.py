@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark del reparto de eventos SocketIO entre workers (message queue)
+
+Levanta N procesos "worker" con un servidor SocketIO conectado a la cola y
+un proceso que emite M eventos. Cada worker registra cuándo recibe cada
+evento; se reporta eventos/segundo emitidos y entregados, y la latencia de
+entrega (p50, p95, p99, máx).
+
+Por defecto usa la cola local de sockets unix en un directorio temporal:
+
+    python scripts/benchmark_socketio_fanout.py --workers 4 --events 5000
+    python scripts/benchmark_socketio_fanout.py --url redis://localhost:6379/0
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import socketio
+from app.utils.socketio_queue import UnixSocketManager
+
+CHANNEL = 'qoricash-benchmark'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de fan-out SocketIO entre workers')
+    parser.add_argument('--workers', type=int, default=4, help='Procesos receptores')
+    parser.add_argument('--events', type=int, default=5000, help='Eventos a emitir')
+    parser.add_argument('--payload-bytes', type=int, default=256, help='Tamaño del payload de cada evento')
+    parser.add_argument('--url', help='URL de la cola (por defecto unix:// en un directorio temporal)')
+    parser.add_argument('--timeout', type=float, default=30, help='Segundos máximos de espera por worker')
+    return parser.parse_args()
+
+
+def create_server(url, write_only=False):
+    """Servidor SocketIO (sin clientes) conectado a la cola"""
+    if url.startswith('unix://'):
+        manager = UnixSocketManager(url, channel=CHANNEL, write_only=write_only)
+    elif url.startswith(('redis://', 'rediss://')):
+        manager = socketio.RedisManager(url, channel=CHANNEL, write_only=write_only)
+    else:
+        manager = socketio.KombuManager(url, channel=CHANNEL, write_only=write_only)
+    server = socketio.Server(client_manager=manager, async_mode='threading')
+    return server, manager
+
+
+def worker(url, expected, timeout, ready, results):
+    """Recibir eventos de la cola y reportar latencias"""
+    server, manager = create_server(url)
+    latencies = []
+
+    def record(message):
+        latencies.append(time.time() - message['data']['sent_at'])
+
+    manager._handle_emit = record
+    server.manager_initialized = True
+    manager.initialize()
+    ready.release()
+
+    deadline = time.time() + timeout
+    while len(latencies) < expected and time.time() < deadline:
+        time.sleep(0.01)
+
+    results.put((os.getpid(), latencies, time.time()))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    args = parse_args()
+
+    tmp_dir = None
+    url = args.url
+    if not url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        url = f'unix://{tmp_dir.name}'
+
+    ctx = mp.get_context('fork')
+    ready = ctx.Semaphore(0)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(url, args.events, args.timeout, ready, results), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    time.sleep(0.2)  # Suscripciones activas (redis/kombu)
+
+    server, _ = create_server(url, write_only=True)
+    padding = 'x' * args.payload_bytes
+
+    print(f"Cola: {url}")
+    print(f"Emitiendo {args.events} eventos a {args.workers} workers ...")
+    start = time.time()
+    for i in range(args.events):
+        server.emit('benchmark', {'seq': i, 'sent_at': time.time(), 'padding': padding}, room='benchmark')
+    publish_elapsed = time.time() - start
+
+    latencies = []
+    finished = start
+    for _ in processes:
+        try:
+            _, worker_latencies, worker_finished = results.get(timeout=args.timeout + 5)
+        except queue.Empty:
+            break
+        latencies.extend(worker_latencies)
+        finished = max(finished, worker_finished)
+    for process in processes:
+        process.join(timeout=1)
+
+    expected = args.events * args.workers
+    print(f"Emitidos: {args.events / publish_elapsed:,.0f} eventos/s ({publish_elapsed:.2f}s)")
+    print(f"Entregados: {len(latencies)}/{expected} ({len(latencies) / max(finished - start, 1e-9):,.0f} entregas/s)")
+    if latencies:
+        ms = [value * 1000 for value in latencies]
+        print(
+            f"Latencia ms: p50={statistics.median(ms):.2f} p95={percentile(ms, 95):.2f} "
+            f"p99={percentile(ms, 99):.2f} máx={max(ms):.2f}"
+        )
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+    return 0 if len(latencies) == expected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Verificación del backend S3 (app/utils/storage.py)
+
+Ejecuta S3Storage contra un stand-in local en memoria (sin red ni boto3)
+que imita put_object condicional (If-None-Match), head_object,
+delete_object y list_objects_v2 paginado. Con --endpoint-url se ejecutan
+las mismas verificaciones contra un servicio real compatible (MinIO,
+R2, ...) y un bucket DESCARTABLE.
+
+Uso:
+    python scripts/check_s3_storage.py
+    python scripts/check_s3_storage.py --endpoint-url http://localhost:9000 --bucket qc-check
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.storage import S3Storage, content_key
+
+
+class StandInError(Exception):
+    """Error con la forma de botocore.exceptions.ClientError"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class InMemoryS3:
+    """Stand-in local de un cliente S3 (solo las llamadas que usa S3Storage)"""
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+        self._lock = threading.Lock()
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise StandInError('404')
+        return {}
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, **kwargs):
+        with self._lock:
+            if IfNoneMatch == '*' and Key in self.objects:
+                raise StandInError('PreconditionFailed')
+            self.objects[Key] = (Body, datetime.now(timezone.utc))
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        result = {
+            'Contents': [{'Key': key, 'LastModified': self.objects[key][1]} for key in page],
+            'IsTruncated': start + self.page_size < len(keys)
+        }
+        if result['IsTruncated']:
+            result['NextContinuationToken'] = str(start + self.page_size)
+        return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Verificación del backend S3')
+    parser.add_argument('--endpoint-url', help='Servicio S3 real (por defecto stand-in en memoria)')
+    parser.add_argument('--bucket', default='qoricash-check', help='Bucket descartable')
+    parser.add_argument('--region', help='Región')
+    return parser.parse_args()
+
+
+def check(name, condition):
+    print(f"   {'✅' if condition else '❌'} {name}")
+    return bool(condition)
+
+
+def main():
+    args = parse_args()
+    if args.endpoint_url:
+        storage = S3Storage(args.bucket, endpoint_url=args.endpoint_url, region=args.region)
+        if not storage.configured:
+            print("❌ --endpoint-url requiere el paquete boto3")
+            return 1
+        print(f"S3Storage contra {args.endpoint_url} (bucket {args.bucket})")
+    else:
+        storage = S3Storage(args.bucket, client=InMemoryS3())
+        print("S3Storage contra el stand-in en memoria")
+
+    folder = f'check-{datetime.utcnow():%Y%m%d%H%M%S%f}'
+    ok = True
+
+    # Subida y deduplicación
+    url, created = storage.save(io.BytesIO(b'documento'), folder, 'dni.jpg', content_type='image/jpeg')
+    ok &= check('crea el objeto la primera vez', created)
+    ok &= check('la clave es por contenido', storage.key_for(url) == content_key(io.BytesIO(b'documento'), folder, 'dni.jpg'))
+    url_again, created_again = storage.save(io.BytesIO(b'documento'), folder, 'otro.jpg')
+    ok &= check('reutiliza el mismo contenido', url_again == url and not created_again)
+
+    # Creación concurrente: solo una escritura recibe created=True
+    results = []
+    barrier = threading.Barrier(8)
+
+    def racer():
+        data = io.BytesIO(b'concurrente')
+        key = content_key(data, folder, 'ruc.pdf')
+        barrier.wait()
+        results.append(storage.put(data, key))
+
+    threads = [threading.Thread(target=racer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ok &= check('creación concurrente: un solo created=True', sum(created for _, created in results) == 1)
+
+    # Listado paginado (barrido de huérfanos)
+    for i in range(3):
+        storage.save(io.BytesIO(f'extra-{i}'.encode()), folder, f'extra-{i}.png')
+    listed = list(storage.iter_files(folder))
+    ok &= check('iter_files recorre todas las páginas', len(listed) == 5)
+    recent = datetime.utcnow() - timedelta(minutes=5)
+    ok &= check('iter_files devuelve fechas UTC', all(modified > recent for _, _, modified in listed))
+
+    # Eliminación
+    for _, listed_url, _ in listed:
+        storage.delete(listed_url)
+    ok &= check('delete elimina los objetos', not list(storage.iter_files(folder)) and not storage.find(storage.key_for(url)))
+    ok &= check('URLs ajenas no se reconocen', storage.key_for('https://otro.example/x.jpg') is None)
+
+    print("✅ Verificación completa" if ok else "❌ Hay verificaciones fallidas")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Barrido de archivos huérfanos del almacenamiento (STORAGE_BACKEND)
+
+Con claves por contenido un archivo puede estar referenciado por varios
+registros, así que los requests que fallan no eliminan lo que subieron.
+Este barrido elimina los archivos que ya ningún cliente u operación
+referencia. Pensado para ejecutarse a diario (cron), en horas de poco uso.
+
+Uso:
+    python scripts/collect_storage_garbage.py --dry-run
+    python scripts/collect_storage_garbage.py --min-age-hours 48
+"""
+import argparse
+import os
+import sys
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+from app import create_app
+from app.services.file_service import FileService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Eliminar archivos sin referencias')
+    parser.add_argument('--min-age-hours', type=int, default=24,
+                        help='Solo archivos con al menos esta antigüedad (por defecto 24)')
+    parser.add_argument('--dry-run', action='store_true', help='Solo listar, sin eliminar')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+
+    with app.app_context():
+        file_service = FileService()
+        if not file_service.configured:
+            print(f"❌ Almacenamiento ({file_service.backend.name}) no configurado")
+            return 1
+
+        print(f"Revisando archivos de {file_service.backend.name} ...")
+        scanned, orphans = file_service.collect_garbage(args.min_age_hours, dry_run=args.dry_run)
+        for url in orphans:
+            print(f"   {url}")
+
+        action = 'sin referencias (no eliminados)' if args.dry_run else 'eliminados'
+        print(f"✅ {scanned} archivos revisados, {len(orphans)} {action}")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
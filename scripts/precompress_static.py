@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Precomprimir los archivos estáticos (app/static) en .br y .gz
+
+Pensado para el paso de build cuando app/static es de solo lectura en
+producción (COMPRESS_STATIC_ON_STARTUP=False). Solo regenera las variantes
+que faltan o son más antiguas que el original.
+
+Uso:
+    python scripts/precompress_static.py
+    python scripts/precompress_static.py --force --min-size 0
+"""
+import argparse
+import os
+import sys
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.compression import precompress_static, available_encodings, STATIC_EXTENSIONS, STATIC_SUFFIXES
+
+STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "static"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precomprimir archivos estáticos')
+    parser.add_argument('--static-folder', default=STATIC_FOLDER, help='Carpeta de estáticos')
+    parser.add_argument('--min-size', type=int, default=int(os.environ.get('COMPRESS_MIN_SIZE', 500)),
+                        help='Tamaño mínimo en bytes (por defecto COMPRESS_MIN_SIZE)')
+    parser.add_argument('--force', action='store_true', help='Regenerar aunque estén al día')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    encodings = available_encodings()
+    print(f"Codificaciones: {', '.join(encodings)}")
+
+    generated = precompress_static(args.static_folder, min_size=args.min_size, force=args.force)
+    print(f"✅ {generated} archivos generados")
+
+    # Resumen de tamaños
+    for root, _, files in os.walk(args.static_folder):
+        for name in sorted(files):
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            sizes = [f"{os.path.getsize(source):,} B"]
+            for encoding in encodings:
+                target = source + STATIC_SUFFIXES[encoding]
+                if os.path.exists(target):
+                    sizes.append(f"{encoding} {os.path.getsize(target):,} B")
+            print(f"   {os.path.relpath(source, args.static_folder)}: {' | '.join(sizes)}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Reconstruir el rollup diario de operaciones (operation_daily_stats)
+
+Ejecutar después de aplicar la migración que crea la tabla (backfill) o
+en cualquier momento para regenerarlo desde la tabla operations. Al
+final compara el mes actual contra el cálculo directo sobre operations.
+
+Uso: python scripts/rebuild_operation_daily_stats.py
+"""
+import os
+import sys
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+from app import create_app
+from app.models.operation_daily_stat import OperationDailyStat
+from app.services.operation_service import OperationService
+from app.utils.formatters import now_peru
+
+
+def main():
+    app = create_app()
+
+    with app.app_context():
+        print("Reconstruyendo operation_daily_stats ...")
+        rows = OperationDailyStat.rebuild()
+        print(f"✅ Rollup reconstruido: {rows} filas")
+
+        # Verificación del mes actual
+        now = now_peru()
+        start_date, end_date = OperationService.get_month_range(now.month, now.year)
+        from_rollup = OperationService.get_period_stats(start_date, end_date)
+        from_operations = OperationService.compute_period_stats(start_date, end_date)
+
+        if from_rollup == from_operations:
+            print(f"✅ Mes {now.month:02d}/{now.year} consistente con la tabla operations")
+            return 0
+
+        print(f"❌ Diferencias en el mes {now.month:02d}/{now.year}:")
+        for key in sorted(from_operations):
+            if from_rollup.get(key) != from_operations[key]:
+                print(f"   {key}: rollup={from_rollup.get(key)} operations={from_operations[key]}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés del generador de operation_id (EXP-NNNN)
+
+Crea operaciones desde muchos hilos a la vez con OperationService y
+verifica que todos los operation_id sean únicos. Reporta el throughput.
+
+Por defecto usa una base SQLite temporal; para probar la secuencia de
+PostgreSQL pasar una base de datos DESCARTABLE (se crean tablas y datos):
+
+    python scripts/stress_operation_ids.py --threads 16 --per-thread 50
+    python scripts/stress_operation_ids.py --database-url postgresql://.../qoricash_stress
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Asegura que la raíz del proyecto esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Estrés del generador de operation_id')
+    parser.add_argument('--threads', type=int, default=16, help='Hilos concurrentes')
+    parser.add_argument('--per-thread', type=int, default=50, help='Operaciones por hilo')
+    parser.add_argument('--database-url', help='URL de una base de datos descartable')
+    return parser.parse_args()
+
+
+def setup_data():
+    """Crear tablas, un usuario Trader y un cliente activo"""
+    from app.models.user import User
+    from app.models.client import Client
+
+    db.create_all()
+
+    user = User(username='stress_trader', email='stress@qoricash.test', dni='87654321',
+                role='Trader', status='Activo')
+    user.set_password('stress12345')
+    client = Client(document_type='DNI', dni='11223344', email='cliente@qoricash.test',
+                    apellido_paterno='PRUEBA', apellido_materno='ESTRES', nombres='CLIENTE',
+                    status='Activo')
+    db.session.add_all([user, client])
+    db.session.commit()
+    return user.id, client.id
+
+
+def main():
+    args = parse_args()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.mkdtemp(prefix='qoricash_stress_')
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'stress.db')}"
+
+    class StressConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ECHO = False
+        RATELIMIT_ENABLED = False
+        # SQLite: esperar el lock de escritura en lugar de fallar de inmediato
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if database_url.startswith('sqlite') else {}
+
+    from app import config as config_module
+    config_module.config['stress'] = StressConfig
+    app = create_app('stress')
+
+    with app.app_context():
+        user_id, client_id = setup_data()
+
+    from app.models.user import User
+    from app.models.operation import Operation
+    from app.services.operation_service import OperationService
+
+    created = []
+    errors = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker():
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            start_barrier.wait()
+            for _ in range(args.per_thread):
+                try:
+                    ok, message, operation = OperationService.create_operation(
+                        current_user=user,
+                        client_id=client_id,
+                        operation_type='Compra',
+                        amount_usd=100,
+                        exchange_rate=3.75
+                    )
+                    with lock:
+                        if ok:
+                            created.append(operation.operation_id)
+                        else:
+                            errors.append(message)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stored = [row[0] for row in db.session.query(Operation.operation_id).all()]
+
+    total = args.threads * args.per_thread
+    print(f"Operaciones solicitadas: {total}")
+    print(f"Operaciones creadas:     {len(created)} en {elapsed:.2f}s "
+          f"({len(created) / elapsed if elapsed else 0:.1f} ops/s)")
+    print(f"Errores:                 {len(errors)}")
+    for message in sorted(set(errors))[:5]:
+        print(f"   {message}")
+
+    unique = len(set(stored)) == len(stored)
+    print(f"operation_id únicos:     {'✅ sí' if unique else '❌ NO'} ({len(set(stored))}/{len(stored)})")
+
+    return 0 if unique and not errors else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())